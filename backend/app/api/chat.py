@@ -2,22 +2,79 @@
 This module defines the API routes for chat-related operations.
 """
 
-import json
-from typing import Any, Generator
+import contextlib
+import math
+import uuid
+from collections.abc import AsyncGenerator
+from typing import List, Optional
 
-from fastapi import Depends
+from fastapi import Depends, Header, Request
 from fastapi.exceptions import HTTPException
 from fastapi.responses import StreamingResponse
 from fastapi.routing import APIRouter
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.activity import conversation_touches
 from app.core.agents import create_agent
+from app.core.config import settings
+from app.core.context import build_chat_context
+from app.core.history import append_turn, get_conversation_history
+from app.core.limits import ConcurrencyLimitError, llm_limiter
+from app.core.model_registry import model_registry
+from app.core.response_cache import (
+    history_fingerprint,
+    replay_cached_turn,
+    response_cache,
+)
+from app.core.routing import model_router
+from app.core.runs import ChatRun, chat_runs
+from app.core.streaming import stream_agent_deltas
 from app.crud.conversation import get_conversation_service
-from app.db import User, get_async_session
+from app.db import User, get_read_session
 from app.schemas import ChatRequest
 from app.users import current_active_user
 
 
+def _sse_response(
+    http_request: Request, run: ChatRun, after_id: int = 0
+) -> StreamingResponse:
+    """Stream ``run``'s frames after ``after_id`` as a Server-Sent Events response.
+
+    The subscription ends as soon as the client disconnects, which lets the
+    run be cancelled once no other client is attached.
+    """
+    return StreamingResponse(
+        run.subscribe(after_id, is_disconnected=http_request.is_disconnected),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+            "X-Run-ID": str(run.id),
+        },
+    )
+
+
+async def _record_turn_on_completion(
+    deltas: AsyncGenerator[str, None],
+    answer: List[str],
+    user_id: uuid.UUID,
+    conversation_id: uuid.UUID,
+    model_id: str,
+    question: str,
+) -> AsyncGenerator[str, None]:
+    """Stream ``deltas`` of an unpersisted run, then record its turn.
+
+    ``answer`` receives the full response from the run's ``on_complete``, so
+    the turn is only recorded when the run was streamed to the end and did
+    not fail. A hedging loser is closed before that and leaves no trace.
+    """
+    async with contextlib.aclosing(deltas):
+        async for chunk in deltas:
+            yield chunk
+    if answer:
+        await append_turn(user_id, conversation_id, model_id, question, answer[0])
+
+
 def get_chat_router() -> APIRouter:
     # Create the router.
     router = APIRouter(prefix="/api/v1/chat", tags=["chat"])
@@ -25,8 +82,9 @@ def get_chat_router() -> APIRouter:
     @router.post("/")
     async def chat(
         request: ChatRequest,
+        http_request: Request,
         user: User = Depends(current_active_user),
-        session: AsyncSession = Depends(get_async_session),
+        session: AsyncSession = Depends(get_read_session),
     ) -> StreamingResponse:
         """Stream an Agno agent response as Server-Sent Events.
 
@@ -42,10 +100,42 @@ def get_chat_router() -> APIRouter:
             4. Agno persists messages under that session.
 
         SSE payload format:
-            - ``{"type": "delta", "content": "..."}`` for each streamed chunk.
+            - ``{"type": "delta", "content": "..."}`` for each streamed chunk,
+              with an increasing ``id:``. Deltas arriving within
+              ``chat_stream_coalesce_ms`` of each other share one frame.
             - ``[DONE]`` sentinel when the response is complete.
+
+        The history sent to the model is sized to its prompt budget: recent
+        turns verbatim, older ones as a rolling summary (see
+        ``app.core.context``).
+
+        The agent is driven through its async run API, so an open stream costs
+        a coroutine on the event loop rather than a threadpool worker.
+
+        The run is identified by the ``X-Run-ID`` response header. If the
+        connection drops it keeps going for ``chat_run_orphan_grace_seconds``
+        so the client can reconnect (see ``resume_chat``), then the model run
+        is cancelled.
+
+        ``model_id`` must be a model from ``GET /api/v1/models``; others are
+        rejected with 400 before any agent is built. Without one, the default
+        (first configured) model is used. The run may be failed
+        over or hedged onto another model when the requested one is slow or
+        erroring (see ``app.core.routing``).
+
+        Runs are admitted through ``llm_limiter``; when the user or the server
+        is at capacity for longer than the queue timeout, responds 429 with
+        ``Retry-After``.
+
+        With the response cache enabled (and the user not opted out), a prompt
+        already answered in the same context is replayed from the cache as
+        the same SSE stream, without calling the model or taking a slot.
         """
         conversation_id = request.conversation_id
+        requested_model_id = request.model_id or model_registry.default_id
+
+        if model_registry.get(requested_model_id) is None:
+            raise HTTPException(status_code=400, detail="Unknown model")
 
         # Ownership check — ensure the conversation belongs to this user.
         user_conversation = await get_conversation_service(
@@ -54,24 +144,125 @@ def get_chat_router() -> APIRouter:
         if user_conversation is None:
             raise HTTPException(status_code=404, detail="Conversation not found")
 
-        agno_agent = create_agent(user.id, conversation_id, request.model_id)
-
-        def event_stream() -> Generator[str, Any, None]:
-            """Yield SSE-formatted chunks from the Agno agent."""
-            for ev in agno_agent.run(request.question, stream=True):
-                chunk = getattr(ev, "content", None)
-                if chunk:
-                    payload = {"type": "delta", "content": chunk}
-                    yield f"data: {json.dumps(payload)}\n\n"
-            yield "data: [DONE]\n\n"
-
-        return StreamingResponse(
-            event_stream(),
-            media_type="text/event-stream",
-            headers={
-                "Cache-Control": "no-cache",
-                "X-Accel-Buffering": "no",
-            },
+        fingerprint: Optional[str] = None
+        if settings.response_cache_enabled and not user.response_cache_opt_out:
+            fingerprint = history_fingerprint(
+                await get_conversation_history(conversation_id)
+            )
+            cached = response_cache.lookup(
+                requested_model_id, fingerprint, request.question
+            )
+            if cached is not None:
+                conversation_touches.touch(user.id, conversation_id)
+                run = chat_runs.start(
+                    user.id,
+                    conversation_id,
+                    replay_cached_turn(
+                        user.id,
+                        conversation_id,
+                        requested_model_id,
+                        request.question,
+                        cached,
+                    ),
+                )
+                return _sse_response(http_request, run)
+
+        # Run on a healthy model; an unhealthy request is failed over.
+        model_id = model_router.route(requested_model_id)
+        context = await build_chat_context(
+            user.id, conversation_id, model_id, request.question, session
         )
+        # Errors before any content are raised (not streamed) so they can fail
+        # over. Runs that may be hedged or failed over are speculative: several
+        # can answer the same question, so they run unpersisted and only the
+        # one that is streamed to completion records its turn. The alternative
+        # is chosen once, here, and handed to ``hedged_stream`` so it cannot
+        # disagree with how the runs were built.
+        alternative = model_router.alternative_to(model_id)
+        can_fail_over = alternative is not None
+
+        def start_stream(stream_model_id: str) -> AsyncGenerator[str, None]:
+            agno_agent = create_agent(
+                user.id,
+                conversation_id,
+                stream_model_id,
+                num_history_runs=context.num_history_runs,
+                additional_context=context.additional_context,
+                history=context.history if can_fail_over else None,
+            )
+            answer: List[str] = []
+
+            def on_complete(text: str) -> None:
+                if can_fail_over:
+                    answer.append(text)
+                # Cache the answer once the run completes successfully.
+                if fingerprint is not None:
+                    response_cache.store(
+                        requested_model_id, fingerprint, request.question, text
+                    )
+
+            deltas = stream_agent_deltas(
+                agno_agent,
+                request.question,
+                on_complete=(
+                    on_complete if can_fail_over or fingerprint is not None else None
+                ),
+                stats=model_registry.stats(stream_model_id),
+                raise_early_errors=can_fail_over,
+            )
+            if not can_fail_over:
+                return deltas
+            return _record_turn_on_completion(
+                deltas,
+                answer,
+                user.id,
+                conversation_id,
+                stream_model_id,
+                request.question,
+            )
+
+        try:
+            permit = await llm_limiter.acquire(user.id)
+        except ConcurrencyLimitError as exc:
+            raise HTTPException(
+                status_code=429,
+                detail="Too many concurrent chats, try again later",
+                headers={"Retry-After": str(math.ceil(exc.retry_after))},
+            )
+
+        # Move the conversation to the top of the sidebar (written in batches).
+        conversation_touches.touch(user.id, conversation_id)
+
+        run = chat_runs.start(
+            user.id,
+            conversation_id,
+            model_router.hedged_stream(start_stream, model_id, alternative),
+            on_finish=permit.release,
+        )
+        return _sse_response(http_request, run)
+
+    @router.get("/runs/{run_id}")
+    async def resume_chat(
+        run_id: uuid.UUID,
+        http_request: Request,
+        last_event_id: Optional[str] = Header(default=None),
+        user: User = Depends(current_active_user),
+    ) -> StreamingResponse:
+        """Reattach to a chat run, replaying the frames after ``Last-Event-ID``.
+
+        Without ``Last-Event-ID`` the run is replayed from its first frame.
+        Returns 404 for unknown or expired runs and 409 when the frames after
+        ``Last-Event-ID`` are no longer buffered.
+        """
+        run = chat_runs.get(run_id)
+        if run is None or run.user_id != user.id:
+            raise HTTPException(status_code=404, detail="Run not found")
+        try:
+            after_id = int(last_event_id) if last_event_id is not None else 0
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid Last-Event-ID")
+        if not run.can_resume(after_id):
+            raise HTTPException(status_code=409, detail="Stream position lost")
+        return _sse_response(http_request, run, after_id)
 
     return router
@@ -3,25 +3,49 @@ This module contains the conversation endpoints for the API.
 """
 
 import uuid
+from datetime import datetime
 from typing import List, Optional
 
 from agno.agent import Message
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.agents import create_history_reader_agent, create_utility_agent
+from app.core.history import get_conversation_history, paginate_messages
+from app.core.jobs import JobQueueFullError, job_queue
+from app.core.titles import title_generator
 from app.crud.conversation import (
     create_conversation_service,
     get_conversation_service,
     get_conversations_for_user_service,
     update_conversation_title_service,
 )
-from app.db import User, get_async_session
-from app.models import Conversation
-from app.schemas import ConversationCreate, ConversationResponse
+from app.db import User, async_session_maker, get_async_session, get_read_session
+from app.schemas import ConversationCreate, ConversationResponse, JobResponse
 from app.users import current_active_user
 
 
+async def _generate_and_store_title(
+    user_id: uuid.UUID, conversation_id: uuid.UUID, first_message: str
+) -> str:
+    """Generate a title from the first message and persist it (runs as a background job).
+
+    See ``app.core.titles`` for how the title is produced; the model is only
+    called when no heuristic or memoized title applies. Model failures and
+    concurrency-limit timeouts raise, so the job queue retries.
+    """
+    title = await title_generator.generate(user_id, first_message)
+
+    # The request's session is closed by now, so the job opens its own.
+    async with async_session_maker() as session:
+        await update_conversation_title_service(
+            title=title,
+            user_id=user_id,
+            conversation_id=conversation_id,
+            session=session,
+        )
+    return title
+
+
 def get_conversations_router() -> APIRouter:
     """Get a router for the conversations API."""
     router = APIRouter(prefix="/api/v1/conversations", tags=["conversations"])
@@ -29,92 +53,103 @@ def get_conversations_router() -> APIRouter:
     @router.get("/{conversation_id}/messages")
     async def get_conversation_messages(
         conversation_id: uuid.UUID,
+        before: Optional[str] = None,
+        limit: Optional[int] = Query(default=None, ge=1, le=500),
         user: User = Depends(current_active_user),
-        session: AsyncSession = Depends(get_async_session),
+        session: AsyncSession = Depends(get_read_session),
     ) -> Optional[List[Message]]:
         """Return the message history for a conversation.
 
-        Verifies ownership first, then reads from the Agno database using the
-        conversation ID as the Agno session ID. Returns an empty list for new
-        conversations that have no messages yet.
+        Verifies ownership first, then reads from the Agno session store using
+        the conversation ID as the Agno session ID. Returns an empty list for
+        new conversations that have no messages yet.
+
+        Pagination is cursor-based: ``limit`` returns only the newest messages,
+        and passing the ``id`` of the oldest message received as ``before``
+        returns the page preceding it. Without either, the full history is
+        returned.
         """
         conversation = await get_conversation_service(user.id, session, conversation_id)
         if not conversation:
             raise HTTPException(status_code=404, detail="Conversation not found")
-        # TODO: Bring in the DB from somewhere, or call some custom agent to do this instead.
         try:
-            # Returns the conversation history, using an Agno agent.
-            return create_history_reader_agent(conversation_id)
+            messages = await get_conversation_history(conversation_id)
         except (ValueError, KeyError, AttributeError):
             return []
+        try:
+            return paginate_messages(messages, before, limit)
+        except KeyError:
+            raise HTTPException(status_code=400, detail="Unknown message cursor")
 
     @router.get("/{conversation_id}")
     async def get_conversation(
         conversation_id: uuid.UUID,
         user: User = Depends(current_active_user),
-        session: AsyncSession = Depends(get_async_session),
+        session: AsyncSession = Depends(get_read_session),
     ) -> Optional[ConversationResponse]:
         """Return metadata for a single conversation."""
-        conversation: Optional[Conversation] = await get_conversation_service(
-            user.id, session, conversation_id
-        )
-        if conversation:
-            return ConversationResponse(
-                title=conversation.title,
-                id=conversation.id,
-                user_id=conversation.user_id,
-                created_at=conversation.created_at,
-                updated_at=conversation.updated_at,
-            )
-        return None
+        return await get_conversation_service(user.id, session, conversation_id)
 
-    @router.post("/{conversation_id}/title")
+    @router.post("/{conversation_id}/title", status_code=202)
     async def generate_conversation_title(
         conversation_id: uuid.UUID,
         first_message: str = "",
         user: User = Depends(current_active_user),
-        session: AsyncSession = Depends(get_async_session),
-    ) -> str:
-        """Generate an LLM-based title for a conversation and persist it.
+        session: AsyncSession = Depends(get_read_session),
+    ) -> JobResponse:
+        """Queue LLM title generation for a conversation.
 
-        Uses the first user message as context for the Gemini model to produce
-        a short, descriptive title.
+        Returns immediately with a background job; poll
+        ``GET /api/v1/jobs/{id}`` for the generated title. Repeated requests
+        for the same conversation while a job is in flight return that job.
         """
+        conversation = await get_conversation_service(user.id, session, conversation_id)
+        if not conversation:
+            raise HTTPException(status_code=404, detail="Conversation not found")
 
-        # Title agent one-off.
-        response = create_utility_agent(
-            "Generate a title for the conversation based on the first message: "
-            + first_message
-            + ". Return only the title, no other text or explanation.",
-        )
-
-        await update_conversation_title_service(
-            title=str(response.content or ""),
-            user_id=user.id,
-            conversation_id=conversation_id,
-            session=session,
-        )
-        return str(response.content or "")
+        try:
+            job = job_queue.enqueue(
+                key=f"title:{conversation_id}",
+                user_id=user.id,
+                run=lambda: _generate_and_store_title(
+                    user.id, conversation_id, first_message
+                ),
+            )
+        except JobQueueFullError:
+            raise HTTPException(
+                status_code=503, detail="Title generation is busy, try again later"
+            )
+        return JobResponse.model_validate(job)
 
     @router.get("")
     async def list_conversations(
+        limit: Optional[int] = Query(default=None, ge=1, le=200),
+        before_updated_at: Optional[datetime] = None,
+        before_id: Optional[uuid.UUID] = None,
         user: User = Depends(current_active_user),
-        session: AsyncSession = Depends(get_async_session),
+        session: AsyncSession = Depends(get_read_session),
     ) -> List[ConversationResponse]:
-        """List all conversations for the authenticated user, most-recent first."""
-        conversations: List[Conversation] = await get_conversations_for_user_service(
-            user.id, session
-        )
-        return [
-            ConversationResponse(
-                title=conversation.title,
-                id=conversation.id,
-                user_id=conversation.user_id,
-                created_at=conversation.created_at,
-                updated_at=conversation.updated_at,
+        """List conversations for the authenticated user, most-recent first.
+
+        Keyset-paginated: pass ``limit`` for the first page, then the
+        ``updated_at`` and ``id`` of the last conversation received as
+        ``before_updated_at`` and ``before_id`` for the next one. Without
+        ``limit`` every conversation is returned.
+        """
+        if (before_updated_at is None) != (before_id is None):
+            raise HTTPException(
+                status_code=400,
+                detail="before_updated_at and before_id must be given together",
             )
-            for conversation in conversations
-        ]
+        before = (
+            (before_updated_at, before_id)
+            if before_updated_at is not None and before_id is not None
+            else None
+        )
+        rows = await get_conversations_for_user_service(
+            user.id, session, limit=limit, before=before
+        )
+        return [ConversationResponse.model_validate(row) for row in rows]
 
     @router.post("/{conversation_id}")
     async def create_conversation(
@@ -128,15 +163,8 @@ def get_conversations_router() -> APIRouter:
         frontend pre-generates UUIDs before the first message is sent.
         The title will be updated asynchronously via LLM title generation.
         """
-        new_conversation: Conversation = await create_conversation_service(
+        return await create_conversation_service(
             user.id, session, ConversationCreate(id=conversation_id)
         )
-        return ConversationResponse(
-            title=new_conversation.title,
-            id=new_conversation.id,
-            user_id=new_conversation.user_id,
-            created_at=new_conversation.created_at,
-            updated_at=new_conversation.updated_at,
-        )
 
     return router
@@ -0,0 +1,32 @@
+"""
+This module defines the API route for polling background job status.
+"""
+
+import uuid
+
+from fastapi import Depends
+from fastapi.exceptions import HTTPException
+from fastapi.routing import APIRouter
+
+from app.core.jobs import job_queue
+from app.db import User
+from app.schemas import JobResponse
+from app.users import current_active_user
+
+
+def get_jobs_router() -> APIRouter:
+    """Get a router for the jobs API."""
+    router = APIRouter(prefix="/api/v1/jobs", tags=["jobs"])
+
+    @router.get("/{job_id}")
+    async def get_job(
+        job_id: uuid.UUID,
+        user: User = Depends(current_active_user),
+    ) -> JobResponse:
+        """Return the status of a background job owned by the current user."""
+        job = job_queue.get(job_id)
+        if job is None or job.user_id != user.id:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return JobResponse.model_validate(job)
+
+    return router
@@ -0,0 +1,28 @@
+"""
+This module defines the API route exposing in-process performance metrics.
+"""
+
+from fastapi import Depends
+from fastapi.routing import APIRouter
+
+from app.core.metrics import metrics
+from app.db import User
+from app.users import current_superuser
+
+
+def get_metrics_router() -> APIRouter:
+    """Get a router for the metrics API."""
+    router = APIRouter(prefix="/api/v1/metrics", tags=["metrics"])
+
+    @router.get("/")
+    async def get_metrics(
+        user: User = Depends(current_superuser),
+    ) -> dict[str, float]:
+        """
+        Return the counters and gauges recorded by this worker process.
+
+        Restricted to superusers: the snapshot covers every user's traffic.
+        """
+        return metrics.snapshot()
+
+    return router
@@ -1,11 +1,35 @@
+"""
+This module defines the API route listing the supported chat models.
+"""
+
 from fastapi.routing import APIRouter
 
+from app.core.model_registry import model_registry
+from app.schemas import ModelResponse
+
 
 def get_models_router() -> APIRouter:
+    """Get a router for the models API."""
     router = APIRouter(prefix="/api/v1/models", tags=["models"])
 
     @router.get("/")
-    def get_models() -> list[str] | None:
-        return None
+    def get_models() -> list[ModelResponse]:
+        """List the supported chat models with their recent latency and error rate."""
+        models = []
+        for model in model_registry.all():
+            stats = model_registry.stats(model.id)
+            models.append(
+                ModelResponse(
+                    id=model.id,
+                    name=model.name,
+                    context_window_tokens=model.context_window_tokens,
+                    default=model.id == model_registry.default_id,
+                    runs=stats.runs,
+                    first_token_p50_seconds=stats.first_token_p50_seconds,
+                    first_token_p95_seconds=stats.first_token_p95_seconds,
+                    error_rate=stats.error_rate,
+                )
+            )
+        return models
 
     return router
@@ -0,0 +1,92 @@
+"""
+Write-behind recording of conversation activity.
+
+Every chat turn should move its conversation to the top of the sidebar,
+which is ordered by ``Conversation.updated_at``. Rather than issue an UPDATE
+per turn, the chat endpoint calls ``conversation_touches.touch`` and a
+background task started from the FastAPI lifespan flushes all conversations
+touched since the last flush in one batched UPDATE every
+``conversation_touch_flush_ms``. Repeated touches of the same conversation
+between flushes collapse into one row. Pending touches are flushed on
+shutdown; a crash can lose at most one interval of ordering updates.
+"""
+
+import asyncio
+import logging
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.crud.conversation import conversation_cache, touch_conversations_service
+from app.db import async_session_maker
+
+logger = logging.getLogger(__name__)
+
+
+class ConversationTouchBuffer:
+    """Coalesces conversation activity and writes it back in periodic batches.
+
+    Args:
+        flush_interval_seconds: Time between flushes of pending touches.
+    """
+
+    def __init__(self, flush_interval_seconds: float) -> None:
+        self.flush_interval_seconds = flush_interval_seconds
+        self._pending: dict[uuid.UUID, datetime] = {}
+        self._task: Optional[asyncio.Task[None]] = None
+
+    def touch(self, user_id: uuid.UUID, conversation_id: uuid.UUID) -> None:
+        """Record activity on a conversation now; it is persisted on the next flush."""
+        now = datetime.now()
+        self._pending[conversation_id] = now
+        metrics.increment("conversation_touches")
+        # Keep single-conversation reads consistent with the pending write by
+        # swapping in a new snapshot; cached values are shared, never mutated.
+        conversation_cache.replace(
+            (user_id, conversation_id),
+            lambda cached: cached.model_copy(update={"updated_at": now}),
+        )
+
+    async def flush(self) -> None:
+        """Write every pending touch in a single batched UPDATE."""
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        try:
+            async with async_session_maker() as session:
+                await touch_conversations_service(batch, session)
+        except Exception:
+            logger.exception("Failed to flush %d conversation touches", len(batch))
+            # Put the batch back for the next flush, keeping any newer touches.
+            for conversation_id, touched_at in batch.items():
+                self._pending.setdefault(conversation_id, touched_at)
+            return
+        metrics.increment("conversation_touch_flushes")
+        metrics.increment("conversation_touches_flushed", len(batch))
+
+    async def start(self) -> None:
+        """Start the periodic flush task."""
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flush task and write any remaining touches."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval_seconds)
+            await self.flush()
+
+
+conversation_touches = ConversationTouchBuffer(
+    flush_interval_seconds=settings.conversation_touch_flush_ms / 1000
+)
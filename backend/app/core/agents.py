@@ -1,61 +1,212 @@
+import asyncio
+import time
 import uuid
-from typing import List
+from dataclasses import dataclass
+from typing import Any, List, Optional
 
-from agno.agent import Message
 from agno.agent.agent import Agent
-from agno.db.sqlite.sqlite import SqliteDb
+from agno.db.base import AsyncBaseDb
+from agno.db.sqlite.async_sqlite import AsyncSqliteDb
 from agno.models.google.gemini import Gemini
+from agno.models.message import Message
 from agno.run.agent import RunOutput
 from agno.tools.mcp.mcp import MCPTools
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.mcp import mcp_manager
+from app.core.metrics import metrics
+from app.db import apply_sqlite_pragmas
+
+
+def create_agno_db(url: str) -> AsyncBaseDb:
+    """
+    Create the Agno message store for ``url`` with its own connection pool.
+
+    The store is configured independently of the application database
+    (``AGNO_DB_URL``), so chat persistence and conversation-metadata writes
+    can live in different SQLite files or on Postgres
+    (``postgresql+asyncpg://...``) and scale separately.
+
+    The store is async (``AsyncSqliteDb`` / ``AsyncPostgresDb`` on an async
+    engine): Agno only awaits its session reads and writes when the store is
+    an ``AsyncBaseDb``, and otherwise runs them on the event loop, where a
+    locked SQLite file would stall every open stream.
+    """
+    db_engine = create_async_engine(
+        url,
+        pool_size=settings.agno_db_pool_size,
+        max_overflow=settings.agno_db_max_overflow,
+        pool_pre_ping=True,
+    )
+    if db_engine.dialect.name == "sqlite":
+
+        @event.listens_for(db_engine.sync_engine, "connect")
+        def on_connect(dbapi_connection: Any, connection_record: Any) -> None:
+            apply_sqlite_pragmas(dbapi_connection, read_only=False)
+
+        return AsyncSqliteDb(db_engine=db_engine)
+
+    # Imported lazily: AsyncPostgresDb needs the optional postgres extra.
+    from agno.db.postgres.async_postgres import AsyncPostgresDb
+
+    return AsyncPostgresDb(db_engine=db_engine)
+
 
 # Initialize the Agno database.
-agno_db = SqliteDb(db_file="agno.db")
+agno_db = create_agno_db(settings.agno_db_url)
+
+
+@dataclass
+class AgentComponents:
+    """The expensive, shareable parts of an agent: model client and MCP toolkits."""
+
+    model: Gemini
+    tools: List[MCPTools]
+    build_seconds: float
+
+
+class AgentFactory:
+    """
+    Caches model clients and MCP toolkits keyed by ``(model_id, toolset)``.
+
+    Agents themselves are cheap and carry per-request state (``user_id`` and
+    ``session_id``), so a fresh ``Agent`` is built for every request around
+    cached components. Entries are evicted least-recently-used once
+    ``max_size`` is reached, or after ``ttl_seconds`` so long-lived HTTP
+    clients are periodically recycled. Toolkit connections are owned by
+    ``mcp_manager``; the factory only hands them out.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float) -> None:
+        self._cache: TTLCache[tuple[str, tuple[str, ...]], AgentComponents] = TTLCache(
+            max_size, ttl_seconds
+        )
+
+    def get_components(
+        self, model_id: str, toolset: tuple[str, ...]
+    ) -> AgentComponents:
+        """Return cached components for the key, building them on a miss."""
+        key = (model_id, toolset)
+        components = self._cache.get(key)
+        if components is not None:
+            metrics.increment("agent_factory_hits")
+            metrics.increment(
+                "agent_factory_construction_seconds_saved", components.build_seconds
+            )
+            metrics.set_gauge("agent_factory_hit_rate", self._cache.hit_rate)
+            return components
+
+        metrics.increment("agent_factory_misses")
+        started = time.perf_counter()
+        model = Gemini(id=model_id)
+        model.get_client()
+        components = AgentComponents(
+            model=model,
+            tools=mcp_manager.get_toolkits(toolset),
+            build_seconds=time.perf_counter() - started,
+        )
+        self._cache.set(key, components)
+        metrics.set_gauge("agent_factory_size", len(self._cache))
+        metrics.set_gauge("agent_factory_hit_rate", self._cache.hit_rate)
+        return components
+
+
+agent_factory = AgentFactory(
+    max_size=settings.agent_cache_size,
+    ttl_seconds=settings.agent_cache_ttl_seconds,
+)
+
+
+# Agno id of the chat agent (the id Agno derives from its name), under which
+# its runs are stored.
+CHAT_AGENT_ID = "agno-agent"
+
+# The default chat model: the first of ``settings.chat_models``, as in
+# ``model_registry``. Also used for one-off utility prompts (e.g. title
+# generation) until the router has measured a faster model.
+DEFAULT_MODEL_ID = settings.chat_models[0].id
 
 
 def create_agent(
     user_id: uuid.UUID,
     conversation_id: uuid.UUID,
-    model_id: str = "gemini-3-flash-preview",
+    model_id: str = DEFAULT_MODEL_ID,
+    num_history_runs: int = 3,
+    additional_context: Optional[str] = None,
+    history: Optional[List[Message]] = None,
 ) -> Agent:
     """
     This function allows us to create an Agno agent.
+
+    ``num_history_runs`` and ``additional_context`` come from
+    ``app.core.context.build_chat_context``, which sizes the replayed history
+    to the model's prompt budget and summarises what does not fit.
+
+    With ``history`` the agent is not persisted: it is given those messages
+    in place of its session's history and stores nothing (``db=None``). This
+    is for speculative runs (see ``app.core.routing``), several of which may
+    answer the same question; only the winner's turn is recorded, with
+    ``app.core.history.append_turn``.
+
+    The model client and MCP toolkits come from ``agent_factory`` and are
+    shared between requests; only the ``Agent`` wrapper is per-request.
+    Toolkits whose server is currently unreachable are left out rather than
+    reconnected inline, so a down MCP server never delays the first token.
     """
+    components = agent_factory.get_components(
+        model_id, tuple(settings.mcp_server_urls)
+    )
 
     agno_agent = Agent(
+        id=CHAT_AGENT_ID,
         name="Agno Agent",
         user_id=str(user_id),
         session_id=str(conversation_id),
-        model=Gemini(id=model_id),
-        db=agno_db,
-        tools=[MCPTools(transport="streamable-http", url="https://docs.agno.com/mcp")],
-        add_history_to_context=True,
-        num_history_runs=3,
+        model=components.model,
+        db=agno_db if history is None else None,
+        tools=[tool for tool in components.tools if tool.initialized],
+        add_history_to_context=history is None and num_history_runs > 0,
+        num_history_runs=num_history_runs,
+        # Placed where Agno would put the replayed history.
+        additional_input=(
+            [message.model_copy(update={"from_history": True}) for message in history]
+            if history
+            else None
+        ),
+        additional_context=additional_context,
         markdown=True,
     )
 
     return agno_agent
 
 
-# TODO: I get the feeling that the official Agno repo actually does this in sepparate files? Link: https://github.com/agno-agi/agentos-railway-template
-def create_history_reader_agent(conversation_id: uuid.UUID) -> List[Message]:
-    """
-    Creates an Agno agent to read the conversation history from a given conversation.
-    """
-    agent = Agent(db=agno_db)
-    return agent.get_chat_history(session_id=str(conversation_id))
-
-
-def create_utility_agent(prompt: str) -> RunOutput:
+async def create_utility_agent(
+    prompt: str, model_id: str = DEFAULT_MODEL_ID
+) -> RunOutput:
     """
     Helps with one-off requests, using an Agno agent.
+
+    Runs the agent through its async API so the model call never blocks the
+    event loop, and reuses the factory's cached model client. Callers pick
+    ``model_id`` with ``model_router.utility_model_id()``.
     """
+    components = agent_factory.get_components(model_id, ())
     agent = Agent(
-        model=Gemini(id="gemini-3-flash-preview"),
+        model=components.model,
     )
-    return agent.run(prompt)
+    return await agent.arun(prompt)
 
 
 # This helps you run this directly.
 if __name__ == "__main__":
-    agent = create_agent(uuid.uuid4(), uuid.uuid4(), "gemini-3-flash-preview")
-    agent.print_response("Hello!", stream=True)
+
+    async def main() -> None:
+        await mcp_manager.start()
+        agent = create_agent(uuid.uuid4(), uuid.uuid4(), DEFAULT_MODEL_ID)
+        await agent.aprint_response("Hello!", stream=True)
+        await mcp_manager.stop()
+
+    asyncio.run(main())
@@ -0,0 +1,115 @@
+"""
+In-process caching primitives.
+
+``TTLCache`` is a size-bounded LRU map whose entries also expire after a
+fixed time-to-live. It is not shared between worker processes, so anything
+cached here must be safe to serve slightly stale for up to ``ttl_seconds``.
+"""
+
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from typing import Generic, Optional, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class TTLCache(Generic[K, V]):
+    """Least-recently-used cache with per-entry expiry.
+
+    Args:
+        max_size: Maximum number of entries; the least recently used entry is
+            evicted when a new key would exceed it.
+        ttl_seconds: Lifetime of an entry from when it was set. ``None``
+            disables expiry.
+        on_evict: Optional callback invoked with ``(key, value)`` whenever an
+            entry is dropped because of size or expiry (not on ``pop``/``clear``).
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl_seconds: Optional[float] = None,
+        on_evict: Optional[Callable[[K, V], None]] = None,
+    ) -> None:
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.on_evict = on_evict
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: K) -> Optional[V]:
+        """Return the cached value for ``key``, or ``None`` if missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self._evicted(key, value)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: K, value: V) -> None:
+        """Insert or replace ``key``, evicting the least recently used entry if full."""
+        expires_at = (
+            time.monotonic() + self.ttl_seconds
+            if self.ttl_seconds is not None
+            else float("inf")
+        )
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            old_key, (_, old_value) = self._entries.popitem(last=False)
+            self._evicted(old_key, old_value)
+
+    def replace(self, key: K, update: Callable[[V], V]) -> Optional[V]:
+        """Swap a live entry's value for ``update(value)``, keeping its expiry.
+
+        Unlike ``set`` this neither extends the entry's lifetime nor counts as
+        a use, and a missing or expired ``key`` is left uncached.
+
+        Returns:
+            The new value, or ``None`` if ``key`` had no live entry.
+        """
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        expires_at, value = entry
+        new_value = update(value)
+        self._entries[key] = (expires_at, new_value)
+        return new_value
+
+    def pop(self, key: K) -> Optional[V]:
+        """Remove ``key`` and return its value (expired or not), or ``None``."""
+        entry = self._entries.pop(key, None)
+        return entry[1] if entry is not None else None
+
+    def values(self) -> list[V]:
+        """Return all cached values, including ones that have expired but not been purged."""
+        return [value for _, value in self._entries.values()]
+
+    def clear(self) -> None:
+        """Drop every entry without invoking ``on_evict``."""
+        self._entries.clear()
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of ``get`` calls that returned a live entry."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def _evicted(self, key: K, value: V) -> None:
+        self.evictions += 1
+        if self.on_evict is not None:
+            self.on_evict(key, value)
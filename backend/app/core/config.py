@@ -3,10 +3,23 @@ Application settings.
 """
 
 from pathlib import Path
+from typing import Optional
 
+from pydantic import BaseModel, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
+class ModelConfig(BaseModel):
+    """A chat model offered to clients."""
+
+    # Provider model id, e.g. "gemini-3-flash-preview".
+    id: str
+    # Human-readable name shown in the model picker.
+    name: str
+    # Maximum tokens the model accepts in one request.
+    context_window_tokens: int
+
+
 class Settings(BaseSettings):
     """
     Application settings. This class uses Pydantic's BaseSettings to automatically read environment variables and provide type validation.
@@ -19,8 +32,38 @@ class Settings(BaseSettings):
         extra="ignore",
     )
 
-    # The URL for the database connection. By default, it uses SQLite with a file named "agno.db" in the current directory.
+    # The URL for the database connection. By default, it uses SQLite with a file named "agno.db" in the current directory. PostgreSQL URLs (postgres://, postgresql://) are run on asyncpg.
     db_url: str = "sqlite+aiosqlite:///./agno.db"
+    # Apply pending schema migrations at startup. Disable in production and run `python -m app.migrations` once per deploy instead.
+    db_auto_migrate: bool = True
+    # Connections kept open in the write pool.
+    db_pool_size: int = 5
+    # Connections kept open in the read-only pool (SQLite only; other databases share the write pool settings).
+    db_read_pool_size: int = 10
+    # Extra connections a pool may open under load beyond its size.
+    db_max_overflow: int = 10
+    # Seconds a request waits for a pooled connection before failing (PostgreSQL).
+    db_pool_timeout_seconds: float = 30.0
+    # Seconds after which pooled connections are replaced, so idle-timeouts on proxies never hand out dead ones (PostgreSQL).
+    db_pool_recycle_seconds: int = 1800
+    # Prepared statements cached per asyncpg connection.
+    db_prepared_statement_cache_size: int = 500
+    # SQLite journal mode. WAL lets readers proceed while a write is in progress.
+    sqlite_journal_mode: str = "WAL"
+    # SQLite fsync level. NORMAL is durable across application crashes and safe with WAL.
+    sqlite_synchronous: str = "NORMAL"
+    # Milliseconds a SQLite connection waits for a lock before failing with "database is locked".
+    sqlite_busy_timeout_ms: int = 5000
+    # SQLite page cache per connection, in KiB.
+    sqlite_cache_size_kib: int = 65536
+    # Bytes of the SQLite file memory-mapped for reads.
+    sqlite_mmap_size_bytes: int = 268435456
+    # The URL of the Agno message store (async SQLAlchemy URL). Point it at its own SQLite file or a Postgres database (postgresql+asyncpg://...) so message writes don't contend with application writes.
+    agno_db_url: str = "sqlite+aiosqlite:///./agno.db"
+    # Connections kept open in the Agno message store's pool.
+    agno_db_pool_size: int = 5
+    # Extra connections the Agno message store's pool may open under load.
+    agno_db_max_overflow: int = 10
     # The secret key used for signing authentication tokens. This should be set to a secure random value in production.
     auth_secret: str
     # The environment in which the application is running. Can be "dev" for development or "prod" for production.
@@ -29,6 +72,154 @@ class Settings(BaseSettings):
     google_api_key: str
     # Fernet Encryption Key (used to encrypt API keys)
     fernet_key: str
+    # Maximum number of streamed chat deltas buffered between the model and a slow client before the model stream is paused.
+    chat_stream_buffer_size: int = 64
+    # Milliseconds over which consecutive streamed deltas are coalesced into one SSE frame (0 sends buffered deltas without waiting).
+    chat_stream_coalesce_ms: float = 16.0
+    # Maximum size of a coalesced SSE chunk in bytes; a chunk is sent as soon as it reaches this size.
+    chat_stream_max_chunk_bytes: int = 1024
+    # SSE frames kept per chat run so a dropped client can reconnect and resume.
+    chat_run_replay_size: int = 1024
+    # Seconds an unfinished chat run is kept alive after its last client disconnects, before it is cancelled.
+    chat_run_orphan_grace_seconds: float = 5.0
+    # Seconds between checks of whether a streaming client is still connected while no output is being sent.
+    chat_disconnect_poll_seconds: float = 1.0
+    # Seconds a finished chat run stays available for resuming.
+    chat_run_retention_seconds: float = 120.0
+    # MCP servers whose tools are attached to every chat agent.
+    mcp_server_urls: list[str] = ["https://docs.agno.com/mcp"]
+    # Models clients may chat with, as JSON: [{"id": ..., "name": ..., "context_window_tokens": ...}]. The first one is the default.
+    chat_models: list[ModelConfig] = [
+        ModelConfig(
+            id="gemini-3-flash-preview",
+            name="Gemini 3 Flash",
+            context_window_tokens=1048576,
+        ),
+    ]
+    # Recent runs per model kept for latency and error-rate statistics.
+    model_stats_window: int = 200
+    # Runs a model needs in its statistics window before routing decisions rely on them.
+    model_routing_min_samples: int = 20
+    # A model whose p95 time to first token exceeds this many seconds is routed around while an alternative is healthy.
+    model_max_p95_first_token_seconds: float = 8.0
+    # A model whose recent error rate exceeds this fraction is routed around while an alternative is healthy.
+    model_max_error_rate: float = 0.25
+    # Start the same chat on an alternative model when the first one is slow to respond, and keep whichever answers first.
+    model_hedging_enabled: bool = True
+    # Seconds without a first token before hedging, until the model has enough samples to use its own p95 instead.
+    model_hedge_after_seconds: float = 3.0
+    # Maximum number of (model, toolset) combinations whose clients and toolkits are kept warm.
+    agent_cache_size: int = 16
+    # Seconds before a cached model client / toolkit set is rebuilt.
+    agent_cache_ttl_seconds: float = 3600.0
+    # Seconds before discovered MCP tool schemas are re-listed from the server.
+    mcp_schema_ttl_seconds: float = 600.0
+    # Seconds between MCP connection health checks (dead connections are reconnected).
+    mcp_health_check_interval_seconds: float = 30.0
+    # Upper bound on a single MCP connect attempt, in seconds.
+    mcp_connect_timeout_seconds: float = 10.0
+    # Maximum chat runs a single user may have in flight.
+    llm_max_concurrent_per_user: int = 3
+    # Maximum model calls in flight across all users, per worker process.
+    llm_max_concurrent: int = 64
+    # Maximum callers waiting for a model-call slot; beyond this, requests are rejected immediately.
+    llm_max_queued: int = 256
+    # Seconds a caller waits for a model-call slot before being rejected (429 for chat).
+    llm_queue_timeout_seconds: float = 10.0
+    # Maximum background utility model calls (titles, summaries) a single user may have in flight; separate from chat runs.
+    llm_utility_max_concurrent_per_user: int = 2
+    # Maximum background utility model calls in flight across all users, per worker process.
+    llm_utility_max_concurrent: int = 4
+    # Seconds a background utility call waits for a slot before its job attempt fails.
+    llm_utility_queue_timeout_seconds: float = 60.0
+    # Number of background workers running deferred LLM jobs (e.g. title generation) concurrently.
+    job_worker_concurrency: int = 4
+    # Attempts per background job before it is marked as failed.
+    job_max_attempts: int = 3
+    # Delay before the first retry of a failed job, in seconds (doubles on each retry).
+    job_retry_backoff_seconds: float = 1.0
+    # Maximum number of pending or running background jobs; further jobs are rejected.
+    job_max_pending: int = 1000
+    # Seconds a finished job's status stays available to poll.
+    job_retention_seconds: float = 600.0
+    # Upper bound on a chat prompt's size in (estimated) tokens: system prompt, tools, summary, history and question.
+    context_max_prompt_tokens: int = 8000
+    # Per-model overrides of context_max_prompt_tokens, e.g. {"gemini-3-flash-preview": 32000}.
+    context_max_prompt_tokens_by_model: dict[str, int] = {}
+    # Tokens of the prompt budget set aside for the system prompt and tool schemas.
+    context_reserved_tokens: int = 1500
+    # Maximum number of recent turns sent verbatim, however much budget is left.
+    context_max_history_runs: int = 6
+    # Turns that must have fallen out of the verbatim window, unsummarised, before the conversation summary is refreshed.
+    context_summary_batch_runs: int = 4
+    # Target length of a conversation summary, in words.
+    context_summary_max_words: int = 250
+    # Number of conversation histories kept in the in-process history cache.
+    history_cache_size: int = 256
+    # Seconds a cached conversation history is kept; entries are also
+    # re-read whenever the Agno session changed since they were loaded.
+    history_cache_ttl_seconds: float = 300.0
+    # Maximum number of conversations whose metadata is kept in memory for ownership checks.
+    conversation_cache_size: int = 4096
+    # Seconds cached conversation metadata is served before being re-read.
+    conversation_cache_ttl_seconds: float = 300.0
+    # Milliseconds between batched writes of chat activity to Conversation.updated_at.
+    conversation_touch_flush_ms: int = 1000
+    # Reuse model responses for repeated prompts in the same context (shared between users who have not opted out).
+    response_cache_enabled: bool = False
+    # Maximum number of cached model responses.
+    response_cache_size: int = 1024
+    # Seconds a cached model response is reused.
+    response_cache_ttl_seconds: float = 3600.0
+    # Minimum similarity (0-1) for reusing the response to a similar, not identical, prompt. Unset disables the similarity tier.
+    response_cache_similarity_threshold: Optional[float] = None
+    # First messages of at most this many words are used as their own conversation title, without a model call.
+    title_heuristic_max_words: int = 6
+    # Number of model-generated titles memoized by first message.
+    title_memo_size: int = 4096
+    # Seconds a memoized title is reused.
+    title_memo_ttl_seconds: float = 86400.0
+    # Maximum number of authenticated users kept in memory.
+    user_cache_size: int = 1024
+    # Seconds a cached user is trusted before being reloaded. Bounds how long changes made outside the app (or by another worker) take to apply.
+    user_cache_ttl_seconds: float = 60.0
+
+    @field_validator("db_url")
+    @classmethod
+    def use_async_postgres_driver(cls, value: str) -> str:
+        """
+        Rewrite bare PostgreSQL URLs (as handed out by hosting providers) to use the asyncpg driver.
+        """
+        for prefix in ("postgres://", "postgresql://"):
+            if value.startswith(prefix):
+                return "postgresql+asyncpg://" + value.removeprefix(prefix)
+        return value
+
+    @field_validator("agno_db_url")
+    @classmethod
+    def use_async_agno_driver(cls, value: str) -> str:
+        """
+        Rewrite bare SQLite and PostgreSQL URLs to the async drivers the Agno store runs on.
+        """
+        if value.startswith("sqlite://"):
+            return "sqlite+aiosqlite://" + value.removeprefix("sqlite://")
+        for prefix in ("postgres://", "postgresql://"):
+            if value.startswith(prefix):
+                return "postgresql+asyncpg://" + value.removeprefix(prefix)
+        return value
+
+    @field_validator("chat_models")
+    @classmethod
+    def require_unique_models(cls, value: list[ModelConfig]) -> list[ModelConfig]:
+        """
+        Reject an empty model list (there would be no default) and duplicate model ids.
+        """
+        if not value:
+            raise ValueError("at least one chat model must be configured")
+        ids = [model.id for model in value]
+        if len(set(ids)) != len(ids):
+            raise ValueError("chat model ids must be unique")
+        return value
 
     @property
     def is_production(self) -> bool:
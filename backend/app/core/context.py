@@ -0,0 +1,217 @@
+"""
+Token-budgeted chat context.
+
+Instead of always replaying a fixed number of past turns, each chat run is
+given as many of the most recent turns as fit in the model's prompt budget
+(``context_max_prompt_tokens``, per-model overrides in
+``context_max_prompt_tokens_by_model``), after setting aside room for the
+system prompt, the tools and the new question. Turns that no longer fit are
+represented by a rolling summary stored in ``conversation_summaries``, which
+is passed to the agent as additional context.
+
+The summary is refreshed incrementally by a background job: once
+``context_summary_batch_runs`` turns have fallen out of the verbatim window
+without being summarised, the utility model folds them into the existing
+summary. Until the job has run, those turns are simply left out.
+
+Turns are counted the way Agno counts them for ``num_history_runs``
+(cancelled and failed runs are never replayed), both for the budget and for
+the summary's ``summarized_runs`` cursor.
+
+Token counts are estimates (about four characters per token), which is
+accurate enough for budgeting and needs no tokenizer.
+"""
+
+import logging
+import math
+import uuid
+from dataclasses import dataclass
+from typing import List, Optional
+
+from agno.models.message import Message
+from agno.run.base import RunStatus
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.agents import create_utility_agent
+from app.core.config import settings
+from app.core.history import get_conversation_turns
+from app.core.jobs import JobQueueFullError, job_queue
+from app.core.limits import utility_limiter
+from app.core.metrics import metrics
+from app.core.model_registry import model_registry
+from app.core.routing import model_router
+from app.crud.summary import (
+    get_conversation_summary_service,
+    upsert_conversation_summary_service,
+)
+from app.db import async_session_maker
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ChatContext:
+    """How much of a conversation's history a chat run should see."""
+
+    # Most recent turns passed verbatim (Agno ``num_history_runs``).
+    num_history_runs: int
+    # The messages of those turns, oldest first, for agents that do not read
+    # their session (see ``create_agent``).
+    history: List[Message]
+    # Summary of the older turns, passed as the agent's additional context.
+    additional_context: Optional[str]
+    # Estimated prompt size, excluding the reserved system/tool tokens.
+    prompt_tokens: int
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens in ``text`` (about four characters each)."""
+    return math.ceil(len(text) / 4)
+
+
+def prompt_token_limit(model_id: str) -> int:
+    """Return the prompt budget for ``model_id``, never more than its context window."""
+    limit = settings.context_max_prompt_tokens_by_model.get(
+        model_id, settings.context_max_prompt_tokens
+    )
+    model = model_registry.get(model_id)
+    if model is not None:
+        limit = min(limit, model.context_window_tokens)
+    return limit
+
+
+def _run_tokens(run: List[Message]) -> int:
+    return sum(estimate_tokens(str(message.content or "")) for message in run)
+
+
+def _fit_runs(run_tokens: List[int], budget: int) -> tuple[int, int]:
+    """Return how many of the newest runs fit in ``budget``, and their tokens."""
+    kept = 0
+    used = 0
+    for tokens in reversed(run_tokens[-settings.context_max_history_runs :]):
+        if used + tokens > budget:
+            break
+        kept += 1
+        used += tokens
+    return kept, used
+
+
+def _format_summary(summary: str) -> str:
+    return f"Summary of the earlier part of this conversation:\n{summary}"
+
+
+async def build_chat_context(
+    user_id: uuid.UUID,
+    conversation_id: uuid.UUID,
+    model_id: str,
+    question: str,
+    session: AsyncSession,
+) -> ChatContext:
+    """Choose the history window and summary for the next turn of a conversation.
+
+    The stored summary is only read when some turns do not fit the budget, so
+    short conversations cost no extra query. When enough turns have fallen
+    out of the window unsummarised, a summary refresh job is enqueued.
+
+    Args:
+        user_id: The conversation's owner (charged for the refresh job).
+        conversation_id: The conversation being continued.
+        model_id: The model that will answer, which sets the budget.
+        question: The new user message.
+        session: Async database session.
+    """
+    runs = await get_conversation_turns(conversation_id)
+    run_tokens = [_run_tokens(run) for run in runs]
+    budget = (
+        prompt_token_limit(model_id)
+        - settings.context_reserved_tokens
+        - estimate_tokens(question)
+    )
+    kept, used = _fit_runs(run_tokens, budget)
+
+    additional_context = None
+    if kept < len(runs):
+        summary = await get_conversation_summary_service(session, conversation_id)
+        summarized_runs = 0
+        if summary is not None:
+            summarized_runs = summary.summarized_runs
+            additional_context = _format_summary(summary.summary)
+            kept, used = _fit_runs(
+                run_tokens, budget - estimate_tokens(additional_context)
+            )
+            used += estimate_tokens(additional_context)
+        dropped = len(runs) - kept
+        metrics.increment("context_runs_trimmed", dropped)
+        if dropped - summarized_runs >= settings.context_summary_batch_runs:
+            _schedule_summary_refresh(user_id, conversation_id, dropped)
+
+    prompt_tokens = used + estimate_tokens(question)
+    metrics.observe("context_prompt_tokens_estimate", prompt_tokens)
+    return ChatContext(
+        num_history_runs=kept,
+        history=[message for run in runs[len(runs) - kept :] for message in run],
+        additional_context=additional_context,
+        prompt_tokens=prompt_tokens,
+    )
+
+
+def _schedule_summary_refresh(
+    user_id: uuid.UUID, conversation_id: uuid.UUID, up_to: int
+) -> None:
+    try:
+        job_queue.enqueue(
+            key=f"summary:{conversation_id}",
+            user_id=user_id,
+            run=lambda: refresh_conversation_summary(user_id, conversation_id, up_to),
+        )
+    except JobQueueFullError:
+        # Best effort: the next turn will try again.
+        logger.warning("Job queue full, summary of %s not refreshed", conversation_id)
+
+
+async def refresh_conversation_summary(
+    user_id: uuid.UUID, conversation_id: uuid.UUID, up_to: int
+) -> int:
+    """Fold the conversation's turns before ``up_to`` into its summary (runs as a background job).
+
+    Only the turns not yet covered by the stored summary are sent to the
+    model, together with that summary. Model failures and concurrency-limit
+    timeouts raise, so the job queue retries.
+
+    Returns:
+        The number of turns the stored summary now covers.
+    """
+    runs = (await get_conversation_turns(conversation_id))[:up_to]
+    # The request's session is closed by now, so the job opens its own.
+    async with async_session_maker() as session:
+        existing = await get_conversation_summary_service(session, conversation_id)
+    summarized_runs = existing.summarized_runs if existing is not None else 0
+    if len(runs) <= summarized_runs:
+        return summarized_runs
+
+    transcript = "\n".join(
+        f"{message.role}: {message.content or ''}"
+        for run in runs[summarized_runs:]
+        for message in run
+    )
+    prompt = (
+        f"Update the running summary of a conversation in at most "
+        f"{settings.context_summary_max_words} words. Keep facts, decisions, "
+        "names, numbers and open questions that later messages may refer to. "
+        "Return only the summary.\n\n"
+        f"Current summary:\n{existing.summary if existing is not None else '(none)'}"
+        f"\n\nNew messages:\n{transcript}"
+    )
+    async with utility_limiter.slot(user_id):
+        response = await create_utility_agent(
+            prompt, model_id=model_router.utility_model_id()
+        )
+    if response.status == RunStatus.error:
+        raise RuntimeError(f"Summary generation failed: {response.content}")
+
+    async with async_session_maker() as session:
+        await upsert_conversation_summary_service(
+            session, conversation_id, str(response.content or "").strip(), len(runs)
+        )
+    metrics.increment("context_summaries_refreshed")
+    return len(runs)
@@ -0,0 +1,246 @@
+"""
+Conversation message history, read directly from the Agno session store.
+
+Histories are cached per conversation and invalidated when a chat run on
+that conversation finishes or ``append_turn`` writes to it. The cache is per
+worker process and Agno may persist a run after that invalidation (cancelled
+runs are saved on a background task), so every cached entry is checked
+against the Agno session's ``updated_at`` (a primary-key lookup) before it
+is served, and re-read if the session changed since it was loaded. A cache
+hit therefore saves loading and parsing the session, not the query.
+
+Alongside the flat message list, the cache holds the conversation's turns as
+Agno counts them for ``num_history_runs``: top-level runs that did not end
+cancelled, errored or paused. Those runs stay in the displayed history but
+are never replayed to the model, so context budgeting works on the turns.
+"""
+
+import time
+import uuid
+from dataclasses import dataclass
+from typing import List, Optional
+
+from agno.db.base import SessionType
+from agno.models.message import Message
+from agno.run.agent import RunOutput
+from agno.run.base import RunStatus
+from agno.session.agent import AgentSession
+from sqlalchemy import column, select, table
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.core.agents import CHAT_AGENT_ID, agno_db
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.metrics import metrics
+
+try:
+    from agno.run.base import HISTORY_SKIP_STATUSES
+except ImportError:  # Agno < 3 skips these when replaying history
+    HISTORY_SKIP_STATUSES = [RunStatus.paused, RunStatus.cancelled, RunStatus.error]
+
+
+@dataclass
+class CachedHistory:
+    """A conversation history and the version of the session it was read from."""
+
+    messages: List[Message]
+    # The turns Agno replays as history, oldest first (see ``_history_turns``).
+    turns: List[List[Message]]
+    # The Agno session's ``updated_at`` (whole seconds), ``None`` without a session.
+    updated_at: Optional[int]
+    # Wall-clock time the session was read at.
+    loaded_at: float
+
+    def is_current(self, updated_at: Optional[int]) -> bool:
+        """Whether the session, now at ``updated_at``, is unchanged since the read."""
+        if updated_at != self.updated_at:
+            return False
+        # ``updated_at`` has one-second resolution: a write later in the second
+        # the session was read in would leave it unchanged.
+        return updated_at is None or updated_at < int(self.loaded_at)
+
+
+history_cache: TTLCache[uuid.UUID, CachedHistory] = TTLCache(
+    settings.history_cache_size, settings.history_cache_ttl_seconds
+)
+
+
+def _history_turns(session: AgentSession) -> List[List[Message]]:
+    """Return the user/assistant messages of each run Agno replays as history.
+
+    Mirrors Agno's own filter for ``num_history_runs``: member sub-runs and
+    runs with a status in ``HISTORY_SKIP_STATUSES`` are left out, so turn
+    ``-n`` here is the oldest run an agent with ``num_history_runs=n`` sees.
+    """
+    return [
+        [
+            message
+            for message in run.messages or []
+            if message.role in ("user", "assistant") and not message.from_history
+        ]
+        for run in session.runs or []
+        if run.parent_run_id is None and run.status not in HISTORY_SKIP_STATUSES
+    ]
+
+
+async def _load_history(conversation_id: uuid.UUID) -> CachedHistory:
+    """Read the user/assistant messages of a session from the Agno store."""
+    loaded_at = time.time()
+    session = await agno_db.get_session(
+        session_id=str(conversation_id), session_type=SessionType.AGENT
+    )
+    if session is None:
+        return CachedHistory(messages=[], turns=[], updated_at=None, loaded_at=loaded_at)
+    return CachedHistory(
+        messages=session.get_chat_history(),  # type: ignore[union-attr]
+        turns=_history_turns(session),  # type: ignore[arg-type]
+        updated_at=session.updated_at,  # type: ignore[union-attr]
+        loaded_at=loaded_at,
+    )
+
+
+async def _session_updated_at(conversation_id: uuid.UUID) -> Optional[int]:
+    """Read only the ``updated_at`` column of a session from the Agno store."""
+    sessions = table(
+        agno_db.session_table_name,
+        column("session_id"),
+        column("updated_at"),
+        schema=getattr(agno_db, "db_schema", None),
+    )
+    stmt = select(sessions.c.updated_at).where(
+        sessions.c.session_id == str(conversation_id)
+    )
+    try:
+        async with agno_db.db_engine.connect() as connection:  # type: ignore[attr-defined]
+            return (await connection.execute(stmt)).scalar_one_or_none()
+    except SQLAlchemyError:
+        # Agno creates its tables on first write, so none exist before the first chat.
+        return None
+
+
+async def _get_history(conversation_id: uuid.UUID) -> CachedHistory:
+    cached = history_cache.get(conversation_id)
+    if cached is not None:
+        updated_at = await _session_updated_at(conversation_id)
+        if cached.is_current(updated_at):
+            metrics.increment("history_cache_hits")
+            return cached
+        metrics.increment("history_cache_stale")
+
+    metrics.increment("history_cache_misses")
+    loaded = await _load_history(conversation_id)
+    history_cache.set(conversation_id, loaded)
+    return loaded
+
+
+async def get_conversation_history(conversation_id: uuid.UUID) -> List[Message]:
+    """Return the full chat history of a conversation, oldest first.
+
+    Args:
+        conversation_id: The conversation (Agno ``session_id``) to read.
+
+    Returns:
+        The conversation's user and assistant messages, or an empty list for
+        conversations without any messages yet.
+    """
+    return (await _get_history(conversation_id)).messages
+
+
+async def get_conversation_turns(conversation_id: uuid.UUID) -> List[List[Message]]:
+    """Return the turns of a conversation that Agno replays as history, oldest first.
+
+    Unlike ``get_conversation_history`` this leaves out cancelled, errored
+    and paused runs, so the last ``n`` turns are exactly what an agent with
+    ``num_history_runs=n`` is given.
+
+    Args:
+        conversation_id: The conversation (Agno ``session_id``) to read.
+
+    Returns:
+        One list of user and assistant messages per run.
+    """
+    return (await _get_history(conversation_id)).turns
+
+
+async def append_turn(
+    user_id: uuid.UUID,
+    conversation_id: uuid.UUID,
+    model_id: str,
+    question: str,
+    answer: str,
+) -> None:
+    """Record a question and answer produced without running the agent.
+
+    Writes a completed run to the conversation's Agno session (creating the
+    session if needed), so it shows up in the history and in the context of
+    later turns, and drops this worker's cached history of the conversation.
+    """
+    session = await agno_db.get_session(
+        session_id=str(conversation_id), session_type=SessionType.AGENT
+    )
+    if session is None:
+        session = AgentSession(
+            session_id=str(conversation_id),
+            agent_id=CHAT_AGENT_ID,
+            user_id=str(user_id),
+            created_at=int(time.time()),
+        )
+    run = RunOutput(
+        run_id=str(uuid.uuid4()),
+        agent_id=CHAT_AGENT_ID,
+        session_id=str(conversation_id),
+        user_id=str(user_id),
+        model=model_id,
+        content=answer,
+        messages=[
+            Message(role="user", content=question),
+            Message(role="assistant", content=answer),
+        ],
+        status=RunStatus.completed,
+    )
+    session.upsert_run(run)  # type: ignore[union-attr]
+    session.updated_at = int(time.time())
+    await agno_db.upsert_session(session)
+    if hasattr(agno_db, "upsert_run"):
+        # Newer Agno releases store runs in their own table, not in the session row.
+        await agno_db.upsert_run(
+            run,
+            session_id=str(conversation_id),
+            user_id=str(user_id),
+            run_index=len(session.runs or []) - 1,  # type: ignore[union-attr]
+        )
+    invalidate_history(conversation_id)
+
+
+def invalidate_history(conversation_id: uuid.UUID) -> None:
+    """Drop the cached history of a conversation (e.g. after a chat run)."""
+    history_cache.pop(conversation_id)
+
+
+def paginate_messages(
+    messages: List[Message], before: Optional[str], limit: Optional[int]
+) -> List[Message]:
+    """Return up to ``limit`` messages immediately preceding the ``before`` cursor.
+
+    Args:
+        messages: The full history, oldest first.
+        before: ID of a message; only messages older than it are returned.
+            ``None`` starts from the newest message.
+        limit: Maximum number of messages to return. ``None`` returns all.
+
+    Returns:
+        A chronological slice of ``messages``.
+
+    Raises:
+        KeyError: If ``before`` does not match any message ID.
+    """
+    end = len(messages)
+    if before is not None:
+        end = next(
+            (index for index, message in enumerate(messages) if message.id == before),
+            -1,
+        )
+        if end < 0:
+            raise KeyError(before)
+    start = 0 if limit is None else max(0, end - limit)
+    return messages[start:end]
@@ -0,0 +1,186 @@
+"""
+In-process background job queue for deferred LLM side-jobs.
+
+Work such as title generation is enqueued by request handlers and executed
+by a fixed pool of worker tasks started from the FastAPI lifespan, so the
+request returns immediately and bursts of new conversations are smoothed
+into at most ``concurrency`` concurrent model calls.
+
+Jobs are deduplicated by key: enqueueing a key that already has a pending or
+running job returns that job instead of creating another. Failed attempts
+are retried with exponential backoff. Finished jobs are kept for
+``retention_seconds`` so clients can poll their status.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from datetime import datetime
+from enum import Enum
+from typing import Any, Optional
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class JobStatus(str, Enum):
+    """Lifecycle state of a background job."""
+
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class JobQueueFullError(Exception):
+    """Raised when enqueueing would exceed the queue's pending-job limit."""
+
+
+@dataclass
+class Job:
+    """A unit of deferred work and its current status."""
+
+    key: str
+    user_id: uuid.UUID
+    run: Callable[[], Awaitable[Any]]
+    id: uuid.UUID = field(default_factory=uuid.uuid4)
+    status: JobStatus = JobStatus.PENDING
+    attempts: int = 0
+    result: Any = None
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=datetime.now)
+    finished_at: Optional[datetime] = None
+
+
+class JobQueue:
+    """Bounded-concurrency async job runner with dedup and retries.
+
+    Args:
+        concurrency: Number of worker tasks (maximum jobs running at once).
+        max_attempts: Attempts per job before it is marked failed.
+        retry_backoff_seconds: Delay before the first retry; doubles each attempt.
+        max_pending: Maximum number of pending or running jobs.
+        retention_seconds: How long finished jobs stay queryable.
+    """
+
+    def __init__(
+        self,
+        concurrency: int,
+        max_attempts: int,
+        retry_backoff_seconds: float,
+        max_pending: int,
+        retention_seconds: float,
+    ) -> None:
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.max_pending = max_pending
+        self.retention_seconds = retention_seconds
+        self._queue: asyncio.Queue[Job] = asyncio.Queue()
+        self._jobs: dict[uuid.UUID, Job] = {}
+        self._active_by_key: dict[str, Job] = {}
+        self._finished_at: dict[uuid.UUID, float] = {}
+        self._workers: list[asyncio.Task[None]] = []
+
+    def enqueue(
+        self, key: str, user_id: uuid.UUID, run: Callable[[], Awaitable[Any]]
+    ) -> Job:
+        """Schedule ``run`` under ``key``, or return the active job for that key.
+
+        Raises:
+            JobQueueFullError: If ``max_pending`` jobs are already active.
+        """
+        self._prune()
+        existing = self._active_by_key.get(key)
+        if existing is not None:
+            metrics.increment("jobs_deduplicated")
+            return existing
+        if len(self._active_by_key) >= self.max_pending:
+            metrics.increment("jobs_rejected")
+            raise JobQueueFullError(f"{self.max_pending} jobs already pending")
+
+        job = Job(key=key, user_id=user_id, run=run)
+        self._jobs[job.id] = job
+        self._active_by_key[key] = job
+        self._queue.put_nowait(job)
+        metrics.increment("jobs_enqueued")
+        self._record_depth()
+        return job
+
+    def get(self, job_id: uuid.UUID) -> Optional[Job]:
+        """Return the job with ``job_id`` if it is active or recently finished."""
+        return self._jobs.get(job_id)
+
+    async def start(self) -> None:
+        """Start the worker tasks."""
+        self._workers = [
+            asyncio.create_task(self._worker()) for _ in range(self.concurrency)
+        ]
+
+    async def stop(self) -> None:
+        """Cancel the workers. Pending jobs are dropped."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._execute(job)
+            finally:
+                self._queue.task_done()
+
+    async def _execute(self, job: Job) -> None:
+        job.status = JobStatus.RUNNING
+        job.attempts += 1
+        try:
+            job.result = await job.run()
+        except Exception as exc:
+            if job.attempts < self.max_attempts:
+                # Re-queue after a backoff without holding a worker slot.
+                delay = self.retry_backoff_seconds * 2 ** (job.attempts - 1)
+                job.status = JobStatus.PENDING
+                job.error = str(exc)
+                metrics.increment("jobs_retried")
+                asyncio.get_running_loop().call_later(
+                    delay, self._queue.put_nowait, job
+                )
+                return
+            logger.exception("Job %s (%s) failed", job.id, job.key)
+            job.status = JobStatus.FAILED
+            job.error = str(exc)
+            metrics.increment("jobs_failed")
+        else:
+            job.status = JobStatus.SUCCEEDED
+            job.error = None
+            metrics.increment("jobs_succeeded")
+        job.finished_at = datetime.now()
+        self._finished_at[job.id] = time.monotonic()
+        self._active_by_key.pop(job.key, None)
+        self._record_depth()
+
+    def _prune(self) -> None:
+        cutoff = time.monotonic() - self.retention_seconds
+        for job_id, finished in list(self._finished_at.items()):
+            if finished < cutoff:
+                del self._finished_at[job_id]
+                self._jobs.pop(job_id, None)
+
+    def _record_depth(self) -> None:
+        metrics.set_gauge("jobs_active", len(self._active_by_key))
+
+
+job_queue = JobQueue(
+    concurrency=settings.job_worker_concurrency,
+    max_attempts=settings.job_max_attempts,
+    retry_backoff_seconds=settings.job_retry_backoff_seconds,
+    max_pending=settings.job_max_pending,
+    retention_seconds=settings.job_retention_seconds,
+)
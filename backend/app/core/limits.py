@@ -0,0 +1,186 @@
+"""
+Admission control for model calls.
+
+Every chat run takes a slot from ``llm_limiter`` before calling the model.
+A user may hold at most ``per_user`` slots and the process at most
+``max_concurrent``; further callers wait in line for up to
+``queue_timeout_seconds``, and are turned away immediately once
+``max_queued`` callers are already waiting. Rejected chat requests get a
+429 with ``Retry-After``.
+
+Background utility jobs (title generation, summary refreshes) take their
+slots from ``utility_limiter`` instead. They would otherwise queue behind
+the user's own open streams, time out and spend their retries while the
+chats that triggered them are still running; on a budget of their own they
+only wait for each other, and for longer, since nobody is waiting on the
+response. The limits are per worker process.
+"""
+
+import asyncio
+import time
+import uuid
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+
+class ConcurrencyLimitError(Exception):
+    """Raised when a slot could not be obtained in time.
+
+    Attributes:
+        retry_after: Suggested delay in seconds before trying again.
+    """
+
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(f"Concurrency limit reached, retry after {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+@dataclass
+class _UserSlots:
+    semaphore: asyncio.Semaphore
+    # Callers holding or waiting for one of this user's slots.
+    references: int = 0
+
+
+class Permit:
+    """A held slot. ``release`` is idempotent, so it is safe to call from cleanup paths."""
+
+    def __init__(self, limiter: "ConcurrencyLimiter", user_id: uuid.UUID) -> None:
+        self._limiter = limiter
+        self._user_id = user_id
+        self._acquired_at = time.monotonic()
+        self._released = False
+
+    def release(self) -> None:
+        """Give the slot back to the limiter."""
+        if self._released:
+            return
+        self._released = True
+        self._limiter._release(self._user_id, time.monotonic() - self._acquired_at)
+
+
+class ConcurrencyLimiter:
+    """Per-user and global concurrency caps with a bounded, timed wait queue.
+
+    Args:
+        name: Prefix of the metrics this limiter records.
+        per_user: Maximum slots held at once by a single user.
+        max_concurrent: Maximum slots held at once across all users.
+        max_queued: Maximum callers waiting for a slot; further callers are
+            rejected without waiting.
+        queue_timeout_seconds: How long a caller waits for a slot.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        per_user: int,
+        max_concurrent: int,
+        max_queued: int,
+        queue_timeout_seconds: float,
+    ) -> None:
+        self.name = name
+        self.per_user = per_user
+        self.max_queued = max_queued
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self._global = asyncio.Semaphore(max_concurrent)
+        self._users: dict[uuid.UUID, _UserSlots] = {}
+        self._waiting = 0
+        self._in_flight = 0
+        # Moving average of how long a slot is held, used for Retry-After.
+        self._average_hold_seconds = 0.0
+
+    async def acquire(self, user_id: uuid.UUID) -> Permit:
+        """Wait for a slot for ``user_id``.
+
+        Raises:
+            ConcurrencyLimitError: If the wait queue is full or no slot became
+                free within ``queue_timeout_seconds``.
+        """
+        if self._waiting >= self.max_queued:
+            metrics.increment(f"{self.name}_rejected")
+            raise ConcurrencyLimitError(self._retry_after())
+
+        user = self._users.get(user_id)
+        if user is None:
+            user = self._users[user_id] = _UserSlots(asyncio.Semaphore(self.per_user))
+        user.references += 1
+        self._waiting += 1
+        self._record()
+        started = time.monotonic()
+        holds_user_slot = False
+        try:
+            async with asyncio.timeout(self.queue_timeout_seconds):
+                await user.semaphore.acquire()
+                holds_user_slot = True
+                await self._global.acquire()
+        except BaseException as exc:
+            if holds_user_slot:
+                user.semaphore.release()
+            self._drop_user(user_id)
+            if isinstance(exc, TimeoutError):
+                metrics.increment(f"{self.name}_timeouts")
+                raise ConcurrencyLimitError(self._retry_after()) from None
+            raise
+        finally:
+            self._waiting -= 1
+            waited = time.monotonic() - started
+            metrics.observe(f"{self.name}_wait_seconds", waited)
+            metrics.set_gauge(f"{self.name}_last_wait_seconds", waited)
+            self._record()
+
+        self._in_flight += 1
+        self._record()
+        return Permit(self, user_id)
+
+    @asynccontextmanager
+    async def slot(self, user_id: uuid.UUID) -> AsyncGenerator[None, None]:
+        """Hold a slot for the duration of the ``async with`` block."""
+        permit = await self.acquire(user_id)
+        try:
+            yield
+        finally:
+            permit.release()
+
+    def _release(self, user_id: uuid.UUID, held_seconds: float) -> None:
+        self._global.release()
+        self._users[user_id].semaphore.release()
+        self._drop_user(user_id)
+        self._in_flight -= 1
+        self._average_hold_seconds += 0.2 * (held_seconds - self._average_hold_seconds)
+        self._record()
+
+    def _drop_user(self, user_id: uuid.UUID) -> None:
+        user = self._users[user_id]
+        user.references -= 1
+        if user.references == 0:
+            del self._users[user_id]
+
+    def _retry_after(self) -> float:
+        return max(1.0, self._average_hold_seconds)
+
+    def _record(self) -> None:
+        metrics.set_gauge(f"{self.name}_queue_depth", self._waiting)
+        metrics.set_gauge(f"{self.name}_in_flight", self._in_flight)
+
+
+llm_limiter = ConcurrencyLimiter(
+    name="llm",
+    per_user=settings.llm_max_concurrent_per_user,
+    max_concurrent=settings.llm_max_concurrent,
+    max_queued=settings.llm_max_queued,
+    queue_timeout_seconds=settings.llm_queue_timeout_seconds,
+)
+
+utility_limiter = ConcurrencyLimiter(
+    name="llm_utility",
+    per_user=settings.llm_utility_max_concurrent_per_user,
+    max_concurrent=settings.llm_utility_max_concurrent,
+    # Only job workers wait here, and the job queue already bounds them.
+    max_queued=settings.job_max_pending,
+    queue_timeout_seconds=settings.llm_utility_queue_timeout_seconds,
+)
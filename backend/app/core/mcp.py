@@ -0,0 +1,137 @@
+"""
+Long-lived MCP connections shared across chat requests.
+
+Connecting an ``MCPTools`` toolkit performs the MCP handshake and tool-list
+discovery, which used to happen on every chat turn before the first token
+could stream. ``MCPSessionManager`` connects each configured server once at
+startup, re-discovers tool schemas every ``schema_ttl_seconds``, and
+reconnects servers that stop answering pings.
+
+Agents only ever receive toolkits that are currently connected. Agno skips
+connecting (and tearing down) toolkits that are already initialized, so a
+shared toolkit is never closed underneath a concurrent run.
+
+A toolkit is always closed before it is reconnected, and after a connect
+attempt that timed out mid-handshake, so no dead session or transport is left
+open behind it.
+"""
+
+import asyncio
+import contextlib
+import logging
+import time
+from typing import List, Optional
+
+from agno.tools.mcp.mcp import MCPTools
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class MCPSessionManager:
+    """Owns one ``MCPTools`` connection per configured MCP server URL.
+
+    Args:
+        urls: MCP server URLs (streamable HTTP transport).
+        schema_ttl_seconds: How long discovered tool schemas are trusted
+            before they are re-listed from the server.
+        health_check_interval_seconds: How often connections are pinged and
+            reconnected if dead.
+        connect_timeout_seconds: Upper bound on a single connect attempt.
+    """
+
+    def __init__(
+        self,
+        urls: List[str],
+        schema_ttl_seconds: float,
+        health_check_interval_seconds: float,
+        connect_timeout_seconds: float,
+    ) -> None:
+        self.schema_ttl_seconds = schema_ttl_seconds
+        self.health_check_interval_seconds = health_check_interval_seconds
+        self.connect_timeout_seconds = connect_timeout_seconds
+        self._toolkits: dict[str, MCPTools] = {
+            url: MCPTools(transport="streamable-http", url=url) for url in urls
+        }
+        self._schemas_loaded_at: dict[str, float] = {}
+        self._maintenance_task: Optional[asyncio.Task[None]] = None
+
+    def get_toolkits(self, toolset: tuple[str, ...]) -> List[MCPTools]:
+        """Return the managed toolkits for ``toolset`` (connected or not)."""
+        return [self._toolkits[url] for url in toolset if url in self._toolkits]
+
+    async def start(self) -> None:
+        """Connect every server and start the background maintenance loop."""
+        await asyncio.gather(*(self._connect(url) for url in self._toolkits))
+        self._maintenance_task = asyncio.create_task(self._maintain())
+
+    async def stop(self) -> None:
+        """Stop the maintenance loop and close every connection."""
+        if self._maintenance_task is not None:
+            self._maintenance_task.cancel()
+            try:
+                await self._maintenance_task
+            except asyncio.CancelledError:
+                pass
+            self._maintenance_task = None
+        for toolkit in self._toolkits.values():
+            await _close_toolkit(toolkit)
+
+    async def _connect(self, url: str, force: bool = False) -> None:
+        toolkit = self._toolkits[url]
+        if force:
+            # ``connect(force=True)`` drops the old session without exiting it.
+            await _close_toolkit(toolkit)
+        try:
+            await asyncio.wait_for(
+                toolkit.connect(force=force), timeout=self.connect_timeout_seconds
+            )
+        except asyncio.TimeoutError:
+            logger.warning("Timed out connecting to MCP server %s", url)
+            await _close_toolkit(toolkit)
+        if toolkit.initialized:
+            self._schemas_loaded_at[url] = time.monotonic()
+            metrics.increment("mcp_connects")
+        else:
+            metrics.increment("mcp_connect_failures")
+        metrics.set_gauge(
+            "mcp_connected_servers",
+            sum(1 for tk in self._toolkits.values() if tk.initialized),
+        )
+
+    async def _maintain(self) -> None:
+        """Ping, reconnect and refresh schemas until cancelled."""
+        while True:
+            await asyncio.sleep(self.health_check_interval_seconds)
+            for url, toolkit in self._toolkits.items():
+                try:
+                    if not toolkit.initialized or not await toolkit.is_alive():
+                        metrics.increment("mcp_reconnects")
+                        await self._connect(url, force=True)
+                        continue
+                    loaded_at = self._schemas_loaded_at.get(url, 0.0)
+                    if time.monotonic() - loaded_at >= self.schema_ttl_seconds:
+                        await toolkit.build_tools()
+                        self._schemas_loaded_at[url] = time.monotonic()
+                        metrics.increment("mcp_schema_refreshes")
+                except Exception:
+                    logger.exception("MCP maintenance failed for %s", url)
+
+
+async def _close_toolkit(toolkit: MCPTools) -> None:
+    """Close ``toolkit``, including a connection whose handshake never finished."""
+    await toolkit.close()
+    # ``close()`` returns early unless the toolkit is initialized, so exit any
+    # session or transport context a partial handshake left entered.
+    with contextlib.suppress(Exception):
+        await toolkit.__aexit__(None, None, None)
+
+
+mcp_manager = MCPSessionManager(
+    urls=settings.mcp_server_urls,
+    schema_ttl_seconds=settings.mcp_schema_ttl_seconds,
+    health_check_interval_seconds=settings.mcp_health_check_interval_seconds,
+    connect_timeout_seconds=settings.mcp_connect_timeout_seconds,
+)
@@ -0,0 +1,37 @@
+"""
+Process-local counters and gauges.
+
+Subsystems record into the shared ``metrics`` instance and the values are
+exposed through ``GET /api/v1/metrics``. Values are per worker process.
+"""
+
+from collections import defaultdict
+
+
+class Metrics:
+    """A minimal registry of counters, point-in-time gauges and summarised samples."""
+
+    def __init__(self) -> None:
+        self._counters: defaultdict[str, float] = defaultdict(float)
+        self._gauges: dict[str, float] = {}
+
+    def increment(self, name: str, value: float = 1.0) -> None:
+        """Add ``value`` to the counter ``name``."""
+        self._counters[name] += value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        """Set the gauge ``name`` to ``value``."""
+        self._gauges[name] = value
+
+    def observe(self, name: str, value: float) -> None:
+        """Record one sample of ``name`` as ``<name>_count``, ``<name>_sum`` and ``<name>_max``."""
+        self._counters[f"{name}_count"] += 1
+        self._counters[f"{name}_sum"] += value
+        self._gauges[f"{name}_max"] = max(self._gauges.get(f"{name}_max", 0.0), value)
+
+    def snapshot(self) -> dict[str, float]:
+        """Return a copy of every counter and gauge, keyed by name."""
+        return {**self._counters, **self._gauges}
+
+
+metrics = Metrics()
@@ -0,0 +1,124 @@
+"""
+Registry of the chat models clients may use.
+
+The supported models are read once from ``settings.chat_models``. At startup
+``warm`` builds each model's client (and the chat toolkits) in
+``agent_factory``, so the first chat on a model does not pay for client
+construction. Requests naming a model outside the registry are rejected
+before any agent is built.
+
+Each model also keeps rolling statistics over its last ``model_stats_window``
+runs — time to first token and error rate — which ``GET /api/v1/models``
+reports. Statistics are per worker process.
+"""
+
+import math
+import time
+from collections import deque
+from collections.abc import Sequence
+from typing import Optional
+
+from app.core.agents import agent_factory
+from app.core.config import ModelConfig, settings
+from app.core.metrics import metrics
+
+
+def _percentile(samples: Sequence[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile of ``samples``, or ``None`` when there are none."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+class ModelStats:
+    """Rolling time-to-first-token and outcome samples of a model's recent runs.
+
+    Args:
+        window: Number of recent samples kept of each kind.
+    """
+
+    def __init__(self, window: int) -> None:
+        self._first_token_seconds: deque[float] = deque(maxlen=window)
+        self._outcomes: deque[bool] = deque(maxlen=window)
+
+    def record_first_token(self, seconds: float) -> None:
+        """Record the time a run took to produce its first content (or, for a
+        run cancelled in favour of a hedge, how long it had waited)."""
+        self._first_token_seconds.append(seconds)
+
+    def record_outcome(self, succeeded: bool) -> None:
+        """Record whether a run completed without an error."""
+        self._outcomes.append(succeeded)
+
+    @property
+    def runs(self) -> int:
+        """Number of finished runs in the window."""
+        return len(self._outcomes)
+
+    @property
+    def first_token_samples(self) -> int:
+        """Number of time-to-first-token samples in the window."""
+        return len(self._first_token_seconds)
+
+    @property
+    def first_token_p50_seconds(self) -> Optional[float]:
+        """Median time to first token, or ``None`` before any run."""
+        return _percentile(self._first_token_seconds, 0.5)
+
+    @property
+    def first_token_p95_seconds(self) -> Optional[float]:
+        """95th-percentile time to first token, or ``None`` before any run."""
+        return _percentile(self._first_token_seconds, 0.95)
+
+    @property
+    def error_rate(self) -> Optional[float]:
+        """Fraction of failed runs in the window, or ``None`` before any run."""
+        if not self._outcomes:
+            return None
+        return self._outcomes.count(False) / len(self._outcomes)
+
+
+class ModelRegistry:
+    """The configured chat models and their rolling statistics.
+
+    Args:
+        models: Supported models; the first is the default.
+        stats_window: Recent runs kept per model for statistics.
+    """
+
+    def __init__(self, models: Sequence[ModelConfig], stats_window: int) -> None:
+        self._models = {model.id: model for model in models}
+        self._stats = {model.id: ModelStats(stats_window) for model in models}
+        self.default_id = models[0].id
+
+    def get(self, model_id: str) -> Optional[ModelConfig]:
+        """Return the configuration of ``model_id``, or ``None`` if it is not supported."""
+        return self._models.get(model_id)
+
+    def all(self) -> list[ModelConfig]:
+        """Return every supported model, default first."""
+        return list(self._models.values())
+
+    def stats(self, model_id: str) -> ModelStats:
+        """Return the rolling statistics of a supported model."""
+        return self._stats[model_id]
+
+    def warm(self) -> None:
+        """Build every model's client ahead of the first request.
+
+        Call after ``mcp_manager.start()`` so the chat toolkits are included.
+        """
+        started = time.perf_counter()
+        toolset = tuple(settings.mcp_server_urls)
+        for model_id in self._models:
+            agent_factory.get_components(model_id, toolset)
+        # Utility jobs run without tools, on the default model until measured.
+        agent_factory.get_components(self.default_id, ())
+        metrics.set_gauge("model_registry_warm_seconds", time.perf_counter() - started)
+
+
+model_registry = ModelRegistry(
+    models=settings.chat_models,
+    stats_window=settings.model_stats_window,
+)
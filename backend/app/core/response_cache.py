@@ -0,0 +1,200 @@
+"""
+Cache of model responses for repeated prompts.
+
+Responses are keyed by ``(model_id, history fingerprint, normalised prompt)``.
+The fingerprint hashes the conversation history the model would see, so a
+cached answer is only reused when both the question and its context match
+(in practice: first turns of new conversations, and utility prompts).
+
+Lookups try an exact match on the normalised prompt first. When
+``response_cache_similarity_threshold`` is set, a second tier compares the
+prompt's embedding with those of cached prompts sharing the same model and
+history, and reuses the closest one above the threshold. ``HashingEmbedder``
+is a dependency-free stand-in; any object implementing ``Embedder`` (e.g. a
+local sentence-embedding model) can be passed to ``ResponseCache`` instead.
+
+The cache is shared between users, per worker process, and disabled unless
+``response_cache_enabled`` is set. Users can opt out individually with
+``User.response_cache_opt_out``; opted-out users neither read nor populate it.
+"""
+
+import hashlib
+import math
+import re
+import uuid
+from collections.abc import AsyncGenerator, Sequence
+from dataclasses import dataclass
+from typing import Optional, Protocol
+
+from agno.models.message import Message
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.history import append_turn
+from app.core.metrics import metrics
+
+_WORD = re.compile(r"\w+")
+
+# (model_id, history fingerprint, normalised prompt)
+_Key = tuple[str, str, str]
+# (model_id, history fingerprint)
+_Bucket = tuple[str, str]
+
+
+class Embedder(Protocol):
+    """Turns text into a unit-length vector; similar texts give close vectors."""
+
+    def embed(self, text: str) -> Sequence[float]:
+        """Return the L2-normalised embedding of ``text``."""
+        ...
+
+
+class HashingEmbedder:
+    """Stand-in embedder using signed feature hashing of words and word pairs.
+
+    Captures lexical overlap only (reordered or lightly edited questions),
+    not paraphrases.
+
+    Args:
+        dimensions: Length of the produced vectors.
+    """
+
+    def __init__(self, dimensions: int = 256) -> None:
+        self.dimensions = dimensions
+
+    def embed(self, text: str) -> Sequence[float]:
+        """Return the L2-normalised hashed bag of words and bigrams of ``text``."""
+        words = _WORD.findall(text.lower())
+        features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        vector = [0.0] * self.dimensions
+        for feature in features:
+            digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dimensions
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(math.sumprod(vector, vector))
+        return [value / norm for value in vector] if norm else vector
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Lower-case ``prompt``, collapse whitespace and drop trailing punctuation."""
+    return " ".join(prompt.lower().split()).rstrip(" ?!.")
+
+
+def history_fingerprint(messages: Sequence[Message]) -> str:
+    """Return a stable hash of a conversation history (``""`` when empty)."""
+    if not messages:
+        return ""
+    digest = hashlib.sha256()
+    for message in messages:
+        digest.update(f"{message.role}\0{message.content}\n".encode())
+    return digest.hexdigest()
+
+
+@dataclass
+class _Entry:
+    content: str
+    bucket: _Bucket
+
+
+class ResponseCache:
+    """Exact and (optionally) embedding-similarity cache of model responses.
+
+    Args:
+        max_size: Maximum number of cached responses (least recently used
+            are evicted first).
+        ttl_seconds: Lifetime of a cached response.
+        embedder: Enables the similarity tier when given.
+        similarity_threshold: Minimum cosine similarity for a similarity hit.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl_seconds: float,
+        embedder: Optional[Embedder] = None,
+        similarity_threshold: float = 0.9,
+    ) -> None:
+        self.embedder = embedder
+        self.similarity_threshold = similarity_threshold
+        self._entries: TTLCache[_Key, _Entry] = TTLCache(
+            max_size, ttl_seconds, on_evict=self._forget
+        )
+        # Embeddings of the cached prompts, grouped by model and history.
+        self._embeddings: dict[_Bucket, dict[_Key, Sequence[float]]] = {}
+
+    def lookup(self, model_id: str, fingerprint: str, prompt: str) -> Optional[str]:
+        """Return a cached response for ``prompt`` in this context, if any."""
+        key = (model_id, fingerprint, normalize_prompt(prompt))
+        entry = self._entries.get(key)
+        if entry is not None:
+            metrics.increment("response_cache_exact_hits")
+            return entry.content
+
+        if self.embedder is not None:
+            candidates = self._embeddings.get((model_id, fingerprint), {})
+            if candidates:
+                embedding = self.embedder.embed(key[2])
+                best_key, best_score = max(
+                    (
+                        (candidate, math.sumprod(embedding, vector))
+                        for candidate, vector in candidates.items()
+                    ),
+                    key=lambda item: item[1],
+                )
+                if best_score >= self.similarity_threshold:
+                    entry = self._entries.get(best_key)
+                    if entry is not None:
+                        metrics.increment("response_cache_similar_hits")
+                        return entry.content
+
+        metrics.increment("response_cache_misses")
+        return None
+
+    def store(self, model_id: str, fingerprint: str, prompt: str, content: str) -> None:
+        """Cache ``content`` as the response to ``prompt`` in this context."""
+        if not content:
+            return
+        bucket = (model_id, fingerprint)
+        key = (model_id, fingerprint, normalize_prompt(prompt))
+        self._entries.set(key, _Entry(content, bucket))
+        if self.embedder is not None:
+            self._embeddings.setdefault(bucket, {})[key] = self.embedder.embed(key[2])
+        metrics.increment("response_cache_stores")
+        metrics.set_gauge("response_cache_size", len(self._entries))
+
+    def _forget(self, key: _Key, entry: _Entry) -> None:
+        bucket = self._embeddings.get(entry.bucket)
+        if bucket is not None:
+            bucket.pop(key, None)
+            if not bucket:
+                del self._embeddings[entry.bucket]
+
+
+async def replay_cached_turn(
+    user_id: uuid.UUID,
+    conversation_id: uuid.UUID,
+    model_id: str,
+    question: str,
+    answer: str,
+) -> AsyncGenerator[str, None]:
+    """Yield a cached answer in stream-sized chunks, then record the turn.
+
+    The question and answer are appended to the conversation's Agno session
+    so the exchange appears in its history like a generated one.
+    """
+    size = settings.chat_stream_max_chunk_bytes
+    for start in range(0, len(answer), size):
+        yield answer[start : start + size]
+    await append_turn(user_id, conversation_id, model_id, question, answer)
+
+
+response_cache = ResponseCache(
+    max_size=settings.response_cache_size,
+    ttl_seconds=settings.response_cache_ttl_seconds,
+    embedder=(
+        HashingEmbedder()
+        if settings.response_cache_similarity_threshold is not None
+        else None
+    ),
+    similarity_threshold=settings.response_cache_similarity_threshold or 1.0,
+)
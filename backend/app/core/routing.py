@@ -0,0 +1,238 @@
+"""
+Latency-aware model routing.
+
+``model_router`` uses the rolling statistics kept by ``model_registry`` (p50
+and p95 time to first token, error rate) to pick models:
+
+- **Failover.** A model whose p95 time to first token or error rate exceeds
+  ``model_max_p95_first_token_seconds`` / ``model_max_error_rate`` is
+  "unhealthy"; chats requested on it are sent to the fastest healthy
+  alternative instead. A statistic based on fewer than
+  ``model_routing_min_samples`` samples is given the benefit of the doubt.
+- **Hedging.** ``hedged_stream`` starts the chat on the chosen model and,
+  if no content has arrived once the model's p95 time to first token has
+  passed (``model_hedge_after_seconds`` until it has enough samples), starts
+  it on the alternative the caller chose (``alternative_to``) too. Whichever
+  produces content first is streamed; the other is cancelled. A run that
+  fails before producing content falls over to the alternative straight away. Because several runs may answer the
+  same question, the chat endpoint runs them unpersisted and records only
+  the winner's turn.
+- **Utility jobs** (titles, summaries) go to the model with the lowest p50
+  time to first token.
+
+With a single configured model all of this is a no-op. The routing logic
+only deals in model ids and async generators of text, so it can be exercised
+with local stand-in backends that inject delays or errors.
+"""
+
+import asyncio
+import contextlib
+import math
+from collections.abc import AsyncGenerator, Callable
+from typing import Optional
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.model_registry import ModelRegistry, model_registry
+
+
+async def _first_chunk(stream: AsyncGenerator[str, None]) -> Optional[str]:
+    return await anext(stream, None)
+
+
+class ModelRouter:
+    """Chooses models from their recent latency and error rate.
+
+    Args:
+        registry: The supported models and their statistics.
+        min_samples: Runs a model needs before its statistics are trusted.
+        max_p95_first_token_seconds: Slowest acceptable p95 time to first token.
+        max_error_rate: Highest acceptable fraction of failed runs.
+        hedging_enabled: Whether ``hedge_after`` returns a delay at all.
+        hedge_after_seconds: Hedge delay for models without enough samples.
+    """
+
+    def __init__(
+        self,
+        registry: ModelRegistry,
+        min_samples: int,
+        max_p95_first_token_seconds: float,
+        max_error_rate: float,
+        hedging_enabled: bool,
+        hedge_after_seconds: float,
+    ) -> None:
+        self.registry = registry
+        self.min_samples = min_samples
+        self.max_p95_first_token_seconds = max_p95_first_token_seconds
+        self.max_error_rate = max_error_rate
+        self.hedging_enabled = hedging_enabled
+        self.hedge_after_seconds = hedge_after_seconds
+
+    def is_healthy(self, model_id: str) -> bool:
+        """Whether ``model_id`` is within the latency and error-rate thresholds."""
+        stats = self.registry.stats(model_id)
+        if stats.first_token_samples >= self.min_samples:
+            p95 = stats.first_token_p95_seconds
+            if p95 is not None and p95 > self.max_p95_first_token_seconds:
+                return False
+        if stats.runs >= self.min_samples:
+            if (stats.error_rate or 0.0) > self.max_error_rate:
+                return False
+        return True
+
+    def route(self, model_id: str) -> str:
+        """Return the model a chat requested on ``model_id`` should run on."""
+        if self.is_healthy(model_id):
+            return model_id
+        alternative = self.alternative_to(model_id)
+        if alternative is None:
+            return model_id
+        metrics.increment("model_failovers")
+        return alternative
+
+    def alternative_to(self, model_id: str) -> Optional[str]:
+        """Return the fastest healthy model other than ``model_id``, if any."""
+        candidates = [
+            model.id
+            for model in self.registry.all()
+            if model.id != model_id and self.is_healthy(model.id)
+        ]
+        if not candidates:
+            return None
+        return min(candidates, key=self._p50)
+
+    def hedge_after(self, model_id: str) -> Optional[float]:
+        """Seconds to wait for ``model_id``'s first token before hedging (``None``: never)."""
+        if not self.hedging_enabled:
+            return None
+        stats = self.registry.stats(model_id)
+        p95 = stats.first_token_p95_seconds
+        if stats.first_token_samples < self.min_samples or p95 is None:
+            return self.hedge_after_seconds
+        return p95
+
+    def utility_model_id(self) -> str:
+        """Return the fastest measured healthy model for utility jobs, else the default."""
+        measured = [
+            model.id
+            for model in self.registry.all()
+            if self.registry.stats(model.id).first_token_samples >= self.min_samples
+            and self.is_healthy(model.id)
+        ]
+        if not measured:
+            return self.registry.default_id
+        return min(measured, key=self._p50)
+
+    async def hedged_stream(
+        self,
+        start: Callable[[str], AsyncGenerator[str, None]],
+        model_id: str,
+        alternative: Optional[str],
+    ) -> AsyncGenerator[str, None]:
+        """Stream ``start(model_id)``, hedging or failing over to an alternative.
+
+        Args:
+            start: Starts a run on the given model and returns its content
+                stream. Runs should raise, rather than stream an error
+                message, when they fail before producing content, and should
+                not persist anything until they are streamed to the end: a
+                losing run is closed early.
+            model_id: The model to try first.
+            alternative: The model to hedge or fail over to, usually
+                ``alternative_to(model_id)`` computed when the runs were set
+                up for speculation; ``None`` streams ``model_id`` alone.
+                Taken from the caller rather than recomputed, so the decision
+                matches how ``start`` builds its runs even if the models'
+                health changed in between.
+
+        Yields:
+            The content of whichever run produced content first.
+
+        Raises:
+            Exception: The last run's error if every run failed before
+                producing content, or the winning run's error after that.
+        """
+        if alternative is None:
+            async with contextlib.aclosing(start(model_id)) as stream:
+                async for chunk in stream:
+                    yield chunk
+            return
+
+        loop = asyncio.get_running_loop()
+        hedge_after = self.hedge_after(model_id)
+        started_at: dict[str, float] = {}
+        contenders: dict[
+            asyncio.Task[Optional[str]], tuple[str, AsyncGenerator[str, None]]
+        ] = {}
+
+        def launch(launched_id: str) -> None:
+            stream = start(launched_id)
+            contenders[asyncio.create_task(_first_chunk(stream))] = (launched_id, stream)
+            started_at[launched_id] = loop.time()
+
+        launch(model_id)
+        winner: Optional[tuple[str, AsyncGenerator[str, None]]] = None
+        first: Optional[str] = None
+        hedged = False
+        try:
+            while winner is None:
+                timeout = None
+                if alternative not in started_at and hedge_after is not None:
+                    timeout = max(0.0, started_at[model_id] + hedge_after - loop.time())
+                done, _ = await asyncio.wait(
+                    contenders, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    metrics.increment("model_hedges")
+                    hedged = True
+                    launch(alternative)
+                    continue
+                for task in done:
+                    contender = contenders.pop(task)
+                    try:
+                        # ``None`` if the run finished without content.
+                        first = task.result()
+                    except Exception:
+                        await contender[1].aclose()
+                        if alternative not in started_at:
+                            metrics.increment("model_failovers")
+                            launch(alternative)
+                        elif not contenders:
+                            raise
+                        continue
+                    winner = contender
+                    break
+        finally:
+            for task, (loser_id, stream) in contenders.items():
+                task.cancel()
+                with contextlib.suppress(BaseException):
+                    await task
+                await stream.aclose()
+                if winner is not None:
+                    # Censored sample: the loser took at least this long.
+                    self.registry.stats(loser_id).record_first_token(
+                        loop.time() - started_at[loser_id]
+                    )
+
+        winner_id, stream = winner
+        if hedged and winner_id != model_id:
+            metrics.increment("model_hedge_wins")
+        async with contextlib.aclosing(stream):
+            if first is not None:
+                yield first
+            async for chunk in stream:
+                yield chunk
+
+    def _p50(self, model_id: str) -> float:
+        p50 = self.registry.stats(model_id).first_token_p50_seconds
+        return math.inf if p50 is None else p50
+
+
+model_router = ModelRouter(
+    registry=model_registry,
+    min_samples=settings.model_routing_min_samples,
+    max_p95_first_token_seconds=settings.model_max_p95_first_token_seconds,
+    max_error_rate=settings.model_max_error_rate,
+    hedging_enabled=settings.model_hedging_enabled,
+    hedge_after_seconds=settings.model_hedge_after_seconds,
+)
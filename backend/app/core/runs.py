@@ -0,0 +1,274 @@
+"""
+Resumable chat runs.
+
+A chat turn is driven by a background task rather than by the HTTP response
+that started it. Every frame the run emits is appended to a bounded replay
+buffer, and any number of SSE responses ("subscribers") read from that
+buffer. A client whose connection drops reconnects to
+``GET /api/v1/chat/runs/{run_id}`` with the ``Last-Event-ID`` of the last
+frame it received and continues from there, without the model being invoked
+again.
+
+Subscribers poll their client's connection while waiting for output, so a
+closed tab is noticed even when no frame is being written. When the last
+subscriber of an unfinished run goes away, the run is kept alive for
+``orphan_grace_seconds`` to allow a reconnect, then cancelled so the model
+stops generating for nobody. Finished runs stay resumable for
+``retention_seconds``. Runs live in the worker process that started them.
+"""
+
+import asyncio
+import contextlib
+import logging
+import time
+import uuid
+from collections import deque
+from collections.abc import AsyncGenerator, Awaitable, Callable
+from typing import Any, Optional
+
+from app.core.config import settings
+from app.core.history import invalidate_history
+from app.core.metrics import metrics
+from app.core.streaming import SSEEncoder
+
+logger = logging.getLogger(__name__)
+
+
+class ChatRun:
+    """A single agent run and the replay buffer of the frames it has emitted.
+
+    Args:
+        user_id: Owner of the run; only they may subscribe to it.
+        conversation_id: Conversation the run belongs to.
+        replay_size: Maximum number of frames kept for replay.
+        orphan_grace_seconds: Delay before the run is cancelled once its last
+            subscriber has gone while it is still generating.
+    """
+
+    def __init__(
+        self,
+        user_id: uuid.UUID,
+        conversation_id: uuid.UUID,
+        replay_size: int,
+        orphan_grace_seconds: float,
+    ) -> None:
+        self.id = uuid.uuid4()
+        self.user_id = user_id
+        self.conversation_id = conversation_id
+        self.orphan_grace_seconds = orphan_grace_seconds
+        self.finished = False
+        self.failed = False
+        self.subscribers = 0
+        self.output_chars = 0
+        self.task: Optional[asyncio.Task[None]] = None
+        self._encoder = SSEEncoder()
+        self._frames: deque[tuple[int, bytes]] = deque(maxlen=replay_size)
+        self._changed = asyncio.Event()
+        self._orphan_timer: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def last_event_id(self) -> int:
+        """Id of the most recent frame emitted by the run."""
+        return self._encoder.last_event_id
+
+    def can_resume(self, after_id: int) -> bool:
+        """Whether every frame after ``after_id`` is still in the replay buffer."""
+        if after_id > self.last_event_id:
+            return False
+        oldest = self._frames[0][0] if self._frames else self.last_event_id + 1
+        return after_id >= oldest - 1
+
+    def publish(self, payload: Any) -> None:
+        """Encode ``payload`` as the next frame and wake the subscribers."""
+        frame = self._encoder.encode(payload)
+        self._frames.append((self._encoder.last_event_id, frame))
+        self._notify()
+
+    def finish(self, failed: bool = False) -> None:
+        """Mark the run as complete; subscribers drain the buffer and end."""
+        self.finished = True
+        self.failed = failed
+        if self._orphan_timer is not None:
+            self._orphan_timer.cancel()
+            self._orphan_timer = None
+        self._notify()
+
+    async def subscribe(
+        self,
+        after_id: int = 0,
+        is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+        poll_seconds: float = settings.chat_disconnect_poll_seconds,
+    ) -> AsyncGenerator[bytes, None]:
+        """Yield the run's frames after ``after_id``, then new ones as they arrive.
+
+        Args:
+            after_id: Id of the last frame the client already has.
+            is_disconnected: Returns whether the subscriber's client has gone
+                away (e.g. ``Request.is_disconnected``). Checked every
+                ``poll_seconds`` while waiting for new frames.
+            poll_seconds: Interval between disconnect checks.
+
+        Yields:
+            SSE frames, ending with ``[DONE]`` when the run completes
+            successfully.
+        """
+        self.subscribers += 1
+        if self._orphan_timer is not None:
+            self._orphan_timer.cancel()
+            self._orphan_timer = None
+        try:
+            while True:
+                changed = self._changed
+                if not self.can_resume(after_id):
+                    # Fell further behind than the replay buffer reaches.
+                    yield self._encoder.error("Stream position lost")
+                    return
+                for event_id, frame in list(self._frames):
+                    if event_id > after_id:
+                        yield frame
+                        after_id = event_id
+                if self.finished and after_id >= self.last_event_id:
+                    if not self.failed:
+                        yield self._encoder.done()
+                    return
+                if is_disconnected is None:
+                    await changed.wait()
+                    continue
+                try:
+                    await asyncio.wait_for(changed.wait(), poll_seconds)
+                except TimeoutError:
+                    if await is_disconnected():
+                        metrics.increment("chat_client_disconnects")
+                        return
+        finally:
+            self.subscribers -= 1
+            if self.subscribers == 0 and not self.finished:
+                self._orphan_timer = asyncio.get_running_loop().call_later(
+                    self.orphan_grace_seconds, self._cancel_orphaned
+                )
+
+    def _cancel_orphaned(self) -> None:
+        self._orphan_timer = None
+        if self.subscribers == 0 and self.task is not None and not self.task.done():
+            metrics.increment("chat_runs_orphaned")
+            self.task.cancel()
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+
+class ChatRunRegistry:
+    """Starts chat runs and keeps them addressable by id for resumption.
+
+    Args:
+        replay_size: Frames kept per run for replay.
+        orphan_grace_seconds: How long an unfinished run without subscribers
+            is kept before it is cancelled.
+        retention_seconds: How long a finished run stays resumable.
+    """
+
+    def __init__(
+        self, replay_size: int, orphan_grace_seconds: float, retention_seconds: float
+    ) -> None:
+        self.replay_size = replay_size
+        self.orphan_grace_seconds = orphan_grace_seconds
+        self.retention_seconds = retention_seconds
+        self._runs: dict[uuid.UUID, ChatRun] = {}
+        self._finished_at: dict[uuid.UUID, float] = {}
+        # Output size of runs that completed, to estimate what a cancelled run saved.
+        self._completed_runs = 0
+        self._completed_chars = 0
+
+    def start(
+        self,
+        user_id: uuid.UUID,
+        conversation_id: uuid.UUID,
+        deltas: AsyncGenerator[str, None],
+        on_finish: Optional[Callable[[], None]] = None,
+    ) -> ChatRun:
+        """Start driving ``deltas`` as a new run in the background.
+
+        ``on_finish`` is called once the run ends, however it ends (e.g. to
+        release a concurrency slot).
+        """
+        self._prune()
+        run = ChatRun(
+            user_id, conversation_id, self.replay_size, self.orphan_grace_seconds
+        )
+        run.task = asyncio.create_task(self._drive(run, deltas, on_finish))
+        self._runs[run.id] = run
+        metrics.increment("chat_runs_started")
+        metrics.set_gauge("chat_runs_active", len(self._runs) - len(self._finished_at))
+        return run
+
+    def get(self, run_id: uuid.UUID) -> Optional[ChatRun]:
+        """Return the run with ``run_id`` if it is active or recently finished."""
+        self._prune()
+        return self._runs.get(run_id)
+
+    async def stop(self) -> None:
+        """Cancel every unfinished run (called on shutdown)."""
+        tasks = [
+            run.task
+            for run in self._runs.values()
+            if run.task is not None and not run.task.done()
+        ]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _drive(
+        self,
+        run: ChatRun,
+        deltas: AsyncGenerator[str, None],
+        on_finish: Optional[Callable[[], None]],
+    ) -> None:
+        failed = True
+        try:
+            async with contextlib.aclosing(deltas):
+                async for chunk in deltas:
+                    run.output_chars += len(chunk)
+                    run.publish({"type": "delta", "content": chunk})
+            failed = False
+            self._completed_runs += 1
+            self._completed_chars += run.output_chars
+        except asyncio.CancelledError:
+            metrics.increment("chat_runs_cancelled")
+            if self._completed_runs:
+                # Rough estimate: an average response, less what was already
+                # generated, at ~4 characters per token.
+                average = self._completed_chars / self._completed_runs
+                metrics.increment(
+                    "chat_tokens_saved_estimate",
+                    max(0.0, average - run.output_chars) / 4,
+                )
+            raise
+        except Exception:
+            logger.exception("Chat run %s failed", run.id)
+            metrics.increment("chat_runs_failed")
+            run.publish({"type": "error", "detail": "The response failed"})
+        finally:
+            run.finish(failed=failed)
+            self._finished_at[run.id] = time.monotonic()
+            metrics.set_gauge(
+                "chat_runs_active", len(self._runs) - len(self._finished_at)
+            )
+            # The run has been persisted (fully or partially) by now.
+            invalidate_history(run.conversation_id)
+            if on_finish is not None:
+                on_finish()
+
+    def _prune(self) -> None:
+        cutoff = time.monotonic() - self.retention_seconds
+        for run_id, finished in list(self._finished_at.items()):
+            if finished < cutoff:
+                del self._finished_at[run_id]
+                self._runs.pop(run_id, None)
+
+
+chat_runs = ChatRunRegistry(
+    replay_size=settings.chat_run_replay_size,
+    orphan_grace_seconds=settings.chat_run_orphan_grace_seconds,
+    retention_seconds=settings.chat_run_retention_seconds,
+)
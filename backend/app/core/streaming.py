@@ -0,0 +1,178 @@
+"""
+Async streaming helpers for Agno agent runs.
+
+The agent run is driven by a producer task that pushes content deltas into a
+bounded queue. The consumer (the SSE response) drains the queue at whatever
+pace the client reads, and the producer blocks once ``max_buffered`` deltas
+are waiting — so a slow client applies backpressure to the model stream
+instead of growing memory without limit.
+
+Deltas are usually a few characters each. Rather than write one frame (and
+one network packet) per token, the consumer coalesces the deltas that arrive
+within ``coalesce_seconds`` of each other into one chunk, up to
+``max_chunk_bytes``. The first chunk is always sent immediately so time to
+first token is unaffected. ``SSEEncoder`` turns chunks into numbered
+``text/event-stream`` frames.
+"""
+
+import asyncio
+import time
+from collections.abc import AsyncGenerator, Callable
+from typing import Any, Optional, Union
+
+import orjson
+from agno.agent.agent import Agent
+from agno.run.agent import RunErrorEvent
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.model_registry import ModelStats
+
+# Marks the end of the producer's stream in the queue.
+_DONE = object()
+
+
+class ModelRunError(Exception):
+    """Raised when a run fails before producing any content (see ``raise_early_errors``)."""
+
+
+class SSEEncoder:
+    """Encodes payloads as Server-Sent Events frames with increasing event ids.
+
+    Args:
+        start_id: Id of the last event the client already has; the first
+            encoded frame gets ``start_id + 1``.
+    """
+
+    def __init__(self, start_id: int = 0) -> None:
+        self.last_event_id = start_id
+
+    def encode(self, payload: Any) -> bytes:
+        """Return ``payload`` as an ``id:``/``data:`` frame, JSON-encoded with orjson."""
+        self.last_event_id += 1
+        return b"id: %d\ndata: %b\n\n" % (self.last_event_id, orjson.dumps(payload))
+
+    def done(self) -> bytes:
+        """Return the ``[DONE]`` frame that ends a stream."""
+        return b"data: [DONE]\n\n"
+
+    def error(self, detail: str) -> bytes:
+        """Return an un-numbered ``{"type": "error"}`` frame that ends a stream."""
+        return b"data: %b\n\n" % orjson.dumps({"type": "error", "detail": detail})
+
+
+async def stream_agent_deltas(
+    agent: Agent,
+    question: str,
+    max_buffered: int = settings.chat_stream_buffer_size,
+    coalesce_seconds: float = settings.chat_stream_coalesce_ms / 1000,
+    max_chunk_bytes: int = settings.chat_stream_max_chunk_bytes,
+    on_complete: Optional[Callable[[str], None]] = None,
+    stats: Optional[ModelStats] = None,
+    raise_early_errors: bool = False,
+) -> AsyncGenerator[str, None]:
+    """Run ``agent`` asynchronously and yield its content, coalescing small deltas.
+
+    Args:
+        agent: The Agno agent to run.
+        question: The user's message.
+        max_buffered: Maximum number of deltas held between the model stream
+            and the consumer before the producer waits.
+        coalesce_seconds: How long to keep collecting deltas after the first
+            one of a chunk before yielding it. ``0`` yields whatever is
+            already buffered without waiting.
+        max_chunk_bytes: Yield a chunk as soon as it reaches this many
+            UTF-8 bytes.
+        on_complete: Called with the full response text once the run has
+            finished without an error (e.g. to cache it).
+        stats: Receives the run's time to first token and outcome (cancelled
+            runs record neither outcome).
+        raise_early_errors: Raise ``ModelRunError`` when the run reports an
+            error before any content, instead of streaming the error text,
+            so a caller can retry on another model.
+
+    Yields:
+        Non-empty content chunks in the order the model produced them.
+
+    Raises:
+        Exception: Any error raised by the agent run is re-raised here.
+    """
+    queue: asyncio.Queue[Union[str, object]] = asyncio.Queue(maxsize=max_buffered)
+    error: list[BaseException] = []
+
+    async def produce() -> None:
+        started = time.perf_counter()
+        first_token = True
+        content: list[str] = []
+        succeeded = True
+        try:
+            async for ev in agent.arun(question, stream=True):
+                chunk = getattr(ev, "content", None)
+                if isinstance(ev, RunErrorEvent):
+                    if raise_early_errors and first_token:
+                        raise ModelRunError(str(chunk or "Model run failed"))
+                    # Still streamed to the client, but never reported as a result.
+                    succeeded = False
+                if chunk:
+                    if on_complete is not None:
+                        content.append(str(chunk))
+                    if first_token:
+                        elapsed = time.perf_counter() - started
+                        metrics.observe("chat_time_to_first_token_seconds", elapsed)
+                        if stats is not None:
+                            stats.record_first_token(elapsed)
+                        first_token = False
+                    await queue.put(chunk)
+        except Exception as exc:
+            error.append(exc)
+            succeeded = False
+        else:
+            if on_complete is not None and succeeded:
+                on_complete("".join(content))
+        if stats is not None:
+            stats.record_outcome(succeeded)
+        # Not in a ``finally``: a cancelled producer must not block on a full queue.
+        await queue.put(_DONE)
+
+    producer = asyncio.create_task(produce())
+    loop = asyncio.get_running_loop()
+    try:
+        first_chunk = True
+        finished = False
+        while not finished:
+            item = await queue.get()
+            if item is _DONE:
+                break
+            parts = [str(item)]
+            size = len(parts[0].encode())
+            deadline = loop.time() + (0.0 if first_chunk else coalesce_seconds)
+            first_chunk = False
+            while size < max_chunk_bytes:
+                if queue.empty():
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(queue.get(), remaining)
+                    except TimeoutError:
+                        break
+                else:
+                    item = queue.get_nowait()
+                if item is _DONE:
+                    finished = True
+                    break
+                parts.append(str(item))
+                size += len(parts[-1].encode())
+            metrics.increment("chat_stream_chunks")
+            metrics.increment("chat_stream_deltas", len(parts))
+            yield "".join(parts)
+        if error:
+            raise error[0]
+    finally:
+        # Stop the model stream if the consumer goes away early.
+        if not producer.done():
+            producer.cancel()
+            try:
+                await producer
+            except asyncio.CancelledError:
+                pass
@@ -0,0 +1,153 @@
+"""
+Conversation title generation.
+
+Titles are produced by the cheapest source that can do the job:
+
+1. A local heuristic for messages that need no model: greetings and other
+   small talk get a fixed title, and short messages are used as their own
+   title.
+2. A memo of model-generated titles keyed by a hash of the normalised first
+   message, so the same opening message (from any user) costs one model call.
+3. The utility model (the fastest one, see ``app.core.routing``), as a last
+   resort.
+
+Counters record how often each source was used, and the
+``titles_model_calls_avoided_ratio`` gauge is the fraction of title requests
+served without the model. They count titles produced, so a job attempt that
+fails and is retried by the job queue is only counted once it succeeds.
+"""
+
+import hashlib
+import re
+import uuid
+from typing import Optional
+
+from agno.run.base import RunStatus
+
+from app.core.agents import create_utility_agent
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.limits import utility_limiter
+from app.core.metrics import metrics
+from app.core.routing import model_router
+
+DEFAULT_TITLE = "New Conversation"
+
+# Openers that carry no topic, normalised (lower-case, no punctuation).
+_SMALL_TALK = {
+    "hi",
+    "hello",
+    "hey",
+    "hey there",
+    "hi there",
+    "hello there",
+    "yo",
+    "sup",
+    "good morning",
+    "good afternoon",
+    "good evening",
+    "how are you",
+    "whats up",
+    "thanks",
+    "thank you",
+    "test",
+    "testing",
+}
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_MAX_TITLE_LENGTH = 60
+
+
+def _normalize(message: str) -> str:
+    return " ".join(_PUNCTUATION.sub("", message.lower()).split())
+
+
+def heuristic_title(message: str) -> Optional[str]:
+    """Return a title for ``message`` without a model, or ``None`` if it needs one.
+
+    Args:
+        message: The conversation's first user message.
+
+    Returns:
+        ``DEFAULT_TITLE`` for empty messages and small talk, the message
+        itself (tidied) when it has at most ``title_heuristic_max_words``
+        words, otherwise ``None``.
+    """
+    normalized = _normalize(message)
+    if not normalized or normalized in _SMALL_TALK:
+        return DEFAULT_TITLE
+    words = message.split()
+    if len(words) > settings.title_heuristic_max_words:
+        return None
+    title = " ".join(words).rstrip(" ?!.,:;")
+    if not title or len(title) > _MAX_TITLE_LENGTH:
+        return None
+    return title[0].upper() + title[1:]
+
+
+class TitleGenerator:
+    """Produces titles via heuristic, memo or model, and tracks how often each is used.
+
+    Args:
+        memo_size: Maximum number of memoized model titles.
+        memo_ttl_seconds: Lifetime of a memoized title.
+    """
+
+    def __init__(self, memo_size: int, memo_ttl_seconds: float) -> None:
+        self._memo: TTLCache[str, str] = TTLCache(memo_size, memo_ttl_seconds)
+        self.requested = 0
+        self.avoided = 0
+
+    async def generate(self, user_id: uuid.UUID, first_message: str) -> str:
+        """Return a short title for a conversation starting with ``first_message``.
+
+        Args:
+            user_id: The conversation's owner; model calls count against their
+                ``utility_limiter`` slots.
+            first_message: The conversation's first user message.
+
+        Raises:
+            RuntimeError: If the model run fails.
+            ConcurrencyLimitError: If no model slot became free in time.
+        """
+        title = heuristic_title(first_message)
+        if title is not None:
+            self._record("titles_heuristic")
+            return title
+
+        key = hashlib.sha256(_normalize(first_message).encode()).hexdigest()
+        title = self._memo.get(key)
+        if title is not None:
+            self._record("titles_memoized")
+            return title
+
+        async with utility_limiter.slot(user_id):
+            response = await create_utility_agent(
+                "Generate a title for the conversation based on the first message: "
+                + first_message
+                + ". Return only the title, no other text or explanation.",
+                model_id=model_router.utility_model_id(),
+            )
+        if response.status == RunStatus.error:
+            # Raise so the job queue retries instead of storing the error text as the title.
+            raise RuntimeError(f"Title generation failed: {response.content}")
+        title = str(response.content or "").strip() or DEFAULT_TITLE
+        self._memo.set(key, title)
+        self._record("titles_model")
+        return title
+
+    def _record(self, source: str) -> None:
+        """Count one produced title and the ``source`` counter it came from."""
+        self.requested += 1
+        metrics.increment("titles_requested")
+        metrics.increment(source)
+        if source != "titles_model":
+            self.avoided += 1
+        metrics.set_gauge(
+            "titles_model_calls_avoided_ratio", self.avoided / self.requested
+        )
+
+
+title_generator = TitleGenerator(
+    memo_size=settings.title_memo_size,
+    memo_ttl_seconds=settings.title_memo_ttl_seconds,
+)
@@ -3,22 +3,40 @@ CRUD operations for the Conversation model.
 
 All functions enforce user ownership — a user can only access or modify
 their own conversations.
+
+Single-conversation lookups are served from ``conversation_cache``, keyed by
+``(user_id, conversation_id)`` so a hit is itself the ownership proof. The
+create and update functions write their result through to the cache. The
+cache is per worker process: a title changed by another worker may be served
+stale for up to ``conversation_cache_ttl_seconds``.
+
+Cached values are frozen ``ConversationResponse`` snapshots, never ORM
+instances: a cached object is shared by concurrent requests, so it must not
+be bound to any one request's session. Changing a cached conversation
+means replacing its entry.
 """
 
 import uuid
 from datetime import datetime
-from typing import List, Optional
+from typing import Optional, Sequence
 
-from sqlalchemy import select
+from sqlalchemy import RowMapping, bindparam, insert, select, tuple_, update
 from sqlalchemy.ext.asyncio.session import AsyncSession
 
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.metrics import metrics
 from app.models import Conversation
-from app.schemas import ConversationCreate
+from app.schemas import ConversationCreate, ConversationResponse
+
+conversation_cache: TTLCache[tuple[uuid.UUID, uuid.UUID], ConversationResponse] = (
+    TTLCache(settings.conversation_cache_size, settings.conversation_cache_ttl_seconds)
+)
 
 
 async def create_conversation_service(
     user_id: uuid.UUID, session: AsyncSession, schema_data: ConversationCreate
-) -> Conversation:
+) -> ConversationResponse:
     """Create a new conversation with a default title.
 
     The title starts as "New Conversation" and is later replaced by an
@@ -30,24 +48,31 @@ async def create_conversation_service(
         schema_data: Creation payload (may include a pre-generated UUID).
 
     Returns:
-        The newly created ``Conversation`` row.
+        The newly created conversation.
     """
-    new_conversation = Conversation(
-        id=schema_data.id,
-        user_id=user_id,
-        title="New Conversation",
-        created_at=datetime.now(),
-        updated_at=datetime.now(),
+    now = datetime.now()
+    values = {
+        "user_id": user_id,
+        "title": "New Conversation",
+        "created_at": now,
+        "updated_at": now,
+    }
+    if schema_data.id is not None:
+        values["id"] = schema_data.id
+    # INSERT ... RETURNING: the stored row comes back with the insert, so no
+    # refresh query is needed afterwards.
+    stmt = insert(Conversation).values(**values).returning(Conversation)
+    new_conversation = ConversationResponse.model_validate(
+        (await session.scalars(stmt)).one()
     )
-    session.add(new_conversation)
     await session.commit()
-    await session.refresh(new_conversation)
+    conversation_cache.set((user_id, new_conversation.id), new_conversation)
     return new_conversation
 
 
 async def get_conversation_service(
     user_id: uuid.UUID, session: AsyncSession, conversation_id: uuid.UUID
-) -> Optional[Conversation]:
+) -> Optional[ConversationResponse]:
     """Retrieve a single conversation by ID, scoped to the given user.
 
     Args:
@@ -56,43 +81,78 @@ async def get_conversation_service(
         conversation_id: The conversation to look up.
 
     Returns:
-        The ``Conversation`` if found and owned by ``user_id``, else ``None``.
+        The conversation if found and owned by ``user_id``, else ``None``.
     """
+    key = (user_id, conversation_id)
+    cached = conversation_cache.get(key)
+    if cached is not None:
+        metrics.increment("conversation_cache_hits")
+        return cached
+
+    metrics.increment("conversation_cache_misses")
     stmt = (
         select(Conversation)
         .where(Conversation.id == conversation_id)
         .where(Conversation.user_id == user_id)
     )
-    result = await session.execute(stmt)
-    return result.scalar_one_or_none()
+    row = (await session.execute(stmt)).scalar_one_or_none()
+    if row is None:
+        return None
+    conversation = ConversationResponse.model_validate(row)
+    conversation_cache.set(key, conversation)
+    return conversation
 
 
 async def get_conversations_for_user_service(
-    user_id: uuid.UUID, session: AsyncSession
-) -> List[Conversation]:
-    """Retrieve all conversations for a user, most-recent first.
+    user_id: uuid.UUID,
+    session: AsyncSession,
+    limit: Optional[int] = None,
+    before: Optional[tuple[datetime, uuid.UUID]] = None,
+) -> Sequence[RowMapping]:
+    """Retrieve a user's conversations, most-recent first, using keyset pagination.
+
+    Only the columns needed for a listing are selected, and rows are returned
+    as mappings rather than ORM objects, so no identity-map bookkeeping is
+    done. Served by the ``(user_id, updated_at DESC, id DESC)`` index.
 
     Args:
         user_id: Owner whose conversations to fetch.
         session: Async database session.
+        limit: Maximum number of rows to return. ``None`` returns all.
+        before: ``(updated_at, id)`` of the last row of the previous page;
+            only conversations ordered after it are returned.
 
     Returns:
-        List of ``Conversation`` objects ordered by ``updated_at`` descending.
+        Rows with ``id``, ``user_id``, ``title``, ``created_at`` and
+        ``updated_at``, ordered by ``updated_at`` then ``id``, descending.
     """
     stmt = (
-        select(Conversation)
+        select(
+            Conversation.id,
+            Conversation.user_id,
+            Conversation.title,
+            Conversation.created_at,
+            Conversation.updated_at,
+        )
         .where(Conversation.user_id == user_id)
-        .order_by(Conversation.updated_at.desc())
+        .order_by(Conversation.updated_at.desc(), Conversation.id.desc())
     )
+    if before is not None:
+        stmt = stmt.where(tuple_(Conversation.updated_at, Conversation.id) < before)
+    if limit is not None:
+        stmt = stmt.limit(limit)
     result = await session.execute(stmt)
-    return list(result.scalars().all())
+    return result.mappings().all()
 
 
 async def update_conversation_title_service(
     title: str, user_id: uuid.UUID, conversation_id: uuid.UUID, session: AsyncSession
-) -> Optional[Conversation]:
+) -> Optional[ConversationResponse]:
     """Update the title of an existing conversation.
 
+    The ownership check and the write are a single
+    ``UPDATE ... WHERE id = ? AND user_id = ? RETURNING`` statement.
+
     Args:
         title: The new title to set.
         user_id: Owner to match against (ownership check).
@@ -100,22 +160,52 @@ async def update_conversation_title_service(
         session: Async database session.
 
     Returns:
-        The updated ``Conversation``, or ``None`` if not found / not owned.
+        The updated conversation, or ``None`` if not found / not owned.
     """
     stmt = (
-        select(Conversation)
+        update(Conversation)
         .where(Conversation.id == conversation_id)
         .where(Conversation.user_id == user_id)
+        .values(title=title, updated_at=datetime.now())
+        .returning(Conversation)
     )
-    result = await session.execute(stmt)
-    conversation = result.scalar_one_or_none()
+    row = (await session.scalars(stmt)).one_or_none()
 
-    if conversation is None:
+    if row is None:
         return None
 
-    conversation.title = title
-    conversation.updated_at = datetime.now()
-    session.add(conversation)
+    conversation = ConversationResponse.model_validate(row)
     await session.commit()
-    await session.refresh(conversation)
+    conversation_cache.set((user_id, conversation_id), conversation)
     return conversation
+
+
+async def touch_conversations_service(
+    touches: dict[uuid.UUID, datetime], session: AsyncSession
+) -> None:
+    """Advance ``updated_at`` for many conversations in one batched UPDATE.
+
+    A conversation is only moved forward: rows already updated more recently
+    (e.g. by a title change) are left as they are.
+
+    Args:
+        touches: Activity time per conversation ID.
+        session: Async database session.
+    """
+    if not touches:
+        return
+    table = Conversation.__table__
+    stmt = (
+        update(table)
+        .where(table.c.id == bindparam("conversation_id"))
+        .where(table.c.updated_at < bindparam("touched_at"))
+        .values(updated_at=bindparam("touched_at"))
+    )
+    await session.execute(
+        stmt,
+        [
+            {"conversation_id": conversation_id, "touched_at": touched_at}
+            for conversation_id, touched_at in touches.items()
+        ],
+    )
+    await session.commit()
@@ -0,0 +1,51 @@
+"""
+CRUD operations for the ConversationSummary model.
+
+Summaries are only read and written by the server itself (the chat context
+builder and its background refresh job), after the conversation's ownership
+has already been checked, so these functions are keyed by conversation alone.
+"""
+
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.ext.asyncio.session import AsyncSession
+
+from app.models import ConversationSummary
+
+
+async def get_conversation_summary_service(
+    session: AsyncSession, conversation_id: uuid.UUID
+) -> Optional[ConversationSummary]:
+    """Return the rolling summary of a conversation, or ``None`` if it has none yet."""
+    return await session.get(ConversationSummary, conversation_id)
+
+
+async def upsert_conversation_summary_service(
+    session: AsyncSession,
+    conversation_id: uuid.UUID,
+    summary: str,
+    summarized_runs: int,
+) -> ConversationSummary:
+    """Create or replace the rolling summary of a conversation.
+
+    Args:
+        session: Async database session.
+        conversation_id: The conversation the summary belongs to.
+        summary: The summary text.
+        summarized_runs: Number of the conversation's oldest runs it covers.
+
+    Returns:
+        The stored ``ConversationSummary``.
+    """
+    stored = await session.merge(
+        ConversationSummary(
+            conversation_id=conversation_id,
+            summary=summary,
+            summarized_runs=summarized_runs,
+            updated_at=datetime.now(),
+        )
+    )
+    await session.commit()
+    return stored
@@ -1,17 +1,32 @@
 """
 Database configuration and session management.
 
-Uses SQLAlchemy async engine with aiosqlite. The User model is defined here
+Uses SQLAlchemy async engine with aiosqlite by default, or asyncpg when
+``DB_URL`` points at PostgreSQL. The User model is defined here
 (rather than in models.py) because fastapi-users requires it at import time
 for its dependency chain.
+
+``engine`` serves writes and ``read_engine`` serves read-only endpoints. On
+SQLite every connection is tuned with the PRAGMA profile from settings (WAL,
+``synchronous``, busy timeout, cache and mmap sizes), and for on-disk
+databases the read engine is a separate pool that opens the file read-only,
+so readers never queue behind the writer's connections.
 """
 
 from collections.abc import AsyncGenerator
+from typing import Any
 
 from fastapi import Depends
 from fastapi_users.db import SQLAlchemyBaseUserTableUUID, SQLAlchemyUserDatabase
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
-from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy import Boolean, event, false
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
 from app.core.config import settings
 
@@ -25,23 +40,108 @@ class Base(DeclarativeBase):
 class User(SQLAlchemyBaseUserTableUUID, Base):
     """User model provided by fastapi-users (id, email, hashed_password, is_active, etc.)."""
 
-    pass
-
-
-engine = create_async_engine(settings.db_url)
-async_session_maker = async_sessionmaker(engine, expire_on_commit=False)
-
-
-async def create_db_and_tables() -> None:
-    """Create all tables on application startup.
-
-    Imports app.models to ensure every ORM model is registered with
-    ``Base.metadata`` before issuing CREATE TABLE statements.
+    # Never serve this user cached model responses, nor cache theirs.
+    response_cache_opt_out: Mapped[bool] = mapped_column(
+        Boolean, default=False, server_default=false()
+    )
+
+
+def apply_sqlite_pragmas(dbapi_connection: Any, read_only: bool) -> None:
+    """Apply the SQLite tuning profile to a freshly opened connection."""
+    cursor = dbapi_connection.cursor()
+    if not read_only:
+        # The journal mode is persisted in the database file, so writers set it.
+        cursor.execute(f"PRAGMA journal_mode={settings.sqlite_journal_mode}")
+    cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+    cursor.execute(f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}")
+    # Negative cache_size is in KiB rather than pages.
+    cursor.execute(f"PRAGMA cache_size=-{settings.sqlite_cache_size_kib}")
+    cursor.execute(f"PRAGMA mmap_size={settings.sqlite_mmap_size_bytes}")
+    if read_only:
+        cursor.execute("PRAGMA query_only=ON")
+    cursor.close()
+
+
+def _is_sqlite_file(url: str) -> bool:
+    """Return True if ``url`` points at an on-disk SQLite database."""
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database not in (
+        None,
+        "",
+        ":memory:",
+    )
+
+
+def create_engine_for_url(url: str, read_only: bool = False) -> AsyncEngine:
+    """Create an async engine for ``url`` with the configured pool and tuning.
+
+    Args:
+        url: SQLAlchemy database URL.
+        read_only: Open the database file read-only. Only valid for on-disk
+            SQLite databases.
+
+    Returns:
+        The configured ``AsyncEngine``.
     """
-    from . import models  # noqa: F401 — side-effect import to register models
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "postgresql":
+        return create_async_engine(
+            parsed,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout_seconds,
+            pool_recycle=settings.db_pool_recycle_seconds,
+            # Validate pooled connections so a Postgres restart or failover
+            # surfaces as a reconnect instead of a request error.
+            pool_pre_ping=True,
+            # Cache prepared statements per connection (asyncpg only).
+            connect_args=(
+                {"prepared_statement_cache_size": settings.db_prepared_statement_cache_size}
+                if parsed.get_driver_name() == "asyncpg"
+                else {}
+            ),
+        )
+    if parsed.get_backend_name() != "sqlite":
+        return create_async_engine(
+            parsed,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+        )
+
+    if not _is_sqlite_file(url):
+        # An in-memory database lives in a single shared connection, so there
+        # is no pool to size.
+        sqlite_engine = create_async_engine(parsed)
+    else:
+        if read_only:
+            parsed = parsed.set(
+                database=f"file:{parsed.database}",
+                query={**parsed.query, "mode": "ro", "uri": "true"},
+            )
+        sqlite_engine = create_async_engine(
+            parsed,
+            pool_size=settings.db_read_pool_size if read_only else settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+        )
+
+    @event.listens_for(sqlite_engine.sync_engine, "connect")
+    def on_connect(dbapi_connection: Any, connection_record: Any) -> None:
+        apply_sqlite_pragmas(dbapi_connection, read_only)
+
+    return sqlite_engine
+
+
+engine = create_engine_for_url(settings.db_url)
+async_session_maker = async_sessionmaker(engine, expire_on_commit=False)
 
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+# A separate read-only pool only pays off for SQLite files, where readers and
+# the single writer would otherwise share connections; elsewhere reuse ``engine``.
+read_engine = (
+    create_engine_for_url(settings.db_url, read_only=True)
+    if _is_sqlite_file(settings.db_url)
+    else engine
+)
+read_session_maker = async_sessionmaker(read_engine, expire_on_commit=False)
 
 
 async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
@@ -50,6 +150,15 @@ async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
         yield session
 
 
+async def get_read_session() -> AsyncGenerator[AsyncSession, None]:
+    """FastAPI dependency that yields a session on the read-only engine.
+
+    Use for endpoints that never write, so they don't contend with writers.
+    """
+    async with read_session_maker() as session:
+        yield session
+
+
 async def get_user_db(session: AsyncSession = Depends(get_async_session)):
     """FastAPI dependency that yields a fastapi-users database adapter."""
     yield SQLAlchemyUserDatabase(session, User)
@@ -0,0 +1,246 @@
+"""
+Versioned schema migrations for the application database.
+
+Each migration runs once, in order, and the applied version is stored in the
+single-row ``schema_version`` table. At startup the app only reads that row
+(``ensure_schema``) instead of reflecting every table with ``create_all``;
+pending migrations are applied automatically when ``DB_AUTO_MIGRATE`` is on
+(the default for development), otherwise startup fails with a message to run:
+
+    python -m app.migrations
+
+Migrations must be idempotent against a database created by an older build
+with ``create_all`` (use ``IF NOT EXISTS`` / existence checks), because such
+databases start at version 0 with their tables already present.
+
+Tables are created from the frozen definitions below, never from the live
+models: a migration must produce the same schema whenever it runs, so later
+changes to ``app.models`` go in a new migration instead.
+"""
+
+import asyncio
+import logging
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from sqlalchemy import (
+    Boolean,
+    Column,
+    Connection,
+    DateTime,
+    ForeignKey,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    Text,
+    Uuid,
+    inspect,
+    select,
+    text,
+)
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.core.config import settings
+from app.db import engine
+
+# After ``app.db``: imported before ``fastapi_users.db``, this module's package
+# runs into a circular import with fastapi-users.
+from fastapi_users_db_sqlalchemy.generics import GUID
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Migration:
+    """A single schema change, applied with a synchronous connection."""
+
+    version: int
+    description: str
+    upgrade: Callable[[Connection], None]
+
+
+# Kept out of ``Base.metadata`` so it is never part of ``create_all``.
+_version_metadata = MetaData()
+schema_version = Table(
+    "schema_version",
+    _version_metadata,
+    Column("version", Integer, nullable=False),
+)
+
+
+# The tables as each migration created them, independent of ``app.models``.
+_frozen_metadata = MetaData()
+
+_user_v1 = Table(
+    "user",
+    _frozen_metadata,
+    Column("id", GUID, primary_key=True),
+    Column("email", String(320), nullable=False, unique=True, index=True),
+    Column("hashed_password", String(1024), nullable=False),
+    Column("is_active", Boolean, nullable=False),
+    Column("is_superuser", Boolean, nullable=False),
+    Column("is_verified", Boolean, nullable=False),
+)
+_conversations_v1 = Table(
+    "conversations",
+    _frozen_metadata,
+    Column("id", Uuid, primary_key=True),
+    Column("user_id", Uuid, ForeignKey("user.id", ondelete="CASCADE"), nullable=False),
+    Column("title", String(255), nullable=False),
+    Column("created_at", DateTime, nullable=False),
+    Column("updated_at", DateTime, nullable=False),
+)
+_user_preferences_v1 = Table(
+    "user_preferences",
+    _frozen_metadata,
+    Column(
+        "user_id", Uuid, ForeignKey("user.id", ondelete="CASCADE"), primary_key=True
+    ),
+    Column("custom_instructions", Text, nullable=True),
+    Column("accent_color", String(7), nullable=True),
+    Column("font_size", Integer, nullable=False),
+)
+_api_keys_v1 = Table(
+    "api_keys",
+    _frozen_metadata,
+    Column("id", Uuid, primary_key=True),
+    Column("user_id", Uuid, ForeignKey("user.id", ondelete="CASCADE"), nullable=False),
+    Column("provider", String(50), nullable=False),
+    # Fernet-encrypted by the model's ``StringEncryptedType``; stored as text.
+    Column("encrypted_key", String, nullable=False),
+    Column("is_active", Boolean, nullable=False),
+)
+_conversation_summaries_v4 = Table(
+    "conversation_summaries",
+    _frozen_metadata,
+    Column(
+        "conversation_id",
+        Uuid,
+        ForeignKey("conversations.id", ondelete="CASCADE"),
+        primary_key=True,
+    ),
+    Column("summary", Text, nullable=False),
+    Column("summarized_runs", Integer, nullable=False),
+    Column("updated_at", DateTime, nullable=False),
+)
+
+
+def _create_baseline_tables(conn: Connection) -> None:
+    _frozen_metadata.create_all(
+        conn,
+        tables=[_user_v1, _conversations_v1, _user_preferences_v1, _api_keys_v1],
+    )
+
+
+def _add_user_id_indexes(conn: Connection) -> None:
+    conn.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_conversations_user_id_updated_at "
+            "ON conversations (user_id, updated_at DESC, id DESC)"
+        )
+    )
+    conn.execute(
+        text("CREATE INDEX IF NOT EXISTS ix_api_keys_user_id ON api_keys (user_id)")
+    )
+
+
+def _add_response_cache_opt_out(conn: Connection) -> None:
+    # Databases created by ``create_all`` from newer models already have it.
+    columns = {column["name"] for column in inspect(conn).get_columns("user")}
+    if "response_cache_opt_out" not in columns:
+        conn.execute(
+            text(
+                'ALTER TABLE "user" ADD COLUMN response_cache_opt_out '
+                "BOOLEAN NOT NULL DEFAULT FALSE"
+            )
+        )
+
+
+def _add_conversation_summaries(conn: Connection) -> None:
+    _conversation_summaries_v4.create(conn, checkfirst=True)
+
+
+MIGRATIONS: list[Migration] = [
+    Migration(1, "Baseline tables", _create_baseline_tables),
+    Migration(2, "Index conversations and api_keys by user_id", _add_user_id_indexes),
+    Migration(3, "Per-user response cache opt-out", _add_response_cache_opt_out),
+    Migration(4, "Rolling conversation summaries", _add_conversation_summaries),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+async def _read_version(conn: AsyncConnection) -> int:
+    """Return the applied schema version, or 0 for an unversioned database."""
+    has_table = await conn.run_sync(
+        lambda sync_conn: inspect(sync_conn).has_table(schema_version.name)
+    )
+    if not has_table:
+        return 0
+    version = await conn.scalar(select(schema_version.c.version))
+    return version or 0
+
+
+async def migrate() -> int:
+    """Apply every pending migration in one transaction.
+
+    Returns:
+        The schema version after migrating.
+    """
+    async with engine.begin() as conn:
+        # Serialise concurrent migrators (e.g. several workers booting at once):
+        # each takes the write lock before reading the version, so the others
+        # wait and then find the migrations already applied.
+        if conn.dialect.name == "postgresql":
+            await conn.execute(text("SELECT pg_advisory_xact_lock(725370001)"))
+        elif conn.dialect.name == "sqlite":
+            # pysqlite defers BEGIN until the first INSERT/UPDATE and runs DDL
+            # outside any transaction, so open a write transaction explicitly;
+            # other migrators block on it for up to ``sqlite_busy_timeout_ms``.
+            await conn.exec_driver_sql("BEGIN IMMEDIATE")
+        await conn.run_sync(_version_metadata.create_all)
+        current = await _read_version(conn)
+
+        for migration in MIGRATIONS:
+            if migration.version <= current:
+                continue
+            logger.info(
+                "Applying migration %s: %s", migration.version, migration.description
+            )
+            await conn.run_sync(migration.upgrade)
+            current = migration.version
+
+        await conn.execute(schema_version.delete())
+        await conn.execute(schema_version.insert().values(version=current))
+    return current
+
+
+async def ensure_schema() -> None:
+    """Verify the database is at ``LATEST_VERSION`` (run at startup).
+
+    Raises:
+        RuntimeError: If the schema is behind and auto-migration is disabled,
+            or if the database is newer than this build.
+    """
+    async with engine.connect() as conn:
+        current = await _read_version(conn)
+
+    if current == LATEST_VERSION:
+        return
+    if current > LATEST_VERSION:
+        raise RuntimeError(
+            f"Database schema version {current} is newer than this build "
+            f"({LATEST_VERSION})."
+        )
+    if not settings.db_auto_migrate:
+        raise RuntimeError(
+            f"Database schema is at version {current}, expected {LATEST_VERSION}. "
+            "Run `python -m app.migrations` to upgrade it."
+        )
+    await migrate()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(f"Database schema at version {asyncio.run(migrate())}")
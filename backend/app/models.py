@@ -9,7 +9,7 @@ import uuid
 from datetime import datetime
 from enum import Enum
 
-from sqlalchemy import DateTime, ForeignKey, String, Uuid
+from sqlalchemy import DateTime, ForeignKey, Index, String, Uuid
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.types import Text
 from sqlalchemy_utils import StringEncryptedType
@@ -47,6 +47,35 @@ class Conversation(Base):
     updated_at: Mapped[datetime] = mapped_column(DateTime)
 
 
+# Serves the sidebar listing: a user's conversations ordered by recency, with
+# ``id`` as the keyset-pagination tie-breaker.
+Index(
+    "ix_conversations_user_id_updated_at",
+    Conversation.user_id,
+    Conversation.updated_at.desc(),
+    Conversation.id.desc(),
+)
+
+
+class ConversationSummary(Base):
+    """
+    Rolling summary of the older turns of a conversation.
+
+    Covers the conversation's first ``summarized_runs`` agent runs and is
+    passed to the model in place of those turns once they no longer fit in
+    the prompt (see ``app.core.context``).
+    """
+
+    __tablename__ = "conversation_summaries"
+
+    conversation_id: Mapped[uuid.UUID] = mapped_column(
+        Uuid, ForeignKey("conversations.id", ondelete="CASCADE"), primary_key=True
+    )
+    summary: Mapped[str] = mapped_column(Text)
+    summarized_runs: Mapped[int] = mapped_column()
+    updated_at: Mapped[datetime] = mapped_column(DateTime)
+
+
 class UserPreferences(Base):
     """
     User preferences stored in the application database.
@@ -71,7 +100,7 @@ class APIKey(Base):
 
     id: Mapped[uuid.UUID] = mapped_column(Uuid, primary_key=True, default=uuid.uuid4)
     user_id: Mapped[uuid.UUID] = mapped_column(
-        Uuid, ForeignKey("user.id", ondelete="CASCADE")
+        Uuid, ForeignKey("user.id", ondelete="CASCADE"), index=True
     )
     provider: Mapped[str] = mapped_column(String(50))
     encrypted_key: Mapped[str] = mapped_column(
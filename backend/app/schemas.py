@@ -7,10 +7,12 @@ through the API layer.
 
 import uuid
 from datetime import datetime
-from typing import Optional
+from typing import Any, Optional
 
 from fastapi_users import schemas
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
+
+from app.core.jobs import JobStatus
 
 # --- User schemas (provided by fastapi-users) --------------------------------
 
@@ -18,7 +20,7 @@ from pydantic import BaseModel
 class UserRead(schemas.BaseUser[uuid.UUID]):
     """Response schema for user data (id, email, is_active, etc.)."""
 
-    pass
+    response_cache_opt_out: bool = False
 
 
 class UserCreate(schemas.BaseUserCreate):
@@ -30,7 +32,7 @@ class UserCreate(schemas.BaseUserCreate):
 class UserUpdate(schemas.BaseUserUpdate):
     """Request schema for updating user profile."""
 
-    pass
+    response_cache_opt_out: Optional[bool] = None
 
 
 # --- Conversation schemas ----------------------------------------------------
@@ -48,7 +50,14 @@ class ConversationCreate(BaseModel):
 
 
 class ConversationResponse(BaseModel):
-    """Response schema returned for conversation endpoints."""
+    """Response schema returned for conversation endpoints.
+
+    Built directly from ``Conversation`` rows (ORM objects or mappings) via
+    ``model_validate``. Frozen, because the CRUD layer caches and shares
+    these values between requests.
+    """
+
+    model_config = ConfigDict(from_attributes=True, frozen=True)
 
     id: uuid.UUID
     user_id: uuid.UUID
@@ -66,12 +75,13 @@ class ChatRequest(BaseModel):
     Attributes:
         question: The user's message to send to the Agno agent.
         conversation_id: UUID linking this message to a conversation.
-        model_id: The ID of the model to use for the agent. (Just Gemini models right now).
+        model_id: The ID of the model to use for the agent; must be one of
+            ``GET /api/v1/models``. Omitted, the default model is used.
     """
 
     question: str
     conversation_id: uuid.UUID
-    model_id: str = "gemini-3-flash-preview"
+    model_id: Optional[str] = None
 
 
 class ChatResponse(BaseModel):
@@ -82,3 +92,60 @@ class ChatResponse(BaseModel):
     """
 
     response: str
+
+
+# --- Model schemas ------------------------------------------------------------
+
+
+class ModelResponse(BaseModel):
+    """Response schema describing a supported chat model.
+
+    Statistics cover the model's recent runs on the serving worker and are
+    ``None`` until it has run.
+
+    Attributes:
+        id: The model ID to send as ``ChatRequest.model_id``.
+        name: Human-readable name.
+        context_window_tokens: Maximum tokens the model accepts per request.
+        default: Whether this is the default model.
+        runs: Number of recent runs the statistics are based on.
+        first_token_p50_seconds: Median time to first token.
+        first_token_p95_seconds: 95th-percentile time to first token.
+        error_rate: Fraction of recent runs that failed.
+    """
+
+    id: str
+    name: str
+    context_window_tokens: int
+    default: bool
+    runs: int
+    first_token_p50_seconds: Optional[float] = None
+    first_token_p95_seconds: Optional[float] = None
+    error_rate: Optional[float] = None
+
+
+# --- Job schemas --------------------------------------------------------------
+
+
+class JobResponse(BaseModel):
+    """Response schema describing a background job's status.
+
+    Attributes:
+        id: The job ID, used to poll ``GET /api/v1/jobs/{id}``.
+        status: One of ``pending``, ``running``, ``succeeded`` or ``failed``.
+        attempts: Number of attempts made so far.
+        result: The job's return value once it has succeeded.
+        error: The last error message, if an attempt failed.
+        created_at: When the job was enqueued.
+        finished_at: When the job succeeded or finally failed.
+    """
+
+    model_config = ConfigDict(from_attributes=True)
+
+    id: uuid.UUID
+    status: JobStatus
+    attempts: int
+    result: Any = None
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
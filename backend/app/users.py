@@ -2,25 +2,57 @@
 Authentication and user management configuration.
 
 Uses fastapi-users with JWT tokens transported via HTTP-only cookies.
+Authenticated users are cached in memory by ID so that resolving
+``current_active_user`` does not load the ``User`` row on every request;
+entries are invalidated whenever the user is updated, verified, resets their
+password or is deleted, and otherwise expire after ``user_cache_ttl_seconds``.
+
+The cache holds detached snapshots that belong to no session. A cache hit
+merges the snapshot into the request's own session without a query
+(``merge(load=False)``), so concurrent requests never share an ORM instance.
 """
 
 import uuid
 from collections.abc import AsyncGenerator
-from typing import Optional
+from typing import Any, Optional
 
+import jwt
 from fastapi import Depends, Request, Response
-from fastapi_users import BaseUserManager, FastAPIUsers, UUIDIDMixin
+from fastapi_users import BaseUserManager, FastAPIUsers, UUIDIDMixin, exceptions
 from fastapi_users.authentication import (
     AuthenticationBackend,
     CookieTransport,
     JWTStrategy,
 )
 from fastapi_users.db import SQLAlchemyUserDatabase
+from fastapi_users.jwt import decode_jwt
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
 from typing_extensions import cast
 
+from app.core.cache import TTLCache
 from app.core.config import settings
+from app.core.metrics import metrics
 from app.db import User, get_user_db
 
+user_cache: TTLCache[uuid.UUID, User] = TTLCache(
+    settings.user_cache_size, settings.user_cache_ttl_seconds
+)
+
+
+def invalidate_user(user_id: uuid.UUID) -> None:
+    """Drop a user from the authentication cache so the next request reloads it."""
+    user_cache.pop(user_id)
+
+
+def _detached_snapshot(user: User) -> User:
+    """Copy the column values of ``user`` into a new ``User`` bound to no session."""
+    snapshot = User(
+        **{attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs}
+    )
+    make_transient_to_detached(snapshot)
+    return snapshot
+
 
 class UserManager(UUIDIDMixin, BaseUserManager[User, uuid.UUID]):
     """Handles user lifecycle events (registration, login, password reset)."""
@@ -41,6 +73,33 @@ class UserManager(UUIDIDMixin, BaseUserManager[User, uuid.UUID]):
     ) -> None:
         """Hook called after a user logs in."""
 
+    async def on_after_update(
+        self,
+        user: User,
+        update_dict: dict[str, Any],
+        request: Optional[Request] = None,
+    ) -> None:
+        """Hook called after a user is updated (including deactivation)."""
+        invalidate_user(user.id)
+
+    async def on_after_verify(
+        self, user: User, request: Optional[Request] = None
+    ) -> None:
+        """Hook called after a user verifies their email."""
+        invalidate_user(user.id)
+
+    async def on_after_reset_password(
+        self, user: User, request: Optional[Request] = None
+    ) -> None:
+        """Hook called after a user resets their password."""
+        invalidate_user(user.id)
+
+    async def on_after_delete(
+        self, user: User, request: Optional[Request] = None
+    ) -> None:
+        """Hook called after a user is deleted."""
+        invalidate_user(user.id)
+
 
 async def get_user_manager(
     user_db: SQLAlchemyUserDatabase[User, uuid.UUID] = Depends(get_user_db),
@@ -64,9 +123,49 @@ cookie_transport = CookieTransport(
 )
 
 
+class CachedJWTStrategy(JWTStrategy[User, uuid.UUID]):
+    """JWT strategy that resolves the token's user through ``user_cache``."""
+
+    async def read_token(
+        self,
+        token: Optional[str],
+        user_manager: BaseUserManager[User, uuid.UUID],
+    ) -> Optional[User]:
+        """Decode ``token`` and return its user, loading it from the DB only on a cache miss."""
+        if token is None:
+            return None
+        try:
+            data = decode_jwt(
+                token, self.decode_key, self.token_audience, algorithms=[self.algorithm]
+            )
+            subject = data.get("sub")
+            if subject is None:
+                return None
+            user_id = user_manager.parse_id(subject)
+        except (jwt.PyJWTError, exceptions.InvalidID):
+            return None
+
+        user_db = cast(SQLAlchemyUserDatabase[User, uuid.UUID], user_manager.user_db)
+        cached = user_cache.get(user_id)
+        if cached is not None:
+            metrics.increment("user_cache_hits")
+            # The snapshot stays detached; the request gets its own instance.
+            return await user_db.session.merge(cached, load=False)
+
+        metrics.increment("user_cache_misses")
+        try:
+            user = await user_manager.get(user_id)
+        except exceptions.UserNotExists:
+            return None
+        user_cache.set(user_id, _detached_snapshot(user))
+        return user
+
+
 def get_jwt_strategy() -> JWTStrategy:
-    """Create a JWT strategy with a 1-hour lifetime."""
-    return JWTStrategy(secret=cast(str, settings.auth_secret), lifetime_seconds=3600)
+    """Create a cached JWT strategy with a 1-hour lifetime."""
+    return CachedJWTStrategy(
+        secret=cast(str, settings.auth_secret), lifetime_seconds=3600
+    )
 
 
 auth_backend = AuthenticationBackend(
@@ -83,3 +182,4 @@ fastapi_users = FastAPIUsers[User, uuid.UUID](
 )
 
 current_active_user = fastapi_users.current_user(active=True)
+current_superuser = fastapi_users.current_user(active=True, superuser=True)
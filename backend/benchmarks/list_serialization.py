@@ -0,0 +1,94 @@
+"""
+Serialization cost of the conversation list endpoint at 1k and 10k rows.
+
+Compares the two ways ``GET /api/v1/conversations`` has turned listing rows
+into a JSON body:
+
+    encoder: ``ConversationResponse(**row)`` per row, then FastAPI's
+        ``jsonable_encoder`` and ``json.dumps`` (the ``JSONResponse`` path of
+        FastAPI before 0.130, and of any route with a custom response class).
+    pydantic: ``ConversationResponse.model_validate(row)`` per row, then
+        pydantic-core's ``dump_json`` for the declared return type (what
+        FastAPI 0.130+ does for ``List[ConversationResponse]``).
+
+Run from ``backend/``:
+
+    uv run python -m benchmarks.list_serialization
+"""
+
+import argparse
+import json
+import statistics
+import time
+import uuid
+from collections.abc import Callable
+from datetime import datetime, timedelta
+from typing import Any, List
+
+from benchmarks import workload  # noqa: F401 — sets the settings the app needs
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.schemas import ConversationResponse
+
+SIZES = (1_000, 10_000)
+
+_response_list = TypeAdapter(List[ConversationResponse])
+
+
+def _rows(count: int) -> list[dict[str, Any]]:
+    """Listing rows as ``get_conversations_for_user_service`` returns them."""
+    user_id = uuid.uuid4()
+    now = datetime.now()
+    return [
+        {
+            "id": uuid.uuid4(),
+            "user_id": user_id,
+            "title": f"Conversation {index}",
+            "created_at": now - timedelta(minutes=index),
+            "updated_at": now - timedelta(seconds=index),
+        }
+        for index in range(count)
+    ]
+
+
+def encoder(rows: list[dict[str, Any]]) -> bytes:
+    body = jsonable_encoder([ConversationResponse(**row) for row in rows])
+    return json.dumps(body).encode()
+
+
+def pydantic(rows: list[dict[str, Any]]) -> bytes:
+    return _response_list.dump_json(
+        [ConversationResponse.model_validate(row) for row in rows]
+    )
+
+
+def _median_ms(serialize: Callable[[list[dict[str, Any]]], bytes], rows, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        serialize(rows)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=20, help="runs per measurement")
+    args = parser.parse_args()
+
+    for size in SIZES:
+        rows = _rows(size)
+        assert json.loads(encoder(rows)) == json.loads(pydantic(rows))
+        before = _median_ms(encoder, rows, args.repeat)
+        after = _median_ms(pydantic, rows, args.repeat)
+        print(
+            f"{size:>6} rows  encoder {before:8.2f} ms  pydantic {after:8.2f} ms  "
+            f"({before / after:.1f}x)",
+            flush=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+SQLite concurrency benchmark: the tuned engine profile against SQLite defaults.
+
+Several processes, standing in for uvicorn workers, share one database file
+and run the conversation workload (see ``benchmarks.workload``) for a fixed
+time. Each profile reports throughput, write latency and how many
+operations failed with ``database is locked``.
+
+Profiles:
+    default: ``create_async_engine(url)`` for reads and writes, on a file in
+        SQLite's default rollback-journal mode (the setup before the tuning
+        profile existed).
+    tuned: ``app.db.create_engine_for_url`` with the configured pragmas (WAL,
+        ``synchronous``, ``busy_timeout``, cache and mmap sizes) and a
+        separate read-only pool.
+
+Run from ``backend/``:
+
+    uv run python -m benchmarks.sqlite_concurrency --workers 4 --seconds 10
+"""
+
+import argparse
+import asyncio
+import os
+import sqlite3
+import tempfile
+
+from benchmarks.workload import Stats, migrate, report, run_processes, run_workload
+
+PROFILES = ("default", "tuned")
+
+
+def _worker(
+    profile: str, url: str, seconds: float, tasks: int, write_interval: float
+) -> Stats:
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    from app.db import create_engine_for_url
+
+    if profile == "tuned":
+        write_engine = create_engine_for_url(url)
+        read_engine = create_engine_for_url(url, read_only=True)
+    else:
+        write_engine = read_engine = create_async_engine(url)
+    return asyncio.run(
+        run_workload(write_engine, read_engine, seconds, tasks, write_interval)
+    )
+
+
+def run(
+    profile: str, workers: int, seconds: float, tasks: int, write_interval: float
+) -> Stats:
+    """Run ``profile`` with ``workers`` processes and return the merged stats."""
+    with tempfile.TemporaryDirectory(prefix="sqlite-benchmark-") as directory:
+        path = os.path.join(directory, f"{profile}.db")
+        url = f"sqlite+aiosqlite:///{path}"
+        os.environ["AGNO_DB_URL"] = f"sqlite+aiosqlite:///{directory}/agno.db"
+        migrate(url)
+        if profile == "default":
+            with sqlite3.connect(path) as conn:
+                conn.execute("PRAGMA journal_mode=DELETE")
+        return run_processes(
+            _worker, workers, profile, url, seconds, tasks, write_interval
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, default=4, help="worker processes")
+    parser.add_argument("--tasks", type=int, default=8, help="writers and readers per worker")
+    parser.add_argument("--seconds", type=float, default=10.0, help="duration per profile")
+    parser.add_argument(
+        "--write-interval",
+        type=float,
+        default=0.1,
+        help="seconds each writer waits between writes (0 saturates the write lock)",
+    )
+    parser.add_argument("--profile", choices=PROFILES, action="append")
+    args = parser.parse_args()
+
+    for profile in args.profile or PROFILES:
+        stats = run(profile, args.workers, args.seconds, args.tasks, args.write_interval)
+        print(report(profile, stats, args.seconds), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+The conversation workload the database benchmarks run, and its report.
+
+Each worker process runs ``tasks`` writers and ``tasks`` readers for a fixed
+time, using the application's own CRUD functions: a writer creates one
+conversation and then keeps retitling it (``INSERT``/``UPDATE ... RETURNING``),
+a reader keeps listing the worker's conversations as the sidebar does.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import statistics
+import time
+import uuid
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+# The benchmarks never authenticate or encrypt anything, but importing the
+# app requires these settings.
+os.environ.setdefault("AUTH_SECRET", "benchmark-secret-" + "x" * 32)
+os.environ.setdefault("GOOGLE_API_KEY", "unused")
+os.environ.setdefault("FERNET_KEY", "ZV8V8L4kgNIJnobu5Vf-UbzlSHlB8hPW-gl886zIRDo=")
+os.environ.setdefault("MCP_SERVER_URLS", "[]")
+
+
+@dataclass
+class Stats:
+    """Outcome of one worker process (or of all of them, merged)."""
+
+    writes: int = 0
+    reads: int = 0
+    locked: int = 0
+    write_latencies: list[float] = field(default_factory=list)
+
+    def merge(self, other: "Stats") -> None:
+        self.writes += other.writes
+        self.reads += other.reads
+        self.locked += other.locked
+        self.write_latencies += other.write_latencies
+
+
+async def run_workload(
+    write_engine: AsyncEngine,
+    read_engine: AsyncEngine,
+    seconds: float,
+    tasks: int,
+    write_interval: float,
+) -> Stats:
+    """Run the workload on the given engines and dispose of them afterwards."""
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    from app.crud.conversation import (
+        create_conversation_service,
+        get_conversations_for_user_service,
+        update_conversation_title_service,
+    )
+    from app.schemas import ConversationCreate
+
+    write_sessions = async_sessionmaker(write_engine, expire_on_commit=False)
+    read_sessions = async_sessionmaker(read_engine, expire_on_commit=False)
+    stats = Stats()
+    deadline = time.monotonic() + seconds
+    user_id = uuid.uuid4()
+
+    async def writer() -> None:
+        conversation_id = None
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                async with write_sessions() as session:
+                    if conversation_id is None:
+                        conversation = await create_conversation_service(
+                            user_id, session, ConversationCreate()
+                        )
+                        conversation_id = conversation.id
+                    else:
+                        await update_conversation_title_service(
+                            f"Title {stats.writes}", user_id, conversation_id, session
+                        )
+            except Exception as exc:
+                if "database is locked" not in str(exc):
+                    raise
+                stats.locked += 1
+                continue
+            stats.writes += 1
+            stats.write_latencies.append(time.perf_counter() - started)
+            await asyncio.sleep(write_interval)
+
+    async def reader() -> None:
+        while time.monotonic() < deadline:
+            try:
+                async with read_sessions() as session:
+                    await get_conversations_for_user_service(user_id, session, limit=50)
+            except Exception as exc:
+                if "database is locked" not in str(exc):
+                    raise
+                stats.locked += 1
+                continue
+            stats.reads += 1
+
+    try:
+        await asyncio.gather(
+            *(writer() for _ in range(tasks)), *(reader() for _ in range(tasks))
+        )
+    finally:
+        await write_engine.dispose()
+        if read_engine is not write_engine:
+            await read_engine.dispose()
+    return stats
+
+
+def migrate(url: str) -> None:
+    """Bring the database at ``url`` to the latest schema, in a fresh process."""
+    os.environ["DB_URL"] = url
+    # app.db builds its engine from DB_URL at import, so migrate elsewhere.
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        pool.apply(_migrate)
+
+
+def _migrate() -> None:
+    from app.migrations import migrate as migrate_schema
+
+    asyncio.run(migrate_schema())
+
+
+def run_processes(
+    worker: Callable[..., Stats], workers: int, *args: object
+) -> Stats:
+    """Run ``worker(*args)`` in ``workers`` processes and merge their stats."""
+    with multiprocessing.get_context("spawn").Pool(workers) as pool:
+        results = pool.starmap(worker, [args] * workers)
+    total = Stats()
+    for result in results:
+        total.merge(result)
+    return total
+
+
+def report(label: str, stats: Stats, seconds: float) -> str:
+    """One line of throughput, write latency and lock errors."""
+    latencies = sorted(stats.write_latencies) or [0.0]
+    p95 = latencies[int(0.95 * (len(latencies) - 1))]
+    return (
+        f"{label:8} writes/s {stats.writes / seconds:8.1f}  "
+        f"reads/s {stats.reads / seconds:8.1f}  "
+        f"write p50 {statistics.median(latencies) * 1000:7.1f} ms  "
+        f"p95 {p95 * 1000:7.1f} ms  "
+        f"locked {stats.locked}"
+    )
@@ -12,8 +12,15 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.chat import get_chat_router
 from app.api.conversations import get_conversations_router
+from app.api.jobs import get_jobs_router
+from app.api.metrics import get_metrics_router
 from app.api.models import get_models_router
-from app.db import create_db_and_tables
+from app.core.activity import conversation_touches
+from app.core.jobs import job_queue
+from app.core.mcp import mcp_manager
+from app.core.model_registry import model_registry
+from app.core.runs import chat_runs
+from app.migrations import ensure_schema
 from app.schemas import (
     UserCreate,
     UserRead,
@@ -26,9 +33,21 @@ from app.users import auth_backend, fastapi_users
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
-    """Run startup tasks (database table creation) before the app begins serving."""
-    await create_db_and_tables()
+    """Run startup tasks (schema check, MCP connections, model clients, job workers, activity flusher) before the app begins serving.
+
+    On shutdown, stops the job workers, cancels unfinished chat runs, flushes
+    pending conversation activity and closes the shared MCP connections.
+    """
+    await ensure_schema()
+    await mcp_manager.start()
+    model_registry.warm()
+    await job_queue.start()
+    await conversation_touches.start()
     yield
+    await job_queue.stop()
+    await chat_runs.stop()
+    await conversation_touches.stop()
+    await mcp_manager.stop()
 
 
 # --- App & Middleware --------------------------------------------------------
@@ -47,6 +66,7 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Run-ID"],
     )
 
     fastapi_app.include_router(
@@ -73,6 +93,12 @@ def create_app() -> FastAPI:
     fastapi_app.include_router(
         get_models_router(),
     )
+    fastapi_app.include_router(
+        get_jobs_router(),
+    )
+    fastapi_app.include_router(
+        get_metrics_router(),
+    )
 
     return fastapi_app
 
@@ -0,0 +1,74 @@
+"""
+Shared test setup.
+
+Settings are read once at import time, so the environment is prepared here,
+before any ``app`` module is imported: required secrets get dummy values,
+both databases default to a throwaway SQLite directory (set ``DB_URL`` /
+``AGNO_DB_URL`` to run against PostgreSQL), and no MCP servers are dialled.
+
+Async tests use AnyIO's pytest plugin (``@pytest.mark.anyio``) on a single
+event loop for the whole session, so the pooled database connections stay
+usable across tests.
+"""
+
+import os
+import tempfile
+import uuid
+from collections.abc import AsyncGenerator
+
+import pytest
+
+_data_dir = tempfile.mkdtemp(prefix="ai-nexus-tests-")
+os.environ.setdefault("AUTH_SECRET", "test-secret-" + "x" * 32)
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
+os.environ.setdefault("FERNET_KEY", "ZV8V8L4kgNIJnobu5Vf-UbzlSHlB8hPW-gl886zIRDo=")
+os.environ.setdefault("DB_URL", f"sqlite+aiosqlite:///{_data_dir}/app.db")
+os.environ.setdefault("AGNO_DB_URL", f"sqlite+aiosqlite:///{_data_dir}/agno.db")
+os.environ.setdefault("MCP_SERVER_URLS", "[]")
+
+from app.db import User, async_session_maker, engine, read_engine  # noqa: E402
+from app.migrations import migrate  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def anyio_backend() -> str:
+    return "asyncio"
+
+
+@pytest.fixture(scope="session", autouse=True)
+async def schema(anyio_backend: str) -> AsyncGenerator[None, None]:
+    """Bring the test database up to the latest schema once per session."""
+    await migrate()
+    yield
+    await engine.dispose()
+    await read_engine.dispose()
+
+
+@pytest.fixture
+async def user() -> User:
+    """A freshly registered, active user."""
+    async with async_session_maker() as session:
+        new_user = User(
+            id=uuid.uuid4(),
+            email=f"{uuid.uuid4().hex}@example.com",
+            hashed_password="not-a-real-hash",
+            is_active=True,
+        )
+        session.add(new_user)
+        await session.commit()
+        return new_user
+
+
+@pytest.fixture
+async def another_user() -> User:
+    """A second freshly registered, active user."""
+    async with async_session_maker() as session:
+        new_user = User(
+            id=uuid.uuid4(),
+            email=f"{uuid.uuid4().hex}@example.com",
+            hashed_password="not-a-real-hash",
+            is_active=True,
+        )
+        session.add(new_user)
+        await session.commit()
+        return new_user
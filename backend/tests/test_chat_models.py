@@ -0,0 +1,72 @@
+"""
+Model selection for chats that do not name a model.
+
+The frontend never sends ``model_id``, so a chat without one must run on the
+default of whatever ``CHAT_MODELS`` configures, not on a hardcoded id.
+"""
+
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+import app.api.chat as chat_api
+from app.core.config import ModelConfig
+from app.core.model_registry import ModelRegistry
+from app.core.routing import model_router
+from app.crud.conversation import create_conversation_service
+from app.db import User, async_session_maker
+from app.schemas import ConversationCreate
+from app.users import current_active_user
+from main import app
+
+
+class StandInAgent:
+    async def arun(self, question: str, stream: bool = True):
+        yield SimpleNamespace(content="Hi")
+
+
+@pytest.mark.anyio
+async def test_chat_without_model_id_uses_the_configured_default(
+    user: User, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    registry = ModelRegistry(
+        [ModelConfig(id="custom-model", name="Custom", context_window_tokens=32000)],
+        stats_window=10,
+    )
+    monkeypatch.setattr(chat_api, "model_registry", registry)
+    monkeypatch.setattr(model_router, "registry", registry)
+    requested: list[str] = []
+
+    def create_agent(user_id, conversation_id, model_id, **kwargs):
+        requested.append(model_id)
+        return StandInAgent()
+
+    monkeypatch.setattr(chat_api, "create_agent", create_agent)
+    app.dependency_overrides[current_active_user] = lambda: user
+
+    async with async_session_maker() as session:
+        conversation = await create_conversation_service(
+            user.id, session, ConversationCreate()
+        )
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            default = await client.post(
+                "/api/v1/chat/",
+                json={"question": "Hi", "conversation_id": str(conversation.id)},
+            )
+            unknown = await client.post(
+                "/api/v1/chat/",
+                json={
+                    "question": "Hi",
+                    "conversation_id": str(conversation.id),
+                    "model_id": "gemini-3-flash-preview",
+                },
+            )
+    finally:
+        app.dependency_overrides.pop(current_active_user, None)
+
+    assert default.status_code == 200
+    assert requested == ["custom-model"]
+    assert unknown.status_code == 400
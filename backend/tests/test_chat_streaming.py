@@ -0,0 +1,518 @@
+"""
+Load check for the async chat streaming path.
+
+Opens many SSE chat streams at once against a stand-in agent that holds
+every stream open, and checks that none of them occupies a threadpool
+worker while it waits for the model, i.e. that concurrent streams are no
+longer capped by the size of the threadpool.
+
+A second check runs real store-backed Agno agents (only the model is a
+stand-in) while another connection holds the store's write lock, and checks
+that the event loop keeps ticking while their session writes wait on it.
+
+The remaining tests script the model's deltas and check how they reach the
+client: the first chunk at once, later ones coalesced up to a time window
+and a size cap, and each chunk as a numbered SSE frame, which a client can
+resume from with ``Last-Event-ID``. A run whose last client has gone is
+cancelled, model stream included, once the orphan grace period passes
+without a reconnect.
+"""
+
+import asyncio
+import sqlite3
+import threading
+import time
+import uuid
+from collections.abc import AsyncGenerator, AsyncIterator
+from types import SimpleNamespace
+from typing import Any, Optional, Union
+
+import anyio.to_thread
+import httpx
+import orjson
+import pytest
+from agno.models.base import Model
+from agno.models.response import ModelResponse
+from sqlalchemy.engine import make_url
+
+import app.api.chat as chat_api
+from app.core.agents import create_agent
+from app.core.config import settings
+from app.core.history import get_conversation_history
+from app.core.limits import llm_limiter
+from app.core.metrics import metrics
+from app.core.runs import chat_runs
+from app.core.streaming import SSEEncoder, stream_agent_deltas
+from app.crud.conversation import create_conversation_service
+from app.db import User, async_session_maker
+from app.schemas import ConversationCreate
+from app.users import current_active_user
+from main import app
+
+# More than AnyIO's default threadpool (40 workers), so a thread-per-stream
+# implementation could not even open all of them.
+STREAMS = 48
+# How long the store's write lock is held, and the longest the event loop may
+# go without running a task meanwhile.
+STORE_LOCK_SECONDS = 0.5
+MAX_LOOP_STALL_SECONDS = 0.1
+
+
+class StandInAgent:
+    """Streams a fixed reply once ``gate`` opens, counting runs in flight."""
+
+    def __init__(self, gate: asyncio.Event, started: list[int]) -> None:
+        self.gate = gate
+        self.started = started
+
+    async def arun(self, question: str, stream: bool = True) -> AsyncGenerator:
+        self.started[0] += 1
+        await self.gate.wait()
+        for word in ("Hello", " from", " the", " stand-in"):
+            yield SimpleNamespace(content=word)
+
+
+@pytest.mark.anyio
+async def test_concurrent_streams_hold_no_threadpool_workers(
+    user: User, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    gate = asyncio.Event()
+    started = [0]
+    monkeypatch.setattr(
+        chat_api, "create_agent", lambda *args, **kwargs: StandInAgent(gate, started)
+    )
+    monkeypatch.setattr(llm_limiter, "per_user", STREAMS)
+    app.dependency_overrides[current_active_user] = lambda: user
+
+    async with async_session_maker() as session:
+        conversations = [
+            (await create_conversation_service(user.id, session, ConversationCreate())).id
+            for _ in range(STREAMS)
+        ]
+
+    threads_before = threading.active_count()
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            requests = [
+                asyncio.create_task(
+                    client.post(
+                        "/api/v1/chat/",
+                        json={"question": "Hi", "conversation_id": str(conversation_id)},
+                    )
+                )
+                for conversation_id in conversations
+            ]
+            async with asyncio.timeout(10):
+                while started[0] < STREAMS:
+                    await asyncio.sleep(0.01)
+
+            # Every stream is open and waiting on the model.
+            assert limiter.borrowed_tokens == 0
+            assert threading.active_count() - threads_before < STREAMS
+
+            gate.set()
+            responses = await asyncio.gather(*requests)
+    finally:
+        app.dependency_overrides.pop(current_active_user, None)
+
+    for response in responses:
+        assert response.status_code == 200
+        assert _streamed_text(response.text) == "Hello from the stand-in"
+        assert response.text.endswith("data: [DONE]\n\n")
+
+
+class StandInModel(Model):
+    """An Agno model that streams a fixed reply without calling a provider."""
+
+    def invoke(self, *args: Any, **kwargs: Any) -> ModelResponse:
+        raise NotImplementedError
+
+    async def ainvoke(self, *args: Any, **kwargs: Any) -> ModelResponse:
+        raise NotImplementedError
+
+    def invoke_stream(self, *args: Any, **kwargs: Any):
+        raise NotImplementedError
+
+    async def ainvoke_stream(self, *args: Any, **kwargs: Any) -> AsyncIterator[ModelResponse]:
+        for word in ("Hello", " from", " the", " stand-in"):
+            yield ModelResponse(role="assistant", content=word)
+
+    def _parse_provider_response(self, response: Any, **kwargs: Any) -> ModelResponse:
+        return response
+
+    def _parse_provider_response_delta(self, response: Any) -> ModelResponse:
+        return response
+
+
+@pytest.mark.anyio
+async def test_store_writes_do_not_stall_the_event_loop(
+    user: User, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    def agent_with_stand_in_model(*args, **kwargs):
+        agent = create_agent(*args, **kwargs)
+        assert agent.db is not None
+        agent.model = StandInModel(id=agent.model.id, name="Stand-in", provider="Stand-in")
+        return agent
+
+    monkeypatch.setattr(chat_api, "create_agent", agent_with_stand_in_model)
+    app.dependency_overrides[current_active_user] = lambda: user
+
+    async with async_session_maker() as session:
+        conversations = [
+            (await create_conversation_service(user.id, session, ConversationCreate())).id
+            for _ in range(llm_limiter.per_user + 1)
+        ]
+    transport = httpx.ASGITransport(app=app)
+    client = httpx.AsyncClient(transport=transport, base_url="http://test")
+
+    async def chat(conversation_id) -> httpx.Response:
+        return await client.post(
+            "/api/v1/chat/",
+            json={"question": "Hi", "conversation_id": str(conversation_id)},
+        )
+
+    # One unhindered chat first, so the store's tables and WAL mode exist.
+    assert (await chat(conversations.pop())).status_code == 200
+
+    # Another writer holds the store's lock, so every session write waits on it.
+    lock_holder = sqlite3.connect(make_url(settings.agno_db_url).database, timeout=10)
+    lock_holder.execute("BEGIN IMMEDIATE")
+    asyncio.get_running_loop().call_later(STORE_LOCK_SECONDS, lock_holder.commit)
+
+    stalls: list[float] = []
+
+    async def watch_the_loop() -> None:
+        while True:
+            before = time.perf_counter()
+            await asyncio.sleep(0.005)
+            stalls.append(time.perf_counter() - before - 0.005)
+
+    watcher = asyncio.create_task(watch_the_loop())
+    started = time.perf_counter()
+    try:
+        responses = await asyncio.gather(*(chat(c) for c in conversations))
+    finally:
+        watcher.cancel()
+        lock_holder.close()
+        await client.aclose()
+        app.dependency_overrides.pop(current_active_user, None)
+
+    for response in responses:
+        assert response.status_code == 200
+        assert _streamed_text(response.text) == "Hello from the stand-in"
+    assert max(stalls) < MAX_LOOP_STALL_SECONDS
+    # The runs were stored, after the lock was released.
+    assert time.perf_counter() - started >= STORE_LOCK_SECONDS
+    for conversation_id in conversations:
+        messages = await get_conversation_history(conversation_id)
+        assert [m.content for m in messages] == ["Hi", "Hello from the stand-in"]
+
+
+class ScriptedAgent:
+    """Streams the deltas in ``script``, waiting on each event or delay between them."""
+
+    def __init__(self, *script: Union[str, float, asyncio.Event]) -> None:
+        self.script = script
+
+    async def arun(self, question: str, stream: bool = True) -> AsyncGenerator:
+        for step in self.script:
+            if isinstance(step, asyncio.Event):
+                await step.wait()
+            elif isinstance(step, float):
+                await asyncio.sleep(step)
+            else:
+                yield SimpleNamespace(content=step)
+
+
+@pytest.mark.anyio
+async def test_first_chunk_is_immediate_and_later_deltas_are_coalesced() -> None:
+    gate = asyncio.Event()
+    agent = ScriptedAgent("Hel", gate, "lo", " wor", 0.3, "ld")
+
+    chunks = []
+    async with asyncio.timeout(5):
+        async for chunk in stream_agent_deltas(agent, "Hi", coalesce_seconds=0.1):
+            # The model only continues once the first chunk has been received.
+            chunks.append(chunk)
+            gate.set()
+
+    assert chunks == ["Hel", "lo wor", "ld"]
+
+
+@pytest.mark.anyio
+async def test_chunks_are_capped_in_utf8_bytes() -> None:
+    agent = ScriptedAgent(*["é"] * 6)
+
+    chunks = [
+        chunk
+        async for chunk in stream_agent_deltas(
+            agent, "Hi", coalesce_seconds=10, max_chunk_bytes=4
+        )
+    ]
+
+    # The stream ends as soon as the run does, without waiting out the window.
+    assert chunks == ["éé", "éé", "éé"]
+
+
+def test_sse_encoder_numbers_data_frames_only() -> None:
+    encoder = SSEEncoder(start_id=5)
+
+    assert encoder.encode({"type": "delta", "content": "é"}) == (
+        'id: 6\ndata: {"type":"delta","content":"é"}\n\n'.encode()
+    )
+    assert encoder.encode({"type": "delta", "content": "x"}).startswith(b"id: 7\n")
+    assert encoder.done() == b"data: [DONE]\n\n"
+    assert encoder.error("boom") == b'data: {"type":"error","detail":"boom"}\n\n'
+    assert encoder.last_event_id == 7
+
+
+@pytest.mark.anyio
+async def test_chat_streams_numbered_frames(
+    user: User, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(
+        chat_api,
+        "create_agent",
+        lambda *args, **kwargs: ScriptedAgent("Hello", 0.2, " there"),
+    )
+    conversation_id = await _new_conversation(user)
+
+    response = await _post_chat(user, conversation_id)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert _frames(response.text) == [
+        (1, {"type": "delta", "content": "Hello"}),
+        (2, {"type": "delta", "content": " there"}),
+        (None, "[DONE]"),
+    ]
+
+
+@pytest.mark.anyio
+async def test_resume_replays_frames_after_last_event_id(
+    user: User, another_user: User, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(
+        chat_api,
+        "create_agent",
+        lambda *args, **kwargs: ScriptedAgent("a", 0.2, "b", 0.2, "c"),
+    )
+    started = await _post_chat(user, await _new_conversation(user))
+    run_id = started.headers["X-Run-ID"]
+    assert len(_frames(started.text)) == 4
+
+    resumed = await _resume(user, run_id, last_event_id="1")
+    assert resumed.status_code == 200
+    assert resumed.headers["X-Run-ID"] == run_id
+    assert _frames(resumed.text) == [
+        (2, {"type": "delta", "content": "b"}),
+        (3, {"type": "delta", "content": "c"}),
+        (None, "[DONE]"),
+    ]
+    # Without Last-Event-ID the whole run is replayed.
+    assert (await _resume(user, run_id)).text == started.text
+    # Caught-up clients just get the end of the stream.
+    assert _frames((await _resume(user, run_id, last_event_id="3")).text) == [
+        (None, "[DONE]")
+    ]
+
+    assert (await _resume(user, run_id, last_event_id="x")).status_code == 400
+    assert (await _resume(another_user, run_id)).status_code == 404
+    assert (await _resume(user, str(uuid.uuid4()))).status_code == 404
+
+
+@pytest.mark.anyio
+async def test_resume_from_a_position_no_longer_buffered_is_a_conflict(
+    user: User, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(
+        chat_api,
+        "create_agent",
+        lambda *args, **kwargs: ScriptedAgent("a", 0.2, "b", 0.2, "c"),
+    )
+    monkeypatch.setattr(chat_runs, "replay_size", 2)
+    started = await _post_chat(user, await _new_conversation(user))
+    run_id = started.headers["X-Run-ID"]
+
+    # Only frames 2 and 3 are still buffered.
+    for lost in ("0", "4"):
+        response = await _resume(user, run_id, last_event_id=lost)
+        assert response.status_code == 409
+        assert response.json() == {"detail": "Stream position lost"}
+    response = await _resume(user, run_id, last_event_id="1")
+    assert response.status_code == 200
+    assert [event_id for event_id, _ in _frames(response.text)] == [2, 3, None]
+
+
+@pytest.mark.anyio
+async def test_reconnecting_to_a_live_run_does_not_rerun_the_model(
+    user: User,
+) -> None:
+    gate = asyncio.Event()
+    runs = [0]
+
+    async def deltas() -> AsyncGenerator[str, None]:
+        runs[0] += 1
+        yield "Hello"
+        await gate.wait()
+        yield " again"
+
+    run = chat_runs.start(user.id, uuid.uuid4(), deltas())
+    first = run.subscribe()
+    assert _frames((await anext(first)).decode()) == [
+        (1, {"type": "delta", "content": "Hello"})
+    ]
+    # The client drops the connection mid-run and reconnects.
+    await first.aclose()
+    gate.set()
+    frames = [frame async for frame in run.subscribe(after_id=1)]
+
+    assert _frames(b"".join(frames).decode()) == [
+        (2, {"type": "delta", "content": " again"}),
+        (None, "[DONE]"),
+    ]
+    assert runs[0] == 1
+
+
+class HangingAgent:
+    """Streams one delta and then never finishes, recording when it is stopped."""
+
+    def __init__(self) -> None:
+        self.stopped = asyncio.Event()
+
+    async def arun(self, question: str, stream: bool = True) -> AsyncGenerator:
+        try:
+            yield SimpleNamespace(content="Hel")
+            await asyncio.Event().wait()
+        finally:
+            self.stopped.set()
+
+
+async def _client_gone() -> bool:
+    return True
+
+
+@pytest.mark.anyio
+async def test_disconnected_run_is_cancelled_after_the_grace_period(
+    user: User, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(chat_runs, "orphan_grace_seconds", 0.1)
+    agent = HangingAgent()
+    released = []
+    before = metrics.snapshot()
+    run = chat_runs.start(
+        user.id,
+        uuid.uuid4(),
+        stream_agent_deltas(agent, "Hi"),
+        on_finish=lambda: released.append(True),
+    )
+
+    async with asyncio.timeout(5):
+        # Noticed by polling, while no frame is being written.
+        frames = [
+            frame
+            async for frame in run.subscribe(is_disconnected=_client_gone, poll_seconds=0.05)
+        ]
+        assert b"[DONE]" not in b"".join(frames)
+        assert not run.task.done()
+        await agent.stopped.wait()
+
+    with pytest.raises(asyncio.CancelledError):
+        await run.task
+    assert run.finished and run.failed
+    assert released == [True]
+    after = metrics.snapshot()
+    assert after["chat_client_disconnects"] == before.get("chat_client_disconnects", 0) + 1
+    assert after["chat_runs_orphaned"] == before.get("chat_runs_orphaned", 0) + 1
+    assert after["chat_runs_cancelled"] == before.get("chat_runs_cancelled", 0) + 1
+
+
+@pytest.mark.anyio
+async def test_reconnect_within_the_grace_period_keeps_the_run(
+    user: User, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(chat_runs, "orphan_grace_seconds", 0.1)
+    gate = asyncio.Event()
+    run = chat_runs.start(
+        user.id, uuid.uuid4(), stream_agent_deltas(ScriptedAgent("Hel", gate, "lo"), "Hi")
+    )
+
+    async with asyncio.timeout(5):
+        async for _ in run.subscribe(is_disconnected=_client_gone, poll_seconds=0.05):
+            pass
+        reconnected = asyncio.create_task(_collect(run.subscribe()))
+        # Well past the grace period that started when the first client left.
+        await asyncio.sleep(0.3)
+        assert not run.task.done()
+        gate.set()
+        body = await reconnected
+
+    assert _streamed_text(body) == "Hello"
+    assert body.endswith("data: [DONE]\n\n")
+
+
+async def _collect(frames: AsyncGenerator[bytes, None]) -> str:
+    return b"".join([frame async for frame in frames]).decode()
+
+
+async def _new_conversation(user: User):
+    async with async_session_maker() as session:
+        return (await create_conversation_service(user.id, session, ConversationCreate())).id
+
+
+async def _post_chat(user: User, conversation_id) -> httpx.Response:
+    app.dependency_overrides[current_active_user] = lambda: user
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(
+                "/api/v1/chat/",
+                json={"question": "Hi", "conversation_id": str(conversation_id)},
+            )
+    finally:
+        app.dependency_overrides.pop(current_active_user, None)
+
+
+async def _resume(
+    user: User, run_id: str, last_event_id: Optional[str] = None
+) -> httpx.Response:
+    app.dependency_overrides[current_active_user] = lambda: user
+    headers = {} if last_event_id is None else {"Last-Event-ID": last_event_id}
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get(f"/api/v1/chat/runs/{run_id}", headers=headers)
+    finally:
+        app.dependency_overrides.pop(current_active_user, None)
+
+
+def _frames(body: str) -> list[tuple[Optional[int], Any]]:
+    """Split an SSE response body into ``(event id, payload)`` pairs."""
+    frames = []
+    for frame in body.split("\n\n"):
+        if not frame:
+            continue
+        event_id = None
+        payload: Any = None
+        for line in frame.splitlines():
+            if line.startswith("id: "):
+                event_id = int(line.removeprefix("id: "))
+            elif line.startswith("data: "):
+                data = line.removeprefix("data: ")
+                payload = data if data == "[DONE]" else orjson.loads(data)
+        frames.append((event_id, payload))
+    return frames
+
+
+def _streamed_text(body: str) -> str:
+    """Concatenate the delta contents of an SSE response body."""
+    deltas = []
+    for frame in body.split("\n\n"):
+        for line in frame.splitlines():
+            if line.startswith("data: {"):
+                payload = orjson.loads(line.removeprefix("data: "))
+                if payload["type"] == "delta":
+                    deltas.append(payload["content"])
+    return "".join(deltas)
@@ -0,0 +1,109 @@
+"""
+Chat context budgeting counts turns the way Agno replays them.
+
+Cancelled and failed runs stay in the stored history but are never passed to
+the model, so they must not count towards ``num_history_runs`` or the
+summary's ``summarized_runs`` cursor.
+"""
+
+import time
+import uuid
+
+import pytest
+from agno.models.message import Message
+from agno.run.agent import RunOutput
+from agno.run.base import RunStatus
+from agno.session.agent import AgentSession
+
+import app.core.context as context
+from app.core.agents import CHAT_AGENT_ID, agno_db
+from app.core.config import settings
+from app.core.history import _history_turns, get_conversation_turns
+from app.db import async_session_maker
+
+STATUSES = [
+    RunStatus.completed,
+    RunStatus.cancelled,
+    RunStatus.completed,
+    RunStatus.error,
+    RunStatus.completed,
+]
+
+
+def _session(user_id: uuid.UUID, conversation_id: uuid.UUID) -> AgentSession:
+    """A session whose runs alternate between replayed and skipped ones."""
+    session = AgentSession(
+        session_id=str(conversation_id),
+        agent_id=CHAT_AGENT_ID,
+        user_id=str(user_id),
+        created_at=int(time.time()),
+        runs=[],
+    )
+    for index, status in enumerate(STATUSES):
+        session.upsert_run(
+            RunOutput(
+                run_id=str(uuid.uuid4()),
+                agent_id=CHAT_AGENT_ID,
+                session_id=str(conversation_id),
+                user_id=str(user_id),
+                content=f"answer {index}",
+                messages=[
+                    Message(role="system", content="You are helpful."),
+                    Message(role="user", content=f"question {index} " + "x" * 400),
+                    Message(role="assistant", content=f"answer {index} " + "y" * 400),
+                ],
+                status=status,
+            )
+        )
+    return session
+
+
+async def _store(session: AgentSession) -> None:
+    await agno_db.upsert_session(session)
+    if hasattr(agno_db, "upsert_run"):
+        for index, run in enumerate(session.runs or []):
+            await agno_db.upsert_run(
+                run, session_id=session.session_id, user_id=session.user_id, run_index=index
+            )
+
+
+def test_turns_match_agnos_history_window() -> None:
+    session = _session(uuid.uuid4(), uuid.uuid4())
+    turns = _history_turns(session)
+
+    assert len(turns) == STATUSES.count(RunStatus.completed)
+    for n in range(1, len(turns) + 1):
+        replayed = session.get_messages(last_n_runs=n, skip_roles=["system", "tool"])
+        assert [m.content for m in replayed] == [
+            m.content for turn in turns[-n:] for m in turn
+        ]
+
+
+@pytest.mark.anyio
+async def test_budget_and_summary_cursor_skip_unreplayed_runs(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    user_id, conversation_id = uuid.uuid4(), uuid.uuid4()
+    await _store(_session(user_id, conversation_id))
+    assert len(await get_conversation_turns(conversation_id)) == 3
+
+    # Room for exactly one turn (~205 estimated tokens each) plus the question.
+    monkeypatch.setattr(settings, "context_max_prompt_tokens", 250)
+    monkeypatch.setattr(settings, "context_max_prompt_tokens_by_model", {})
+    monkeypatch.setattr(settings, "context_reserved_tokens", 0)
+    monkeypatch.setattr(settings, "context_summary_batch_runs", 2)
+    scheduled: list[int] = []
+    monkeypatch.setattr(
+        context,
+        "_schedule_summary_refresh",
+        lambda user_id, conversation_id, up_to: scheduled.append(up_to),
+    )
+
+    async with async_session_maker() as session:
+        chat_context = await context.build_chat_context(
+            user_id, conversation_id, settings.chat_models[0].id, "Next?", session
+        )
+
+    assert chat_context.num_history_runs == 1
+    # Two replayed turns fell out of the window; the skipped runs are not counted.
+    assert scheduled == [2]
@@ -0,0 +1,265 @@
+"""
+Conversation listing and writes.
+
+The sidebar pages through conversations by the ``(updated_at, id)`` keyset,
+so paging must neither skip nor repeat rows, even when several share an
+``updated_at``. Creating a conversation and changing its title are each a
+single ``INSERT``/``UPDATE ... RETURNING`` statement. Cached conversations
+are immutable snapshots shared between requests, never ORM instances.
+"""
+
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import event, select, update
+
+from app.core.activity import conversation_touches
+from app.crud.conversation import (
+    conversation_cache,
+    create_conversation_service,
+    get_conversation_service,
+    get_conversations_for_user_service,
+    update_conversation_title_service,
+)
+from app.db import User, async_session_maker, engine, read_session_maker
+from app.models import Conversation
+from app.schemas import ConversationCreate, ConversationResponse
+from app.users import current_active_user
+from main import app
+
+# Conversations per test; the middle ones share one ``updated_at``.
+CONVERSATIONS = 7
+TIED = range(2, 6)
+
+
+async def _conversations(user: User) -> list[uuid.UUID]:
+    """Create conversations for ``user``, newest first, with a run of ties."""
+    base = datetime(2026, 1, 1, 12, 0, 0)
+    ids = []
+    async with async_session_maker() as session:
+        for index in range(CONVERSATIONS):
+            conversation = await create_conversation_service(
+                user.id, session, ConversationCreate()
+            )
+            age = TIED.start if index in TIED else index
+            updated_at = base - timedelta(minutes=age)
+            await session.execute(
+                update(Conversation)
+                .where(Conversation.id == conversation.id)
+                .values(updated_at=updated_at)
+            )
+            await session.commit()
+            ids.append(conversation.id)
+    # Ties are ordered by id, descending.
+    tied = sorted((ids[index] for index in TIED), reverse=True)
+    return ids[: TIED.start] + tied + ids[TIED.stop :]
+
+
+async def _list(user: User, **params) -> httpx.Response:
+    app.dependency_overrides[current_active_user] = lambda: user
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get(
+                "/api/v1/conversations",
+                params={key: str(value) for key, value in params.items()},
+            )
+    finally:
+        app.dependency_overrides.pop(current_active_user, None)
+
+
+def _cursor(row: dict) -> dict:
+    return {"before_updated_at": row["updated_at"], "before_id": row["id"]}
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("limit", [1, 2, 3, CONVERSATIONS])
+async def test_pages_neither_skip_nor_repeat_tied_rows(user: User, limit: int) -> None:
+    expected = await _conversations(user)
+
+    everything = (await _list(user)).json()
+    assert [uuid.UUID(row["id"]) for row in everything] == expected
+
+    seen: list[uuid.UUID] = []
+    cursor: dict = {}
+    while True:
+        page = (await _list(user, limit=limit, **cursor)).json()
+        assert len(page) <= limit
+        seen += [uuid.UUID(row["id"]) for row in page]
+        if len(page) < limit:
+            break
+        cursor = _cursor(page[-1])
+    assert seen == expected
+
+
+@pytest.mark.anyio
+async def test_cursor_boundaries(user: User, another_user: User) -> None:
+    expected = await _conversations(user)
+    await _conversations(another_user)
+    everything = (await _list(user)).json()
+
+    # A cursor is exclusive: the row it names is not repeated.
+    after_first = (await _list(user, **_cursor(everything[0]))).json()
+    assert [uuid.UUID(row["id"]) for row in after_first] == expected[1:]
+    # Past the oldest row there is nothing left.
+    assert (await _list(user, **_cursor(everything[-1]))).json() == []
+    # A cursor in the middle of the ties keeps only the tied rows with a smaller id.
+    middle = everything[TIED.start + 1]
+    after_middle = (await _list(user, limit=CONVERSATIONS, **_cursor(middle))).json()
+    assert [uuid.UUID(row["id"]) for row in after_middle] == expected[TIED.start + 2 :]
+
+
+@pytest.mark.anyio
+async def test_half_a_cursor_is_rejected(user: User) -> None:
+    response = await _list(user, before_updated_at=datetime(2026, 1, 1).isoformat())
+    assert response.status_code == 400
+    response = await _list(user, before_id=uuid.uuid4())
+    assert response.status_code == 400
+
+
+@contextmanager
+def _statements() -> Iterator[list[str]]:
+    """Collect the SQL statements sent to the application database."""
+    statements: list[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany) -> None:
+        statements.append(" ".join(statement.split()))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+
+@pytest.mark.anyio
+async def test_create_is_a_single_insert_returning(user: User) -> None:
+    conversation_id = uuid.uuid4()
+    async with async_session_maker() as session:
+        with _statements() as statements:
+            created = await create_conversation_service(
+                user.id, session, ConversationCreate(id=conversation_id)
+            )
+
+    assert len(statements) == 1
+    assert statements[0].startswith("INSERT INTO conversations")
+    assert "RETURNING" in statements[0]
+    assert (created.id, created.user_id, created.title) == (
+        conversation_id,
+        user.id,
+        "New Conversation",
+    )
+    assert created.created_at == created.updated_at
+
+    async with async_session_maker() as session:
+        stored = await session.scalar(
+            select(Conversation).where(Conversation.id == conversation_id)
+        )
+    assert stored is not None and stored.title == "New Conversation"
+
+
+@pytest.mark.anyio
+async def test_title_update_is_a_single_owned_update_returning(user: User) -> None:
+    async with async_session_maker() as session:
+        created = await create_conversation_service(user.id, session, ConversationCreate())
+
+    async with async_session_maker() as session:
+        with _statements() as statements:
+            updated = await update_conversation_title_service(
+                "Renamed", user.id, created.id, session
+            )
+
+    assert len(statements) == 1
+    assert statements[0].startswith("UPDATE conversations SET")
+    # The ownership check is part of the same statement.
+    assert "conversations.user_id =" in statements[0].partition("WHERE")[2]
+    assert "RETURNING" in statements[0]
+    assert updated is not None
+    assert (updated.id, updated.title) == (created.id, "Renamed")
+    assert updated.updated_at > created.updated_at
+
+
+@pytest.mark.anyio
+async def test_title_update_of_a_missing_or_foreign_conversation_is_a_no_op(
+    user: User, another_user: User
+) -> None:
+    async with async_session_maker() as session:
+        created = await create_conversation_service(user.id, session, ConversationCreate())
+
+    async with async_session_maker() as session:
+        assert (
+            await update_conversation_title_service(
+                "Hijacked", another_user.id, created.id, session
+            )
+            is None
+        )
+        assert (
+            await update_conversation_title_service(
+                "Renamed", user.id, uuid.uuid4(), session
+            )
+            is None
+        )
+
+    conversation_cache.clear()
+    async with async_session_maker() as session:
+        stored = await get_conversation_service(user.id, session, created.id)
+    assert stored is not None and stored.title == "New Conversation"
+
+
+@pytest.mark.anyio
+async def test_cached_conversations_are_immutable_snapshots(user: User) -> None:
+    async with async_session_maker() as session:
+        created = await create_conversation_service(user.id, session, ConversationCreate())
+    conversation_cache.clear()
+
+    async with async_session_maker() as first, async_session_maker() as second:
+        loaded = await get_conversation_service(user.id, first, created.id)
+        shared = await get_conversation_service(user.id, second, created.id)
+
+    assert isinstance(loaded, ConversationResponse)
+    assert shared is loaded is conversation_cache.get((user.id, created.id))
+    with pytest.raises(ValidationError):
+        loaded.title = "Mutated"  # type: ignore[misc]
+
+    async with async_session_maker() as session:
+        renamed = await update_conversation_title_service(
+            "Renamed", user.id, created.id, session
+        )
+    # The entry was replaced; the snapshot other requests hold is unchanged.
+    assert conversation_cache.get((user.id, created.id)) is renamed
+    assert loaded.title == "New Conversation"
+
+
+@pytest.mark.anyio
+async def test_touch_swaps_the_snapshot_without_writing_through_a_read_session(
+    user: User,
+) -> None:
+    async with async_session_maker() as session:
+        created = await create_conversation_service(user.id, session, ConversationCreate())
+    conversation_cache.clear()
+    key = (user.id, created.id)
+
+    # As in a chat request: look up, touch, then query the same read-only session.
+    async with read_session_maker() as session:
+        loaded = await get_conversation_service(user.id, session, created.id)
+        expires_at = conversation_cache._entries[key][0]
+        conversation_touches.touch(user.id, created.id)
+        await get_conversations_for_user_service(user.id, session)
+
+    touched = conversation_cache.get(key)
+    assert loaded is not None and touched is not None
+    assert touched.updated_at > loaded.updated_at
+    assert loaded.updated_at == created.updated_at
+    # The swap keeps the entry's lifetime.
+    assert conversation_cache._entries[key][0] == expires_at
+
+    await conversation_touches.flush()
+    conversation_cache.clear()
+    async with read_session_maker() as session:
+        stored = await get_conversation_service(user.id, session, created.id)
+    assert stored is not None and stored.updated_at == touched.updated_at
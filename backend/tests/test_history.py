@@ -0,0 +1,76 @@
+"""
+History cache freshness.
+
+A history cached by one worker must not be served after the conversation was
+written elsewhere (another worker, or a run Agno persisted after the cache
+was invalidated), which the cache cannot observe directly. Writes made
+through this worker drop the cached entry themselves.
+"""
+
+import asyncio
+import time
+import uuid
+
+import pytest
+
+import app.core.history as history
+from app.core.history import append_turn, get_conversation_history
+from app.core.metrics import metrics
+
+
+@pytest.fixture
+def elsewhere(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Make ``append_turn`` write like another worker: this cache is not told."""
+    monkeypatch.setattr(history, "invalidate_history", lambda conversation_id: None)
+
+
+async def _next_second() -> None:
+    await asyncio.sleep(1.0 - time.time() % 1.0 + 0.01)
+
+
+@pytest.mark.anyio
+@pytest.mark.usefixtures("elsewhere")
+async def test_cached_history_is_reread_after_an_uncached_write() -> None:
+    user_id, conversation_id = uuid.uuid4(), uuid.uuid4()
+    await append_turn(user_id, conversation_id, "stand-in", "First question", "First answer")
+    await _next_second()
+
+    assert len(await get_conversation_history(conversation_id)) == 2
+    hits = metrics.snapshot().get("history_cache_hits", 0.0)
+    assert len(await get_conversation_history(conversation_id)) == 2
+    assert metrics.snapshot()["history_cache_hits"] == hits + 1
+
+    # Written without invalidating this process's cache, as another worker would.
+    await append_turn(user_id, conversation_id, "stand-in", "Second question", "Second answer")
+    messages = await get_conversation_history(conversation_id)
+    assert [message.content for message in messages] == [
+        "First question",
+        "First answer",
+        "Second question",
+        "Second answer",
+    ]
+
+
+@pytest.mark.anyio
+@pytest.mark.usefixtures("elsewhere")
+async def test_history_read_in_the_second_of_a_write_is_not_served() -> None:
+    user_id, conversation_id = uuid.uuid4(), uuid.uuid4()
+    await _next_second()
+    await append_turn(user_id, conversation_id, "stand-in", "First question", "First answer")
+    assert len(await get_conversation_history(conversation_id)) == 2
+
+    # Same second as the load: ``updated_at`` cannot tell this write apart.
+    await append_turn(user_id, conversation_id, "stand-in", "Second question", "Second answer")
+    assert len(await get_conversation_history(conversation_id)) == 4
+
+
+@pytest.mark.anyio
+async def test_append_turn_drops_this_workers_cached_history() -> None:
+    user_id, conversation_id = uuid.uuid4(), uuid.uuid4()
+    await append_turn(user_id, conversation_id, "stand-in", "First question", "First answer")
+    assert len(await get_conversation_history(conversation_id)) == 2
+    assert history.history_cache.get(conversation_id) is not None
+
+    await append_turn(user_id, conversation_id, "stand-in", "Second question", "Second answer")
+    assert history.history_cache.get(conversation_id) is None
+    assert len(await get_conversation_history(conversation_id)) == 4
@@ -0,0 +1,128 @@
+"""
+Background job queue: retries with backoff, dedup by key and the pending cap.
+
+Each test runs its own small ``JobQueue`` with a short backoff, so nothing
+here waits on the application's queue or its workers.
+"""
+
+import asyncio
+import time
+import uuid
+from collections.abc import AsyncGenerator
+
+import pytest
+
+from app.core.jobs import Job, JobQueue, JobQueueFullError, JobStatus
+
+BACKOFF = 0.05
+
+
+@pytest.fixture
+async def queue() -> AsyncGenerator[JobQueue, None]:
+    job_queue = JobQueue(
+        concurrency=2,
+        max_attempts=3,
+        retry_backoff_seconds=BACKOFF,
+        max_pending=4,
+        retention_seconds=60.0,
+    )
+    await job_queue.start()
+    yield job_queue
+    await job_queue.stop()
+
+
+async def _finished(job: Job) -> Job:
+    async with asyncio.timeout(5):
+        while job.status not in (JobStatus.SUCCEEDED, JobStatus.FAILED):
+            await asyncio.sleep(0.005)
+    return job
+
+
+def _flaky(failures: int, calls: list[float]):
+    """A job body that fails ``failures`` times, then returns the attempt number."""
+
+    async def run() -> int:
+        calls.append(time.monotonic())
+        if len(calls) <= failures:
+            raise RuntimeError(f"attempt {len(calls)} failed")
+        return len(calls)
+
+    return run
+
+
+@pytest.mark.anyio
+async def test_failed_attempts_are_retried_with_doubling_backoff(queue: JobQueue) -> None:
+    calls: list[float] = []
+    job = await _finished(queue.enqueue("flaky", uuid.uuid4(), _flaky(2, calls)))
+
+    assert job.status is JobStatus.SUCCEEDED
+    assert (job.attempts, job.result, job.error) == (3, 3, None)
+    assert calls[1] - calls[0] >= BACKOFF
+    assert calls[2] - calls[1] >= 2 * BACKOFF
+
+
+@pytest.mark.anyio
+async def test_a_job_fails_once_its_attempts_are_exhausted(queue: JobQueue) -> None:
+    calls: list[float] = []
+    job = await _finished(queue.enqueue("broken", uuid.uuid4(), _flaky(10, calls)))
+
+    assert job.status is JobStatus.FAILED
+    assert job.attempts == len(calls) == 3
+    assert job.error == "attempt 3 failed"
+    assert job.finished_at is not None
+
+
+@pytest.mark.anyio
+async def test_an_active_key_is_deduplicated_until_its_job_finishes(
+    queue: JobQueue,
+) -> None:
+    release = asyncio.Event()
+    runs: list[str] = []
+
+    async def run() -> None:
+        runs.append("run")
+        await release.wait()
+
+    user_id = uuid.uuid4()
+    first = queue.enqueue("title:1", user_id, run)
+    assert queue.enqueue("title:1", user_id, run) is first
+    release.set()
+    await _finished(first)
+    assert runs == ["run"]
+
+    again = queue.enqueue("title:1", user_id, run)
+    assert again is not first
+    await _finished(again)
+    assert runs == ["run", "run"]
+    assert queue.get(first.id) is first
+
+
+@pytest.mark.anyio
+async def test_a_retrying_job_keeps_its_key(queue: JobQueue) -> None:
+    calls: list[float] = []
+    job = queue.enqueue("flaky", uuid.uuid4(), _flaky(1, calls))
+    async with asyncio.timeout(5):
+        while not (job.attempts == 1 and job.status is JobStatus.PENDING):
+            await asyncio.sleep(0.001)
+
+    # Waiting out its backoff, the job is still the active one for its key.
+    assert queue.enqueue("flaky", uuid.uuid4(), _flaky(0, [])) is job
+    await _finished(job)
+    assert job.attempts == 2
+
+
+@pytest.mark.anyio
+async def test_enqueueing_past_max_pending_is_rejected(queue: JobQueue) -> None:
+    release = asyncio.Event()
+    jobs = [
+        queue.enqueue(f"job:{index}", uuid.uuid4(), release.wait)
+        for index in range(queue.max_pending)
+    ]
+
+    with pytest.raises(JobQueueFullError):
+        queue.enqueue("one-too-many", uuid.uuid4(), release.wait)
+
+    release.set()
+    for job in jobs:
+        await _finished(job)
+    queue.enqueue("one-too-many", uuid.uuid4(), release.wait)
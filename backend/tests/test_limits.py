@@ -0,0 +1,111 @@
+"""
+Admission control for model calls.
+
+A chat that finds the user's slots taken waits for the queue timeout and is
+then turned away with 429 and ``Retry-After``, before any agent is built;
+once the wait queue is full, callers are turned away without waiting.
+Background utility jobs have a budget of their own, so a user's open
+streams do not make their title jobs time out.
+"""
+
+import asyncio
+import uuid
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from agno.run.base import RunStatus
+
+import app.api.chat as chat_api
+import app.core.titles as titles
+from app.core.limits import ConcurrencyLimiter, ConcurrencyLimitError, llm_limiter
+from app.core.titles import title_generator
+from app.crud.conversation import create_conversation_service
+from app.db import User, async_session_maker
+from app.schemas import ConversationCreate
+from app.users import current_active_user
+from main import app
+
+
+def _no_agent(*args, **kwargs):
+    raise AssertionError("a rejected chat must not build an agent")
+
+
+@pytest.mark.anyio
+async def test_chat_over_capacity_gets_429_with_retry_after(
+    user: User, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(chat_api, "create_agent", _no_agent)
+    monkeypatch.setattr(llm_limiter, "queue_timeout_seconds", 0.05)
+    async with async_session_maker() as session:
+        conversation = await create_conversation_service(
+            user.id, session, ConversationCreate()
+        )
+
+    # The user's streams hold every one of their slots.
+    permits = [await llm_limiter.acquire(user.id) for _ in range(llm_limiter.per_user)]
+    app.dependency_overrides[current_active_user] = lambda: user
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post(
+                "/api/v1/chat/",
+                json={"question": "Hi", "conversation_id": str(conversation.id)},
+            )
+    finally:
+        app.dependency_overrides.pop(current_active_user, None)
+        for permit in permits:
+            permit.release()
+
+    assert response.status_code == 429
+    assert response.json() == {"detail": "Too many concurrent chats, try again later"}
+    assert int(response.headers["Retry-After"]) >= 1
+
+
+@pytest.mark.anyio
+async def test_full_wait_queue_rejects_without_waiting() -> None:
+    limiter = ConcurrencyLimiter(
+        name="test_limiter",
+        per_user=1,
+        max_concurrent=1,
+        max_queued=1,
+        queue_timeout_seconds=5.0,
+    )
+    user_id = uuid.uuid4()
+    held = await limiter.acquire(user_id)
+    waiter = asyncio.create_task(limiter.acquire(user_id))
+    await asyncio.sleep(0)
+
+    async with asyncio.timeout(1):
+        with pytest.raises(ConcurrencyLimitError) as rejected:
+            await limiter.acquire(uuid.uuid4())
+    assert rejected.value.retry_after >= 1
+
+    # The queued caller still gets the slot once it is released, and a
+    # released permit can be released again harmlessly.
+    held.release()
+    held.release()
+    (await waiter).release()
+    await limiter.acquire(user_id)
+
+
+@pytest.mark.anyio
+async def test_title_jobs_do_not_wait_for_chat_slots(
+    user: User, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    async def utility_agent(prompt: str, model_id: str) -> SimpleNamespace:
+        return SimpleNamespace(status=RunStatus.completed, content="Planning a trip")
+
+    monkeypatch.setattr(titles, "create_utility_agent", utility_agent)
+    monkeypatch.setattr(llm_limiter, "queue_timeout_seconds", 0.05)
+    message = f"Help me plan a two week trip through Japan in spring {uuid.uuid4()}"
+
+    permits = [await llm_limiter.acquire(user.id) for _ in range(llm_limiter.per_user)]
+    try:
+        async with asyncio.timeout(1):
+            title = await title_generator.generate(user.id, message)
+    finally:
+        for permit in permits:
+            permit.release()
+
+    assert title == "Planning a trip"
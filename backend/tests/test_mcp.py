@@ -0,0 +1,161 @@
+"""
+MCPSessionManager against a local stand-in MCP server.
+
+The server is a real streamable-HTTP MCP server served by uvicorn on a free
+local port, so connects, pings and tool listing go over the wire. It can be
+stopped and restarted on the same port to simulate an outage.
+"""
+
+import asyncio
+import socket
+from collections.abc import AsyncGenerator
+
+import pytest
+import uvicorn
+
+try:
+    from mcp.server.fastmcp import FastMCP
+except ImportError:  # mcp >= 2 renamed FastMCP to MCPServer
+    from mcp.server.mcpserver import MCPServer as FastMCP
+
+from app.core.mcp import MCPSessionManager
+from app.core.metrics import metrics
+
+
+class StandInServer:
+    """A stand-in MCP server exposing ``echo``, restartable on the same port."""
+
+    def __init__(self) -> None:
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            self.port = probe.getsockname()[1]
+        self.url = f"http://127.0.0.1:{self.port}/mcp"
+        self.mcp: FastMCP
+        self._server: uvicorn.Server
+        self._task: asyncio.Task[None]
+
+    async def start(self) -> None:
+        self.mcp = FastMCP("stand-in")
+
+        @self.mcp.tool()
+        def echo(text: str) -> str:
+            """Return ``text`` unchanged."""
+            return text
+
+        config = uvicorn.Config(
+            self.mcp.streamable_http_app(),
+            host="127.0.0.1",
+            port=self.port,
+            log_level="warning",
+            timeout_graceful_shutdown=1,
+        )
+        self._server = uvicorn.Server(config)
+        self._task = asyncio.create_task(self._server.serve())
+        async with asyncio.timeout(5):
+            while not self._server.started:
+                await asyncio.sleep(0.01)
+
+    async def stop(self) -> None:
+        self._server.should_exit = True
+        await self._task
+
+
+@pytest.fixture
+async def server() -> AsyncGenerator[StandInServer, None]:
+    stand_in = StandInServer()
+    await stand_in.start()
+    yield stand_in
+    if not stand_in._task.done():
+        await stand_in.stop()
+
+
+async def _wait_for(condition, timeout: float = 10.0) -> None:
+    async with asyncio.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.05)
+
+
+@pytest.mark.anyio
+async def test_reconnects_after_outage(
+    server: StandInServer,
+) -> None:
+    manager = MCPSessionManager(
+        urls=[server.url],
+        schema_ttl_seconds=600.0,
+        health_check_interval_seconds=0.1,
+        connect_timeout_seconds=2.0,
+    )
+    await manager.start()
+    try:
+        (toolkit,) = manager.get_toolkits((server.url,))
+        assert toolkit.initialized
+        assert "echo" in toolkit.functions
+        first_session = toolkit.session
+        reconnects = metrics.snapshot().get("mcp_reconnects", 0.0)
+
+        await server.stop()
+        await _wait_for(lambda: not toolkit.initialized)
+        assert metrics.snapshot()["mcp_reconnects"] > reconnects
+
+        await server.start()
+        await _wait_for(lambda: toolkit.initialized)
+        assert toolkit.session is not first_session
+        assert "echo" in toolkit.functions
+    finally:
+        await manager.stop()
+    assert not toolkit.initialized
+    assert toolkit.session is None
+
+
+@pytest.mark.anyio
+async def test_forced_reconnect_closes_the_previous_session(
+    server: StandInServer, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    manager = MCPSessionManager(
+        urls=[server.url],
+        schema_ttl_seconds=600.0,
+        health_check_interval_seconds=0.1,
+        connect_timeout_seconds=2.0,
+    )
+    await manager.start()
+    try:
+        (toolkit,) = manager.get_toolkits((server.url,))
+        first_session = toolkit.session
+        failed_pings = [0]
+
+        async def failing_ping() -> bool:
+            # One missed ping while the server itself stays up.
+            failed_pings[0] += 1
+            return failed_pings[0] > 1
+
+        monkeypatch.setattr(toolkit, "is_alive", failing_ping)
+        await _wait_for(lambda: toolkit.session is not first_session and toolkit.initialized)
+        assert not first_session.is_connected()
+    finally:
+        await manager.stop()
+
+
+@pytest.mark.anyio
+async def test_refreshes_tool_schemas_after_ttl(server: StandInServer) -> None:
+    manager = MCPSessionManager(
+        urls=[server.url],
+        schema_ttl_seconds=0.2,
+        health_check_interval_seconds=0.1,
+        connect_timeout_seconds=2.0,
+    )
+    await manager.start()
+    try:
+        (toolkit,) = manager.get_toolkits((server.url,))
+        assert set(toolkit.functions) == {"echo"}
+        session = toolkit.session
+
+        @server.mcp.tool()
+        def reverse(text: str) -> str:
+            """Return ``text`` reversed."""
+            return text[::-1]
+
+        await _wait_for(lambda: "reverse" in toolkit.functions)
+        # Picked up by re-listing on the live session, not by reconnecting.
+        assert toolkit.session is session
+    finally:
+        await manager.stop()
@@ -0,0 +1,36 @@
+"""
+The metrics endpoint reports every user's traffic, so only superusers see it.
+"""
+
+import httpx
+import pytest
+
+from app.db import User, async_session_maker
+from app.users import get_jwt_strategy
+from main import app
+
+
+async def _get_metrics(user: User) -> httpx.Response:
+    token = await get_jwt_strategy().write_token(user)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://test", cookies={"session_token": token}
+    ) as client:
+        return await client.get("/api/v1/metrics/")
+
+
+@pytest.mark.anyio
+async def test_metrics_are_forbidden_to_regular_users(user: User) -> None:
+    assert (await _get_metrics(user)).status_code == 403
+
+
+@pytest.mark.anyio
+async def test_metrics_are_served_to_superusers(user: User) -> None:
+    async with async_session_maker() as session:
+        user.is_superuser = True
+        await session.merge(user)
+        await session.commit()
+
+    response = await _get_metrics(user)
+    assert response.status_code == 200
+    assert isinstance(response.json(), dict)
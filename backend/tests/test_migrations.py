@@ -0,0 +1,81 @@
+"""
+Schema migrations: concurrent migrators, as when several workers boot against
+a fresh database, and the schema the migrations build.
+"""
+
+import os
+import sqlite3
+import subprocess
+import sys
+from pathlib import Path
+
+from sqlalchemy import Engine, create_engine, inspect
+
+from app import models  # noqa: F401 — registers the models on Base.metadata
+from app.db import Base
+from app.migrations import LATEST_VERSION, MIGRATIONS
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+MIGRATORS = 8
+
+
+def test_concurrent_migrators_on_a_fresh_sqlite_database(tmp_path: Path) -> None:
+    env = {
+        **os.environ,
+        "DB_URL": f"sqlite+aiosqlite:///{tmp_path}/app.db",
+        "AGNO_DB_URL": f"sqlite+aiosqlite:///{tmp_path}/agno.db",
+    }
+    migrators = [
+        subprocess.Popen(
+            [sys.executable, "-m", "app.migrations"],
+            cwd=BACKEND_DIR,
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+        )
+        for _ in range(MIGRATORS)
+    ]
+    for migrator in migrators:
+        output, _ = migrator.communicate(timeout=60)
+        assert migrator.returncode == 0, output
+        assert f"Database schema at version {LATEST_VERSION}" in output
+
+    with sqlite3.connect(tmp_path / "app.db") as conn:
+        assert conn.execute("SELECT version FROM schema_version").fetchall() == [
+            (LATEST_VERSION,)
+        ]
+
+
+def _schema(engine: Engine) -> dict:
+    """Tables with their columns, indexes and foreign keys, as the database reports them."""
+    inspector = inspect(engine)
+    return {
+        table: {
+            "columns": {
+                (column["name"], str(column["type"]), column["nullable"])
+                for column in inspector.get_columns(table)
+            },
+            "indexes": {
+                (index["name"], tuple(index["column_names"]), bool(index["unique"]))
+                for index in inspector.get_indexes(table)
+            },
+            "foreign_keys": {
+                (tuple(fk["constrained_columns"]), fk["referred_table"])
+                for fk in inspector.get_foreign_keys(table)
+            },
+        }
+        for table in inspector.get_table_names()
+        if table != "schema_version"
+    }
+
+
+def test_migrations_build_the_models_schema(tmp_path: Path) -> None:
+    migrated = create_engine(f"sqlite:///{tmp_path}/migrated.db")
+    with migrated.begin() as conn:
+        for migration in MIGRATIONS:
+            migration.upgrade(conn)
+    modelled = create_engine(f"sqlite:///{tmp_path}/modelled.db")
+    Base.metadata.create_all(modelled)
+
+    assert _schema(migrated) == _schema(modelled)
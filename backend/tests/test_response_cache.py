@@ -0,0 +1,133 @@
+"""
+Response cache: exact and similarity tiers, and replaying hits through chat.
+
+Exact hits match the normalised prompt for the same model and history; the
+similarity tier (only with an embedder) reuses the closest cached prompt of
+that model and history above the threshold. Through the chat endpoint, a hit
+is streamed and recorded without building an agent, and opted-out users
+bypass the cache.
+"""
+
+import uuid
+from collections.abc import AsyncGenerator
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+import app.api.chat as chat_api
+from app.core.config import settings
+from app.core.history import get_conversation_history
+from app.core.metrics import metrics
+from app.core.model_registry import model_registry
+from app.core.response_cache import HashingEmbedder, ResponseCache, response_cache
+from app.crud.conversation import create_conversation_service
+from app.db import User, async_session_maker
+from app.schemas import ConversationCreate
+from app.users import current_active_user
+from main import app
+
+QUESTION = "How do I reverse a list in Python?"
+ANSWER = "Use reversed() or slice with [::-1]."
+
+
+def test_exact_tier_matches_the_normalised_prompt_in_the_same_context() -> None:
+    cache = ResponseCache(max_size=8, ttl_seconds=60)
+    cache.store("model-a", "", QUESTION, ANSWER)
+
+    assert cache.lookup("model-a", "", "  how do I reverse a LIST in python ") == ANSWER
+    # Another model, another history or a reworded prompt is a miss.
+    assert cache.lookup("model-b", "", QUESTION) is None
+    assert cache.lookup("model-a", "f1ngerprint", QUESTION) is None
+    assert cache.lookup("model-a", "", "In Python, how do I reverse a list") is None
+
+
+def test_similarity_tier_reuses_close_prompts_above_the_threshold() -> None:
+    cache = ResponseCache(
+        max_size=8, ttl_seconds=60, embedder=HashingEmbedder(), similarity_threshold=0.9
+    )
+    cache.store("model-a", "", QUESTION, ANSWER)
+    before = metrics.snapshot()
+
+    assert cache.lookup("model-a", "", "In Python, how do I reverse a list") == ANSWER
+    assert cache.lookup("model-a", "", "how do i reverse a python list") is None
+    assert cache.lookup("model-a", "", "What is the capital of France?") is None
+    # Only prompts cached for the same model and history are candidates.
+    assert cache.lookup("model-b", "", "In Python, how do I reverse a list") is None
+    assert cache.lookup("model-a", "f1ngerprint", "In Python, how do I reverse a list") is None
+
+    after = metrics.snapshot()
+    assert after["response_cache_similar_hits"] == before.get("response_cache_similar_hits", 0) + 1
+    assert after["response_cache_misses"] == before.get("response_cache_misses", 0) + 4
+
+
+def test_evicted_responses_are_not_found_by_similarity() -> None:
+    cache = ResponseCache(
+        max_size=1, ttl_seconds=60, embedder=HashingEmbedder(), similarity_threshold=0.9
+    )
+    cache.store("model-a", "", QUESTION, ANSWER)
+    cache.store("model-a", "", "What is the capital of France?", "Paris.")
+
+    assert cache.lookup("model-a", "", "In Python, how do I reverse a list") is None
+    assert cache.lookup("model-a", "", "what is the capital of france") == "Paris."
+
+
+class CountingAgent:
+    """Streams ``ANSWER`` and counts how many agents were built."""
+
+    built = 0
+
+    def __init__(self, *args, **kwargs) -> None:
+        CountingAgent.built += 1
+
+    async def arun(self, question: str, stream: bool = True) -> AsyncGenerator:
+        for word in ANSWER.split(" "):
+            yield SimpleNamespace(content=word if word == "Use" else f" {word}")
+
+
+async def _chat(user: User, question: str) -> tuple[uuid.UUID, httpx.Response]:
+    async with async_session_maker() as session:
+        conversation = await create_conversation_service(
+            user.id, session, ConversationCreate()
+        )
+    app.dependency_overrides[current_active_user] = lambda: user
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post(
+                "/api/v1/chat/",
+                json={"question": question, "conversation_id": str(conversation.id)},
+            )
+    finally:
+        app.dependency_overrides.pop(current_active_user, None)
+    return conversation.id, response
+
+
+@pytest.mark.anyio
+async def test_chat_replays_a_cached_answer_without_the_model(
+    user: User, another_user: User, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "response_cache_enabled", True)
+    monkeypatch.setattr(chat_api, "create_agent", CountingAgent)
+    monkeypatch.setattr(CountingAgent, "built", 0)
+    question = f"{QUESTION} ({uuid.uuid4()})"
+
+    _, first = await _chat(user, question)
+    assert first.status_code == 200
+    assert CountingAgent.built == 1
+    assert response_cache.lookup(model_registry.default_id, "", question) == ANSWER
+
+    # Another user's first turn with the same question is served from the cache.
+    conversation_id, replayed = await _chat(another_user, question.upper())
+    assert replayed.status_code == 200
+    assert CountingAgent.built == 1
+    assert ANSWER in replayed.text
+    assert replayed.text.endswith("data: [DONE]\n\n")
+    messages = await get_conversation_history(conversation_id)
+    assert [m.content for m in messages] == [question.upper(), ANSWER]
+
+    # Opted-out users always get a fresh answer.
+    another_user.response_cache_opt_out = True
+    _, fresh = await _chat(another_user, question)
+    assert fresh.status_code == 200
+    assert CountingAgent.built == 2
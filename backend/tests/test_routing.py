@@ -0,0 +1,202 @@
+"""
+Hedged and failed-over chats leave exactly one turn in the history.
+
+The chat models are stand-ins with injected delays and errors. Each wraps the
+agent ``create_agent`` built, and, like Agno, stores its run (even when it is
+cancelled or fails) whenever that agent has a database: a speculative run
+that was not kept out of the store shows up as an extra turn. Whether a chat
+may hedge or fail over is decided once, before it waits for a slot.
+"""
+
+import asyncio
+from collections.abc import AsyncGenerator
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from agno.agent.agent import Agent
+
+import app.api.chat as chat_api
+from app.core.agents import create_agent
+from app.core.config import ModelConfig
+from app.core.history import append_turn, get_conversation_history
+from app.core.limits import llm_limiter
+from app.core.model_registry import ModelRegistry
+from app.core.routing import model_router
+from app.crud.conversation import create_conversation_service
+from app.db import User, async_session_maker
+from app.schemas import ConversationCreate
+from app.users import current_active_user
+from main import app
+
+
+class StandInModel:
+    """Answers for one model id: after ``delay`` seconds, or fails first."""
+
+    def __init__(self, agent: Agent, delay: float = 0.0, fail: bool = False) -> None:
+        self.agent = agent
+        self.delay = delay
+        self.fail = fail
+
+    async def arun(self, question: str, stream: bool = True) -> AsyncGenerator:
+        answer = f"Answer from {self.agent.model.id}"
+        try:
+            await asyncio.sleep(self.delay)
+            if self.fail:
+                raise RuntimeError("stand-in model failed")
+            for word in answer.split(" "):
+                yield SimpleNamespace(content=word if word == "Answer" else f" {word}")
+        finally:
+            if self.agent.db is not None:
+                # Agno stores every run of a persisted agent, whatever its outcome.
+                await append_turn(
+                    self.agent.user_id,
+                    self.agent.session_id,
+                    self.agent.model.id,
+                    question,
+                    answer,
+                )
+
+
+@pytest.fixture
+def models(monkeypatch: pytest.MonkeyPatch) -> SimpleNamespace:
+    """Two stand-in models; tests set each one's behaviour by id."""
+    registry = ModelRegistry(
+        [
+            ModelConfig(id=model_id, name=model_id, context_window_tokens=32000)
+            for model_id in ("primary", "backup")
+        ],
+        stats_window=10,
+    )
+    monkeypatch.setattr(chat_api, "model_registry", registry)
+    monkeypatch.setattr(model_router, "registry", registry)
+    monkeypatch.setattr(model_router, "hedging_enabled", True)
+    monkeypatch.setattr(model_router, "hedge_after_seconds", 0.05)
+
+    stand_ins = SimpleNamespace(behaviours={"primary": {}, "backup": {}}, agents=[])
+
+    def stand_in(*args, **kwargs) -> StandInModel:
+        agent = create_agent(*args, **kwargs)
+        stand_ins.agents.append(agent)
+        return StandInModel(agent, **stand_ins.behaviours[agent.model.id])
+
+    monkeypatch.setattr(chat_api, "create_agent", stand_in)
+    return stand_ins
+
+
+async def _chat(user: User, conversation_id, question: str) -> httpx.Response:
+    app.dependency_overrides[current_active_user] = lambda: user
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(
+                "/api/v1/chat/",
+                json={
+                    "question": question,
+                    "conversation_id": str(conversation_id),
+                    "model_id": "primary",
+                },
+            )
+    finally:
+        app.dependency_overrides.pop(current_active_user, None)
+
+
+async def _new_conversation(user: User):
+    async with async_session_maker() as session:
+        return (await create_conversation_service(user.id, session, ConversationCreate())).id
+
+
+@pytest.mark.anyio
+async def test_hedged_chat_records_only_the_winning_turn(
+    user: User, models: SimpleNamespace
+) -> None:
+    models.behaviours["primary"]["delay"] = 5.0
+    conversation_id = await _new_conversation(user)
+
+    response = await _chat(user, conversation_id, "First question")
+    assert response.status_code == 200
+    assert "Answer" in response.text and "backup" in response.text
+
+    messages = await get_conversation_history(conversation_id)
+    assert [(m.role, m.content) for m in messages] == [
+        ("user", "First question"),
+        ("assistant", "Answer from backup"),
+    ]
+    assert len(models.agents) == 2
+    assert all(agent.db is None for agent in models.agents)
+
+    # The next turn's contenders are given the recorded turn as history.
+    models.agents.clear()
+    await _chat(user, conversation_id, "Second question")
+    for agent in models.agents:
+        assert [m.content for m in agent.additional_input] == [
+            "First question",
+            "Answer from backup",
+        ]
+    assert len(await get_conversation_history(conversation_id)) == 4
+
+
+@pytest.mark.anyio
+async def test_failed_over_chat_records_only_the_winning_turn(
+    user: User, models: SimpleNamespace
+) -> None:
+    models.behaviours["primary"]["fail"] = True
+    conversation_id = await _new_conversation(user)
+
+    response = await _chat(user, conversation_id, "Question")
+    assert response.status_code == 200
+    assert "backup" in response.text
+
+    messages = await get_conversation_history(conversation_id)
+    assert [(m.role, m.content) for m in messages] == [
+        ("user", "Question"),
+        ("assistant", "Answer from backup"),
+    ]
+
+
+@pytest.mark.anyio
+async def test_failover_uses_the_alternative_chosen_before_waiting_for_a_slot(
+    user: User, models: SimpleNamespace, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    models.behaviours["primary"]["fail"] = True
+    acquire = llm_limiter.acquire
+
+    async def acquire_while_models_degrade(user_id):
+        permit = await acquire(user_id)
+        # Health changes after the runs were set up as speculative.
+        monkeypatch.setattr(model_router, "is_healthy", lambda model_id: False)
+        return permit
+
+    monkeypatch.setattr(llm_limiter, "acquire", acquire_while_models_degrade)
+    conversation_id = await _new_conversation(user)
+
+    response = await _chat(user, conversation_id, "Question")
+    assert response.status_code == 200
+    assert "backup" in response.text
+
+    messages = await get_conversation_history(conversation_id)
+    assert [m.content for m in messages] == ["Question", "Answer from backup"]
+
+
+@pytest.mark.anyio
+async def test_no_alternative_means_no_hedging(models: SimpleNamespace) -> None:
+    started: list[str] = []
+
+    async def slow_run(model_id: str) -> AsyncGenerator[str, None]:
+        started.append(model_id)
+        await asyncio.sleep(0.2 if model_id == "primary" else 0.5)
+        yield f"Answer from {model_id}"
+
+    # A healthy backup exists, but the caller did not set the run up to hedge.
+    chunks = [
+        chunk async for chunk in model_router.hedged_stream(slow_run, "primary", None)
+    ]
+    assert (chunks, started) == (["Answer from primary"], ["primary"])
+
+    started.clear()
+    chunks = [
+        chunk
+        async for chunk in model_router.hedged_stream(slow_run, "primary", "backup")
+    ]
+    assert started == ["primary", "backup"]
+    assert chunks == ["Answer from primary"]
@@ -0,0 +1,109 @@
+"""
+Conversation titles: heuristic titles, the memo, and the counters.
+
+The utility model is a stand-in that counts its calls. Each test uses its
+own ``TitleGenerator``, so memo hits come only from the test itself.
+"""
+
+import asyncio
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from agno.run.base import RunStatus
+
+import app.core.titles as titles
+from app.core.jobs import JobQueue, JobStatus
+from app.core.metrics import metrics
+from app.core.titles import DEFAULT_TITLE, TitleGenerator, heuristic_title
+
+LONG_MESSAGE = "Can you help me plan a two week trip through Japan in the spring?"
+
+
+@pytest.mark.parametrize(
+    ("message", "title"),
+    [
+        ("", DEFAULT_TITLE),
+        ("Hey there!", DEFAULT_TITLE),
+        ("  GOOD   morning. ", DEFAULT_TITLE),
+        ("rust borrow checker?", "Rust borrow checker"),
+        ("explain   python   decorators...", "Explain python decorators"),
+        (LONG_MESSAGE, None),
+        ("x" * 61, None),
+        ("?!", DEFAULT_TITLE),
+    ],
+)
+def test_heuristic_title(message: str, title: str) -> None:
+    assert heuristic_title(message) == title
+
+
+class StandInUtilityModel:
+    """Returns ``title``, after failing the first ``failures`` calls."""
+
+    def __init__(self, title: str = "Trip to Japan", failures: int = 0) -> None:
+        self.title = title
+        self.failures = failures
+        self.calls = 0
+
+    async def __call__(self, prompt: str, model_id: str) -> SimpleNamespace:
+        self.calls += 1
+        if self.calls <= self.failures:
+            return SimpleNamespace(status=RunStatus.error, content="quota exceeded")
+        return SimpleNamespace(status=RunStatus.completed, content=f" {self.title}\n")
+
+
+@pytest.fixture
+def model(monkeypatch: pytest.MonkeyPatch) -> StandInUtilityModel:
+    stand_in = StandInUtilityModel()
+    monkeypatch.setattr(titles, "create_utility_agent", stand_in)
+    return stand_in
+
+
+@pytest.mark.anyio
+async def test_model_titles_are_memoized_by_normalised_message(
+    model: StandInUtilityModel,
+) -> None:
+    generator = TitleGenerator(memo_size=8, memo_ttl_seconds=60)
+
+    assert await generator.generate(uuid.uuid4(), LONG_MESSAGE) == "Trip to Japan"
+    # Another user, different case and punctuation: same opening message.
+    assert await generator.generate(uuid.uuid4(), LONG_MESSAGE.upper().rstrip("?")) == (
+        "Trip to Japan"
+    )
+    assert model.calls == 1
+    assert await generator.generate(uuid.uuid4(), "Hello") == DEFAULT_TITLE
+    assert model.calls == 1
+    assert (generator.requested, generator.avoided) == (3, 2)
+
+
+@pytest.mark.anyio
+async def test_retried_title_jobs_are_counted_once(
+    model: StandInUtilityModel,
+) -> None:
+    model.failures = 2
+    generator = TitleGenerator(memo_size=8, memo_ttl_seconds=60)
+    queue = JobQueue(
+        concurrency=1,
+        max_attempts=3,
+        retry_backoff_seconds=0.01,
+        max_pending=4,
+        retention_seconds=60.0,
+    )
+    before = metrics.snapshot()
+
+    await queue.start()
+    try:
+        job = queue.enqueue(
+            "title", uuid.uuid4(), lambda: generator.generate(uuid.uuid4(), LONG_MESSAGE)
+        )
+        async with asyncio.timeout(5):
+            while job.status is not JobStatus.SUCCEEDED:
+                await asyncio.sleep(0.005)
+    finally:
+        await queue.stop()
+
+    assert (job.attempts, job.result, model.calls) == (3, "Trip to Japan", 3)
+    after = metrics.snapshot()
+    for counter in ("titles_requested", "titles_model"):
+        assert after[counter] == before.get(counter, 0) + 1
+    assert (generator.requested, generator.avoided) == (1, 0)
@@ -0,0 +1,82 @@
+"""
+The authentication cache never shares a ``User`` instance between sessions.
+
+Concurrent requests of one user each resolve the user from the cache; an
+update in one of them must not find the instance attached to another
+request's session.
+"""
+
+import uuid
+
+import pytest
+from sqlalchemy import event, inspect
+
+from app.db import User, async_session_maker, engine, get_user_db
+from app.schemas import UserUpdate
+from app.users import UserManager, get_jwt_strategy, user_cache
+
+
+async def _manager(session) -> UserManager:
+    return UserManager(await anext(get_user_db(session)))
+
+
+@pytest.mark.anyio
+async def test_concurrent_requests_get_their_own_user_instances(user: User) -> None:
+    strategy = get_jwt_strategy()
+    token = await strategy.write_token(user)
+
+    async with (
+        async_session_maker() as first_session,
+        async_session_maker() as second_session,
+        async_session_maker() as third_session,
+    ):
+        # A miss, then two hits while the first request's session is still open.
+        first = await strategy.read_token(token, await _manager(first_session))
+        second = await strategy.read_token(token, await _manager(second_session))
+        manager = await _manager(third_session)
+        third = await strategy.read_token(token, manager)
+
+        assert first is not None and second is not None and third is not None
+        assert len({id(first), id(second), id(third)}) == 3
+        assert inspect(second).session is second_session.sync_session
+        assert inspect(third).session is third_session.sync_session
+        cached = user_cache.get(user.id)
+        assert cached is not None and inspect(cached).session is None
+
+        updated = await manager.update(UserUpdate(response_cache_opt_out=True), third)
+
+    assert updated.response_cache_opt_out is True
+    assert user_cache.get(user.id) is None
+    async with async_session_maker() as session:
+        stored = await session.get(User, user.id)
+        assert stored is not None and stored.response_cache_opt_out is True
+
+
+@pytest.mark.anyio
+async def test_a_cache_hit_does_not_query_the_database(user: User) -> None:
+    strategy = get_jwt_strategy()
+    token = await strategy.write_token(user)
+    async with async_session_maker() as session:
+        await strategy.read_token(token, await _manager(session))
+
+    statements: list[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany) -> None:
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        async with async_session_maker() as session:
+            hit = await strategy.read_token(token, await _manager(session))
+            assert hit is not None and hit.email == user.email
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+    assert statements == []
+
+
+@pytest.mark.anyio
+async def test_a_token_for_an_unknown_user_resolves_to_none() -> None:
+    strategy = get_jwt_strategy()
+    token = await strategy.write_token(User(id=uuid.uuid4()))
+    async with async_session_maker() as session:
+        assert await strategy.read_token(token, await _manager(session)) is None
@@ -55,10 +55,13 @@ export function useChat() {
 
 			// Process each message.
 			for (const message of messages) {
-				// Check for the SSE delimiter.
-				if (message.startsWith("data: ")) {
+				// Find the data field. Events also carry an 'id: ' line (used to resume a stream).
+				const dataLine = message
+					.split("\n")
+					.find((line) => line.startsWith("data: "));
+				if (dataLine) {
 					// Remove the 'data: ' prefix.
-					const data = message.slice(6);
+					const data = dataLine.slice(6);
 
 					// Handle the stream end event.
 					if (data.includes("[DONE]")) {
@@ -1,6 +1,11 @@
 import { useMutation, useQueryClient } from "@tanstack/react-query";
 import { useAuthedFetch } from "@/hooks/use-authed-fetch";
 import { API_ENDPOINTS } from "@/lib/api";
+import type { Job } from "@/lib/types";
+
+// How often to poll the title job, and how many times before giving up.
+const POLL_INTERVAL_MS = 500;
+const MAX_POLLS = 60;
 
 export function useGenerateConversationTitle(conversationId: string) {
 	const fetcher = useAuthedFetch();
@@ -16,7 +21,19 @@ export function useGenerateConversationTitle(conversationId: string) {
 					body: JSON.stringify({}),
 				},
 			);
-			return response.json();
+			// Title generation runs as a background job; poll until it finishes.
+			let job: Job<string> = await response.json();
+			let polls = 0;
+			while (
+				(job.status === "pending" || job.status === "running") &&
+				polls < MAX_POLLS
+			) {
+				await new Promise((resolve) => setTimeout(resolve, POLL_INTERVAL_MS));
+				const jobResponse = await fetcher(API_ENDPOINTS.jobs.get(job.id));
+				job = await jobResponse.json();
+				polls++;
+			}
+			return job.result;
 		},
 		onSuccess: () => {
 			queryClient.invalidateQueries({ queryKey: ["conversations"] });
@@ -48,6 +48,15 @@ export const API_ENDPOINTS = {
 		generateTitle: (id: string, firstMessage: string) =>
 			`/api/v1/conversations/${id}/title?first_message=${firstMessage}`,
 	},
+	/** Endpoints for background jobs */
+	jobs: {
+		/**
+		 * Get the status of a background job by ID.
+		 * @param id - Job ID
+		 * @returns `/api/v1/jobs/${id}`
+		 */
+		get: (id: string) => `/api/v1/jobs/${id}`,
+	},
 	/** Endpoints for authentication actions */
 	auth: {
 		/**
@@ -28,3 +28,20 @@ export interface AgnoMessage {
 	role: "user" | "assistant";
 	content: string;
 }
+
+/**
+ * Background job returned by endpoints that defer work (e.g. title generation).
+ * @property id - The ID of the job, used to poll its status.
+ * @property status - Lifecycle state of the job.
+ * @property result - The job's return value once it has succeeded.
+ * @property error - The last error message, if an attempt failed.
+ */
+export interface Job<T = unknown> {
+	id: string;
+	status: "pending" | "running" | "succeeded" | "failed";
+	attempts: number;
+	result: T | null;
+	error: string | null;
+	created_at: string;
+	finished_at: string | null;
+}